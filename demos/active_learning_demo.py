@@ -1,4 +1,5 @@
 from dallinger.experiments import Griduniverse
+from dlgr.griduniverse.cache import ResultCache
 from bams.learners import ActiveLearner
 from bams.query_strategies import (
     # BALD,
@@ -12,6 +13,9 @@ BUDGET = 10
 BASE_KERNELS = ["PER", "LIN"]
 DEPTH = 1
 
+# Scores of configurations already played, across runs of this script
+cache = ResultCache('active_learning_results.db')
+
 
 def scale_up(threshold, dim):
     """Rescale up to actual values"""
@@ -37,7 +41,7 @@ def oracle(x):
     print x[0]
     num_food = scale_up(grid_config['num_food'], float(x[0]))
     print num_food
-    data = experiment.run(
+    config = dict(
     mode=u'debug',
     recruiter=u'bots',
     bot_policy=u"AdvantageSeekingBot",
@@ -47,7 +51,9 @@ def oracle(x):
     num_dynos_worker=grid_config['participants'],
     webdriver_type=u'chrome',
     )
-    score = experiment.average_score(data)
+    score = cache.fetch(
+        config, lambda: experiment.average_score(experiment.run(**config))
+    )
     print score
     # Scale back down
     results = scale_down(grid_config['average_score'], score)
@@ -0,0 +1,250 @@
+"""Minimum-cost assignment of players to food, shared by bots.
+
+`hungarian` pairs the rows of a cost matrix with its columns at the least
+total cost. A `TargetAssignment` keeps such a pairing of players with the
+food of a `DistanceField` from one call to the next: when players move or
+food comes and goes, only their rows and columns of the cost matrix are
+refreshed, and only the players whose pairing they broke are paired again.
+Bots of a process looking at a grid with the same walls share one through
+`shared_assignment`:
+
+    >>> targets = shared_assignment(field).update(player_positions, food_positions)
+    >>> food_index = targets.get(player_id)
+"""
+import collections
+
+import numpy
+
+_assignments = collections.OrderedDict()
+
+
+def _augment(costs, u, v, match, row):
+    """Pair ``row`` (numbered from 1), re-pairing others along the way.
+
+    ``u`` and ``v`` are potentials of the rows and columns, with
+    ``u[i] + v[j] <= costs[i - 1, j - 1]`` and equality for paired cells;
+    ``match[j]`` is the row paired with column ``j``, 0 if none. Column 0 is
+    a placeholder.
+    """
+    size = len(match)
+    way = numpy.zeros(size, dtype=int)
+    slack = numpy.full(size, numpy.inf)
+    used = numpy.zeros(size, dtype=bool)
+    match[0] = row
+    column = 0
+    # Grow a tree of tight cells until it reaches a free column
+    while True:
+        used[column] = True
+        reduced = costs[match[column] - 1] - u[match[column]] - v[1:]
+        better = ~used[1:] & (reduced < slack[1:])
+        slack[1:][better] = reduced[better]
+        way[1:][better] = column
+        candidates = numpy.where(used[1:], numpy.inf, slack[1:])
+        following = int(numpy.argmin(candidates)) + 1
+        delta = candidates[following - 1]
+        u[match[used]] += delta
+        v[used] -= delta
+        slack[~used] -= delta
+        column = following
+        if not match[column]:
+            break
+    # Flip the pairings along the path to it
+    while column:
+        previous = way[column]
+        match[column] = match[previous]
+        column = previous
+    match[0] = 0
+
+
+def hungarian(costs):
+    """The (row, column) pairs of a minimum-cost assignment.
+
+    Every row is paired with a column when there are at least as many
+    columns, and every column with a row otherwise.
+    """
+    costs = numpy.asarray(costs, dtype=float)
+    if costs.ndim != 2 or not costs.size:
+        return []
+    rows, columns = costs.shape
+    size = max(rows, columns)
+    # Pad to a square; the placeholder rows or columns pair with the rest
+    square = numpy.zeros((size, size))
+    square[:rows, :columns] = costs
+    u = numpy.zeros(size + 1)
+    v = numpy.zeros(size + 1)
+    match = numpy.zeros(size + 1, dtype=int)
+    for row in range(1, size + 1):
+        _augment(square, u, v, match, row)
+    return sorted(
+        (match[j] - 1, j - 1) for j in range(1, size + 1)
+        if match[j] <= rows and j <= columns
+    )
+
+
+def shared_assignment(field, size=8):
+    """The `TargetAssignment` of ``field``'s grid and walls, shared by all
+    bots using it.
+
+    Distances between cells only depend on the walls, so the assignment is
+    kept as the food changes and works from the latest field given. The
+    ``size`` assignments used most recently are kept.
+    """
+    key = (field.rows, field.columns, field.walls)
+    assignment = _assignments.pop(key, None)
+    if assignment is None:
+        assignment = TargetAssignment(field)
+        while len(_assignments) >= size:
+            _assignments.popitem(last=False)
+    else:
+        assignment.field = field
+    _assignments[key] = assignment
+    return assignment
+
+
+class TargetAssignment(object):
+    """Pairs players with food to minimize the total distance travelled.
+
+    Among pairings of the same total, the one that sends the closest
+    players to their nearest food is preferred, as a player closer to an
+    item of food gets there first.
+
+    Players and food occupy slots of a square cost matrix; empty slots cost
+    nothing to pair with each other and ``unpaired`` with anything else, as
+    do players and food that can't reach each other.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        # No path is longer than the number of cells
+        self._longest = field.rows * field.columns
+        self.choices = {}
+        self._key = None
+        self._resize(0)
+
+    def _resize(self, size):
+        self.size = size
+        self.costs = numpy.zeros((size, size))
+        self.u = numpy.zeros(size + 1)
+        self.v = numpy.zeros(size + 1)
+        self.match = numpy.zeros(size + 1, dtype=int)
+        # Slots hold (player id, position) and food positions
+        self.row_slots = [None] * size
+        self.column_slots = [None] * size
+
+    @property
+    def unpaired(self):
+        return float((self._longest + 1) * (self.size + 1))
+
+    def _cost(self, distance):
+        # Total distance first; a concave penalty breaks ties in favor of
+        # short trips staying short
+        penalty = 1.0 / (self.size * self._longest * self._longest + 1)
+        return distance - penalty * distance * distance
+
+    def _fill_row(self, i):
+        player = self.row_slots[i]
+        row = self.costs[i]
+        if player is None:
+            row[:] = [0.0 if food is None else self.unpaired for food in self.column_slots]
+            return
+        cell = self.field.index(player[1])
+        for j, food in enumerate(self.column_slots):
+            row[j] = self._pair_cost(cell, food)
+
+    def _pair_cost(self, cell, food):
+        if food is None:
+            return self.unpaired
+        distance = None if cell is None else self.field.distances_from(food)[cell]
+        return self.unpaired if distance is None else self._cost(distance)
+
+    def _fill_column(self, j):
+        food = self.column_slots[j]
+        column = self.costs[:, j]
+        for i, player in enumerate(self.row_slots):
+            if player is None:
+                column[i] = 0.0 if food is None else self.unpaired
+            else:
+                column[i] = self._pair_cost(self.field.index(player[1]), food)
+
+    def update(self, player_positions, food_positions):
+        """Map each player id to the index of its food in ``food_positions``,
+        for players that get any"""
+        players = dict((p, tuple(player_positions[p])) for p in player_positions)
+        food = [tuple(f) for f in food_positions]
+        key = (sorted(players.items()), food)
+        if key == self._key:
+            return self.choices
+        self._key = key
+
+        wanted_food = set(food)
+        needed = max(len(players), len(wanted_food))
+        if needed > self.size:
+            self._resize(max(needed, 2 * self.size))
+            changed_rows, changed_columns = self._place(players, wanted_food)
+            for i in range(self.size):
+                self._fill_row(i)
+            free = range(1, self.size + 1)
+        else:
+            changed_rows, changed_columns = self._place(players, wanted_food)
+            free = self._repair(changed_rows, changed_columns)
+        for row in free:
+            _augment(self.costs, self.u, self.v, self.match, row)
+
+        index = {}
+        for i, item in enumerate(food):
+            index.setdefault(item, i)
+        choices = {}
+        for j in range(1, self.size + 1):
+            i = self.match[j] - 1
+            player, item = self.row_slots[i], self.column_slots[j - 1]
+            if player is not None and item is not None:
+                if self.costs[i, j - 1] < self.unpaired:
+                    choices[player[0]] = index[item]
+        self.choices = choices
+        return choices
+
+    def _place(self, players, food):
+        """Move players and food into slots; the slots that changed"""
+        changed_rows = set()
+        for i, slot in enumerate(self.row_slots):
+            if slot is not None and players.get(slot[0]) != slot[1]:
+                self.row_slots[i] = None
+                changed_rows.add(i)
+        placed = set(slot[0] for slot in self.row_slots if slot is not None)
+        empty = [i for i, slot in enumerate(self.row_slots) if slot is None]
+        for player in sorted(set(players) - placed):
+            i = empty.pop(0)
+            self.row_slots[i] = (player, players[player])
+            changed_rows.add(i)
+
+        changed_columns = set()
+        for j, slot in enumerate(self.column_slots):
+            if slot is not None and slot not in food:
+                self.column_slots[j] = None
+                changed_columns.add(j)
+        placed = set(slot for slot in self.column_slots if slot is not None)
+        empty = [j for j, slot in enumerate(self.column_slots) if slot is None]
+        for item in sorted(food - placed):
+            j = empty.pop(0)
+            self.column_slots[j] = item
+            changed_columns.add(j)
+        return changed_rows, changed_columns
+
+    def _repair(self, changed_rows, changed_columns):
+        """Refresh the costs of changed slots and unpair them, keeping the
+        potentials feasible; returns the rows left to pair, numbered from 1"""
+        for i in changed_rows:
+            self._fill_row(i)
+        for j in changed_columns:
+            self._fill_column(j)
+        free = set()
+        for j in range(1, self.size + 1):
+            i = self.match[j]
+            if i and (i - 1 in changed_rows or j - 1 in changed_columns):
+                self.match[j] = 0
+                free.add(i)
+        for j in changed_columns:
+            self.v[j + 1] = numpy.min(self.costs[:, j] - self.u[1:])
+        for i in changed_rows:
+            self.u[i + 1] = numpy.min(self.costs[i] - self.v[1:])
+        return sorted(free)
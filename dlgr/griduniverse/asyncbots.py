@@ -0,0 +1,239 @@
+"""Griduniverse bots on asyncio, for large crowds of bots on one core.
+
+An `AsyncBotHost` runs high performance bots as tasks of one asyncio event
+loop, talking to Redis through `redis.asyncio`. As with a `BotHost`, each
+message is decoded once for all its bots and their moves are sent in
+batches. Bots wait for the quorum and for the grid by awaiting the messages
+that bring them rather than by polling, and each moves on a timer of its
+own, set by its `get_wait_time`.
+
+    >>> host = AsyncBotHost('http://localhost:5000', AdvantageSeekingBot, count=1000)
+    >>> asyncio.run(host.run())
+
+Bots sign up and off from the event loop, as their `sign_up`,
+`sign_off` and `complete_experiment` would; only the blocking HTTP
+requests themselves are made in a pool of threads.
+
+Run as a script to play a game with many bots from one event loop:
+
+    python -m dlgr.griduniverse.asyncbots http://localhost:5000 --bots 1000 \\
+        --policy AdvantageSeekingBot
+"""
+import asyncio
+import datetime
+import json
+import logging
+import os
+import random
+import uuid
+from urllib.parse import urlparse
+
+import requests
+from requests.exceptions import RequestException
+
+from .host import BotHost
+from .host import parse_args
+
+logger = logging.getLogger('griduniverse')
+
+
+class AsyncBotHost(BotHost):
+    """A `BotHost` whose bots are tasks of an asyncio event loop.
+
+    Its methods that talk to Redis or wait on bots are coroutines.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncBotHost, self).__init__(*args, **kwargs)
+        # Set whenever a bot receives a message
+        self._received = {}
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio
+
+            # As dallinger.redis_utils.connect_to_redis does
+            url = os.getenv('REDIS_URL', 'redis://localhost:6379')
+            options = {'ssl_cert_reqs': None} if urlparse(url).scheme == 'rediss' else {}
+            self._redis = redis.asyncio.from_url(url, **options)
+        return self._redis
+
+    def _event(self, bot):
+        event = self._received.get(bot)
+        if event is None:
+            event = self._received[bot] = asyncio.Event()
+        return event
+
+    def dispatch(self, channel, data):
+        super(AsyncBotHost, self).dispatch(channel, data)
+        for bot in self.listeners[channel]:
+            self._event(bot).set()
+
+    async def wait_until(self, bot, condition):
+        """Wait until ``condition()`` holds, checking it whenever ``bot``
+        receives a message"""
+        event = self._event(bot)
+        while not condition():
+            event.clear()
+            await event.wait()
+
+    async def flush(self):
+        batch = self.take_batch()
+        if batch is not None:
+            await self.redis.publish('griduniverse_ctrl', batch)
+
+    async def keep_flushing(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def subscribe_new(self, pubsub):
+        """Subscribe to the channels bots started listening on"""
+        channels = self.take_new_channels()
+        if channels:
+            await pubsub.subscribe(*channels)
+
+    async def subscribe_all(self):
+        """A subscription to every channel the bots listen on so far"""
+        pubsub = self.redis.pubsub()
+        await self.subscribe_new(pubsub)
+        return pubsub
+
+    async def listen(self, pubsub):
+        """Receive messages for the bots until cancelled, subscribing to
+        the channels of bots that join along the way"""
+        while True:
+            await self.subscribe_new(pubsub)
+            message = await pubsub.get_message(timeout=self.flush_interval)
+            if message is not None and message['type'] == 'message':
+                self.receive(message['channel'], message['data'])
+
+    def retry_delay(self):
+        """Seconds to wait before retrying a failed request, as a bot's
+        `stochastic_sleep` does"""
+        return max(1.0 / random.expovariate(0.5), 10.0)
+
+    async def request(self, method, url, **kwargs):
+        """Make an HTTP request in a thread, retrying until it succeeds"""
+        loop = asyncio.get_event_loop()
+
+        def attempt():
+            result = requests.request(method, url, **kwargs)
+            result.raise_for_status()
+            return result
+
+        while True:
+            try:
+                return await loop.run_in_executor(None, attempt)
+            except RequestException:
+                await asyncio.sleep(self.retry_delay())
+
+    async def sign_up(self, bot):
+        """Sign ``bot`` up, as its `sign_up` would"""
+        bot.log('Bot player signing up.')
+        bot.subscribe_to_quorum_channel()
+        while True:
+            url = (
+                '{host}/participant/{bot.worker_id}/{bot.hit_id}/{bot.assignment_id}/'
+                'debug?fingerprint_hash={hash}&recruiter=bots:{bot_name}'.format(
+                    host=bot.host,
+                    bot=bot,
+                    hash=uuid.uuid4().hex,
+                    bot_name=bot.__class__.__name__,
+                )
+            )
+            data = (await self.request('post', url)).json()
+            if data['status'] == 'error':
+                await asyncio.sleep(self.retry_delay())
+                continue
+            bot.on_signup(data)
+            return True
+
+    async def sign_off(self, bot):
+        """Submit ``bot``'s questionnaire, as its `sign_off` would"""
+        bot.log('Bot player signing off.')
+        url = '{host}/question/{bot.participant_id}'.format(host=bot.host, bot=bot)
+        await self.request('post', url, data={
+            'question': 'questionnaire',
+            'number': 1,
+            'response': json.dumps(bot.question_responses),
+        })
+        return True
+
+    async def complete_experiment(self, bot, status):
+        """Record ``bot``'s completion ``status``, as its
+        `complete_experiment` would"""
+        bot.log('Bot player completing experiment. Status: {}'.format(status))
+        url = '{host}/{status}?participant_id={bot.participant_id}'.format(
+            host=bot.host, status=status, bot=bot
+        )
+        return await self.request('get', url)
+
+    async def participate(self, bot):
+        """Play ``bot``'s game once it has signed up, as its `participate`
+        would; True unless it lost sight of the grid"""
+        await self.wait_until(bot, lambda: bot._quorum_reached)
+        if bot._skip_experiment:
+            bot.log('Participant overrecruited. Skipping experiment.')
+            return True
+        bot.grid = {}
+        bot._make_socket()
+        await self.wait_until(bot, lambda: bot.grid.get('remaining_time'))
+        bot.log('Bot player started')
+        bot.player_id = bot.get_player_id()
+
+        expected_finish_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        while bot.is_still_on_grid:
+            proposed_finish_time = datetime.datetime.now() + datetime.timedelta(
+                seconds=bot.grid['remaining_time']
+            )
+            expected_finish_time = min(expected_finish_time, proposed_finish_time)
+            # Bail out if the game should have ended a while ago
+            late = datetime.timedelta(seconds=bot.END_BUFFER_SECONDS)
+            if expected_finish_time + late < datetime.datetime.now():
+                return True
+
+            await asyncio.sleep(bot.get_wait_time())
+            bot.state = bot.observe_state()
+            if not bot.state:
+                return False
+            bot.send_next_key()
+        bot.log('Bot player stopped.')
+        return True
+
+    async def play(self, bot):
+        """Sign ``bot`` up, play its game and sign it off"""
+        await self.sign_up(bot)
+        await self.participate(bot)
+        signed_off = await self.sign_off(bot)
+        status = 'worker_complete' if signed_off else 'worker_failed'
+        await self.complete_experiment(bot, status)
+
+    async def run(self):
+        """Play every bot's experiment through to the end"""
+        pubsub = await self.subscribe_all()
+        helpers = [
+            asyncio.ensure_future(self.listen(pubsub)),
+            asyncio.ensure_future(self.keep_flushing()),
+        ]
+        try:
+            await asyncio.gather(*[self.play(bot) for bot in self.bots])
+        finally:
+            await self.flush()
+            for helper in helpers:
+                helper.cancel()
+            await pubsub.reset()
+
+
+def main(argv=None):
+    args = parse_args('Run many Griduniverse bots in one asyncio event loop.', argv)
+    host = AsyncBotHost(
+        args.url, args.bot_class, count=args.bots, flush_interval=args.flush_interval
+    )
+    logger.info('Running {} bots.'.format(len(host.bots)))
+    asyncio.run(host.run())
+
+
+if __name__ == '__main__':
+    main()
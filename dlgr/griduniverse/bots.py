@@ -3,7 +3,6 @@ import datetime
 import itertools
 import json
 import logging
-import operator
 import random
 
 import gevent
@@ -20,11 +19,34 @@ from selenium.webdriver.support.ui import Select
 from dallinger.bots import BotBase, HighPerformanceBotBase
 from dallinger.config import get_config
 
-from .maze_utils import positions_to_maze, maze_to_graph, find_path_astar
+from .assignment import shared_assignment
+from .distance import shared_field
+from .wire import decode_grid
 
 logger = logging.getLogger('griduniverse')
 
 
+def merge_state(grid, data):
+    """The state after the `state` message ``data`` is received in state
+    ``grid``; neither is changed.
+
+    Not all grid changes are sent each time (such as food and walls), so
+    the grid is updated rather than replaced, and walls built since the
+    last state are added to the walls.
+    """
+    state = dict(grid)
+    state.update(data)
+    state.pop('format', None)
+    if 'grid' in data:
+        merged = dict(grid.get('grid', {}))
+        merged.update(decode_grid(data))
+        walls_added = merged.pop('walls_added', None)
+        if walls_added:
+            merged['walls'] = merged.get('walls', []) + walls_added
+        state['grid'] = merged
+    return state
+
+
 class BaseGridUniverseBot(BotBase):
     """A base class for GridUniverse bots that implements experiment
     specific helper functions and runs under Selenium"""
@@ -97,7 +119,11 @@ class BaseGridUniverseBot(BotBase):
     def wall_positions(self):
         """Return a list of wall coordinates"""
         try:
-            return [tuple(item['position']) for item in self.state['walls']]
+            # Walls of the default color are serialized as bare positions
+            return [
+                tuple(item['position'] if isinstance(item, dict) else item)
+                for item in self.state['walls']
+            ]
         except (AttributeError, TypeError, KeyError):
             return []
 
@@ -243,15 +269,45 @@ class BaseGridUniverseBot(BotBase):
         }
         return tuple(map(lookup.get, directions))
 
+    @property
+    def distance_field(self):
+        """The `DistanceField` of the grid, with the food as its sources.
+
+        It is shared with the other bots of this process that see the same
+        walls and food. When the walls version of the state or the food
+        changes, the field for them is derived from the last one by adding
+        and removing walls and food.
+        """
+        walls = self.state.get('walls')
+        version = self.state.get('walls_version')
+        if version is None:
+            # Without a version, any new list of walls may differ
+            version = id(walls)
+        food = frozenset(self.food_positions)
+        field = getattr(self, '_field', None)
+        if field is None or version != self._field_version:
+            walls = self.wall_positions
+        elif food != self._field_food:
+            walls = field.walls
+        else:
+            return field
+        self._field = shared_field(
+            self.state['rows'],
+            self.state['columns'],
+            walls,
+            food,
+            previous=field,
+        )
+        self._field_version = version
+        self._field_food = food
+        return self._field
+
     def distance(self, origin, endpoint):
         """Find the number of unit movements needed to
         travel from origin to endpoint, that is the rectilinear distance
         respecting obstacles as well as a tuple of Selenium keys
         that represent this path.
 
-        In particularly difficult mazes this may return an underestimate
-        of the true distance and an approximation of the correct path.
-
         :param origin: The start position
         :type origin: tuple(int, int)
         :param endpoint: The target position
@@ -259,29 +315,10 @@ class BaseGridUniverseBot(BotBase):
         :return: tuple of distance and directions. Distance is None if no route possible.
         :rtype: tuple(int, list(str)) or tuple(None, list(str))
         """
-        try:
-            maze = self._maze
-            graph = self._graph
-        except AttributeError:
-            self._maze = maze = positions_to_maze(
-                self.wall_positions,
-                self.state['rows'],
-                self.state['columns']
-            )
-            self._graph = graph = maze_to_graph(maze)
-        result = find_path_astar(
-            maze,
-            tuple(origin),
-            tuple(endpoint),
-            max_iterations=10000,
-            graph=graph
-        )
-        if result:
-            distance = result[0]
-            directions = self.translate_directions(result[1])
-            return distance, directions
-        else:
+        distance, directions = self.distance_field.path(tuple(origin), tuple(endpoint))
+        if distance is None:
             return None, []
+        return distance, self.translate_directions(directions)
 
     def distances(self):
         """Compute distances to food.
@@ -290,12 +327,15 @@ class BaseGridUniverseBot(BotBase):
         dictionary which maps the index of a food item in the positions list
         to the distance between that player and that food item.
         """
+        field = self.distance_field
+        from_food = [field.distances_from(food) for food in self.food_positions]
         distances = {}
         for player_id, position in self.player_positions.items():
-            player_distances = {}
-            for j, food in enumerate(self.food_positions):
-                player_distances[j], _ = self.distance(position, food)
-            distances[player_id] = player_distances
+            i = field.index(position)
+            distances[player_id] = dict(
+                (j, None if i is None else food_distances[i])
+                for j, food_distances in enumerate(from_food)
+            )
         return distances
 
 
@@ -308,50 +348,84 @@ class HighPerformanceBaseGridUniverseBot(HighPerformanceBotBase, BaseGridUnivers
 
     _skip_experiment = False
 
+    #: The encoding of state messages this bot asks the server for
+    state_format = 'json'
+
+    #: Whether states have arrived on a channel of this bot's own yet. Until
+    #: then it uses the JSON states of the shared channel, in case the server
+    #: does not send its format.
+    own_states = False
+
+    #: The `BotHost` running this bot alongside others, if any
+    bot_host = None
+
+    def state_channels(self):
+        """The channels this bot listens to once it joins the game"""
+        if get_config().get('interest_management', False):
+            # Our view of the grid arrives on a channel of its own
+            return ['griduniverse', 'griduniverse_{}'.format(self.participant_id)]
+        elif self.state_format != 'json':
+            return ['griduniverse', 'griduniverse_{}'.format(self.state_format)]
+        return ['griduniverse']
+
+    def subscribe_to_quorum_channel(self):
+        if self.bot_host is not None:
+            self.bot_host.subscribe(self, ['quorum'])
+        else:
+            super(HighPerformanceBaseGridUniverseBot, self).subscribe_to_quorum_channel()
+
     def _make_socket(self):
         """Connect to the Redis server and announce the connection"""
-        import dallinger.db
-        from dallinger.experiment_server.sockets import chat_backend
+        if self.bot_host is not None:
+            self.bot_host.subscribe(self, self.state_channels())
+        else:
+            import dallinger.db
+            from dallinger.experiment_server.sockets import chat_backend
 
-        self.redis = dallinger.db.redis_conn
-        chat_backend.subscribe(self, 'griduniverse')
+            self.redis = dallinger.db.redis_conn
+            for channel in self.state_channels():
+                chat_backend.subscribe(self, channel)
 
         self.publish({
             'type': 'connect',
-            'player_id': self.participant_id
+            'player_id': self.participant_id,
+            'state_format': self.state_format,
         })
 
     def send(self, message):
         """Redis handler to receive a message from the griduniverse channel to this bot."""
         channel, payload = message.split(':', 1)
-        data = json.loads(payload)
+        self.receive(channel, json.loads(payload))
+
+    def receive(self, channel, data):
+        """Handle a decoded message from ``channel``"""
         if channel == 'quorum':
             handler = 'handle_quorum'
+        elif data['type'] == 'state' and channel == 'griduniverse' and self.own_states:
+            # Browsers get this copy; ours arrives on another channel
+            return
         else:
+            if data['type'] == 'state' and channel != 'griduniverse':
+                self.own_states = True
             handler = 'handle_{}'.format(data['type'])
         getattr(self, handler, lambda x: None)(data)
 
     def publish(self, message):
         """Sends a message from this bot to the `griduniverse_ctrl` channel."""
-        self.redis.publish('griduniverse_ctrl', json.dumps(message))
+        if self.bot_host is not None:
+            self.bot_host.publish(message)
+        else:
+            self.redis.publish('griduniverse_ctrl', json.dumps(message))
 
     def handle_state(self, data):
         """Receive a grid state update an store it"""
-        if 'grid' in data:
-            # grid is a json encoded dictionary, we want to selectively
-            # update this rather than overwrite it as not all grid changes
-            # are sent each time (such as food and walls)
-            data['grid'] = json.loads(data['grid'])
-            if 'grid' not in self.grid:
-                self.grid['grid'] = {}
-            self.grid['grid'].update(data['grid'])
-            data['grid'] = self.grid['grid']
-        self.grid.update(data)
+        self.grid = merge_state(self.grid, data)
 
     def handle_stop(self, data):
         """Receive an update that the round has finished and mark the
         remaining time as zero"""
-        self.grid['remaining_time'] = 0
+        # The grid may be shared with other bots, so it is replaced
+        self.grid = dict(self.grid, remaining_time=0)
 
     def handle_quorum(self, data):
         """Update an instance attribute when the quorum is reached, so it
@@ -490,15 +564,25 @@ class FoodSeekingBot(HighPerformanceBaseGridUniverseBot):
         find the best targets for each of the players, where the best target
         is the closest item of food.
         """
-        best_choice = 100e10, None
         position = self.my_position
         if position is None:
             return {}
-        for j, food in enumerate(self.food_positions):
-            distance, _ = self.distance(position, food)
-            if distance and distance < best_choice[0]:
-                best_choice = distance, j
-        return {self.player_id: best_choice[1]}
+        food_positions = self.food_positions
+        distance, food = self.distance_field.nearest(position)
+        if distance == 0:
+            # Standing on it already; look for the next closest instead
+            best_choice = 100e10, None
+            for j, food in enumerate(food_positions):
+                distance, _ = self.distance(position, food)
+                if distance and distance < best_choice[0]:
+                    best_choice = distance, j
+            if best_choice[1] is None:
+                return {}
+            return {self.player_id: best_choice[1]}
+        if distance is None:
+            # No food we can reach
+            return {}
+        return {self.player_id: food_positions.index(food)}
 
     def get_next_key(self):
         """Returns the best key to press in order to maximize point scoring, as follows:
@@ -587,11 +671,11 @@ class AdvantageSeekingBot(HighPerformanceBaseGridUniverseBot):
         """Find a logical place to move.
 
         When run on a page view that has data extracted from the grid state
-        find the best targets for each of the players, where the best target
-        is the closest item of food, excluding all food items that are the best
-        target for another player. When the same item of food is the closest
-        target for multiple players the closest player would get there first,
-        so it is excluded as the best target for other players.
+        find the best targets for each of the players: each player is paired
+        with at most one item of food, and each item of food with at most one
+        player, so that the total distance to the food is the least possible.
+        Among pairings with the same total, the closest players are sent to
+        their nearest food, as they would get there first.
 
         For example:
         Player 1 is 3 spaces from food item 1 and 5 from food item 2.
@@ -601,37 +685,10 @@ class AdvantageSeekingBot(HighPerformanceBaseGridUniverseBot):
         Player 1: food item 1
         Player 2: food item 2
         """
-        best_choices = {}
-        # Create a mapping of (player_id, food_id) tuple to the distance between
-        # the relevant player and food item
-        for player, food_info in self.distances().items():
-            for food_id, distance in food_info.items():
-                if distance is None:
-                    # This food item is unreachable
-                    continue
-                best_choices[player, food_id] = distance
-        # Sort that list based on the distance, so the closest players/food
-        # pairs are first, then discard the distance
-        get_key = operator.itemgetter(0)
-        get_food_distance = operator.itemgetter(1)
-        best_choices = sorted(best_choices.items(), key=get_food_distance)
-        best_choices = map(get_key, best_choices)
-        # We need to find the optimum solution, so we iterate through the
-        # sorted list, discarding pairings that are inferior to previous
-        # options. We keep track of player and food ids, once either has been
-        # used we know that player or food item has a better choice.
-        seen_players = set()
-        seen_food = set()
-        choices = {}
-        for (player_id, food_id) in best_choices:
-            if player_id in seen_players:
-                continue
-            if food_id in seen_food:
-                continue
-            seen_players.add(player_id)
-            seen_food.add(food_id)
-            choices[player_id] = food_id
-        return choices
+        return shared_assignment(self.distance_field).update(
+            self.player_positions,
+            self.food_positions,
+        )
 
     def get_next_key(self):
         """Returns the best key to press in order to maximize point scoring, as follows:
@@ -0,0 +1,141 @@
+"""A persistent cache of game results, keyed on their configuration.
+
+Results are stored in an SQLite file under the hash of their normalized
+configuration: the `GU_PARAMS` values only, coerced to their declared
+types, so that settings which don't change the game (the recruiter, the
+number of dynos) and spellings such as ``10`` and ``10.0`` share an entry.
+Include ``bot_policy`` and ``seed`` for results to be reproducible.
+
+    >>> cache = ResultCache('results.db')
+    >>> score = cache.fetch(config, lambda: play(config))
+
+Each entry records the version of the code that produced it. Entries from
+another version are stale: they are never returned, and `prune_stale`
+removes them. By default the version is a hash of this package's source.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from .experiment import GU_PARAMS
+
+_code_version = None
+_missing = object()
+
+
+def code_version():
+    """A hash of the source of this package"""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        package = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(package)):
+            if name.endswith('.py'):
+                with open(os.path.join(package, name), 'rb') as source:
+                    digest.update(source.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def normalize(config):
+    """The parameters of ``config`` that can change a game's results"""
+    normalized = {}
+    for key, value in config.items():
+        if key not in GU_PARAMS or value is None:
+            continue
+        normalized[key] = GU_PARAMS[key](value)
+    return normalized
+
+
+def config_key(config):
+    """The content address of a configuration"""
+    encoded = json.dumps(normalize(config), sort_keys=True)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+    """Results of games, evicting the least recently used beyond
+    ``max_entries``."""
+
+    def __init__(self, path, max_entries=10000, version=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.version = version or code_version()
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, version TEXT, config TEXT, result TEXT, '
+            'last_used REAL)'
+        )
+        self.connection.commit()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def __contains__(self, config):
+        return self._lookup(config_key(config)) is not None
+
+    def _lookup(self, key):
+        return self.connection.execute(
+            'SELECT result FROM results WHERE key = ? AND version = ?',
+            (key, self.version)
+        ).fetchone()
+
+    def get(self, config, default=None):
+        """The cached result for ``config``, or ``default``"""
+        key = config_key(config)
+        row = self._lookup(key)
+        if row is None:
+            return default
+        self.connection.execute(
+            'UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key)
+        )
+        self.connection.commit()
+        return json.loads(row[0])
+
+    def set(self, config, result):
+        """Store the result of a game played with ``config``"""
+        self.connection.execute(
+            'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)', (
+                config_key(config),
+                self.version,
+                json.dumps(normalize(config), sort_keys=True),
+                json.dumps(result),
+                time.time(),
+            )
+        )
+        self.evict()
+        self.connection.commit()
+
+    def fetch(self, config, compute):
+        """The cached result for ``config``, calling ``compute`` on a miss"""
+        result = self.get(config, _missing)
+        if result is _missing:
+            result = compute()
+            self.set(config, result)
+        return result
+
+    def evict(self):
+        """Remove the least recently used entries beyond ``max_entries``"""
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                'DELETE FROM results WHERE key IN ('
+                'SELECT key FROM results ORDER BY last_used LIMIT ?)', (excess,)
+            )
+
+    def prune_stale(self):
+        """Remove the entries of other code versions"""
+        self.connection.execute(
+            'DELETE FROM results WHERE version != ?', (self.version,)
+        )
+        self.connection.commit()
+
+    def clear(self):
+        self.connection.execute('DELETE FROM results')
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,64 @@
+"""Clocks for the time-dependent parts of the game.
+
+Everything in the game that depends on time asks a clock for it instead of
+calling `time.time` or `gevent.sleep` directly. `WallClock` is real time,
+`ManualClock` only moves when told to, for simulations and tests, and
+`AcceleratedClock` runs real time faster by a constant factor.
+"""
+import time
+
+import gevent
+
+
+class WallClock(object):
+    """Real time."""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        gevent.sleep(seconds)
+
+
+class ManualClock(object):
+    """A clock that only moves when it is advanced.
+
+    Sleeping advances the clock instead of waiting, so code driven by a
+    manual clock runs as fast as it can.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+
+class AcceleratedClock(object):
+    """Real time sped up ``speed`` times, starting from the current time."""
+
+    def __init__(self, speed=1.0, start=None):
+        if speed <= 0:
+            raise ValueError('Clock speed must be positive, not {}'.format(speed))
+        self.speed = speed
+        self.origin = time.time()
+        self.start = self.origin if start is None else start
+
+    def time(self):
+        return self.start + (time.time() - self.origin) * self.speed
+
+    def sleep(self, seconds):
+        gevent.sleep(seconds / self.speed)
+
+
+def clock_for(speed=1.0):
+    """The clock for a game running ``speed`` times faster than real time"""
+    if speed == 1:
+        return WallClock()
+    return AcceleratedClock(speed)
@@ -0,0 +1,340 @@
+"""Distances to food over the walls of a grid, shared by bots.
+
+A `DistanceField` keeps, for every cell, the distance to the nearest source
+(an item of food) and the first step toward it, found by a breadth-first
+search outward from every source at once. Adding or removing a source only
+revisits the cells whose nearest source changes, so a bot's next move is a
+lookup rather than a search for paths to every item of food:
+
+    >>> field = shared_field(rows, columns, walls).update(food_positions)
+    >>> distance, food = field.nearest(my_position)
+    >>> direction = field.step(my_position)
+
+Walls are built and removed the same way: only the cells whose distances
+change are revisited. Fields are shared by the bots of a process that see
+the same walls and food; a bot whose walls or food change derives a field
+for them from the one it had. Shared fields must not be changed in place.
+"""
+import collections
+import heapq
+
+#: Steps as (direction, row change, column change)
+STEPS = (('N', -1, 0), ('S', 1, 0), ('E', 0, 1), ('W', 0, -1))
+OPPOSITE = {'N': 'S', 'S': 'N', 'E': 'W', 'W': 'E'}
+
+_fields = collections.OrderedDict()
+
+
+def shared_field(rows, columns, walls, sources=(), previous=None, size=8):
+    """The field of a grid with ``sources``, built once for all bots that
+    ask for it.
+
+    On a miss, the field is derived from ``previous``, the field of the
+    same grid before its walls or sources changed, if there is one. The
+    ``size`` fields used most recently are kept.
+    """
+    if not isinstance(walls, frozenset):
+        walls = frozenset(tuple(w) for w in walls)
+    if not isinstance(sources, frozenset):
+        sources = frozenset(tuple(s) for s in sources)
+    key = (rows, columns, walls, sources)
+    field = _fields.pop(key, None)
+    if field is None:
+        if previous is not None and (previous.rows, previous.columns) == (rows, columns):
+            field = previous.with_walls(walls).with_sources(sources)
+        else:
+            field = DistanceField(rows, columns, walls).update(sources)
+        while len(_fields) >= size:
+            _fields.popitem(last=False)
+    _fields[key] = field
+    return field
+
+
+class DistanceField(object):
+    """Distances from every cell of a grid to the nearest of its sources,
+    around walls."""
+
+    #: Distances from cells other than sources kept for paths to them
+    paths_cached = 64
+
+    def __init__(self, rows, columns, walls=()):
+        self.rows = rows
+        self.columns = columns
+        self.walls = frozenset(tuple(w) for w in walls)
+        # Cells are numbered row by row
+        self.blocked = [(r, c) in self.walls for r in range(rows) for c in range(columns)]
+        self.neighbors = [self._open_neighbors(i) for i in range(rows * columns)]
+        self.distance = [None] * (rows * columns)
+        self.source = [None] * (rows * columns)
+        self.toward = [None] * (rows * columns)
+        self.sources = set()
+        # Distances from single sources, kept while they are sources
+        self._from = {}
+        # And from other cells, most recently used last
+        self._paths = collections.OrderedDict()
+
+    def _open_neighbors(self, cell):
+        if self.blocked[cell]:
+            return ()
+        row, column = divmod(cell, self.columns)
+        neighbors = []
+        for direction, dr, dc in STEPS:
+            if 0 <= row + dr < self.rows and 0 <= column + dc < self.columns:
+                neighbor = cell + dr * self.columns + dc
+                if not self.blocked[neighbor]:
+                    neighbors.append((direction, neighbor))
+        return tuple(neighbors)
+
+    def index(self, position):
+        """The number of the cell at ``position``, or None off the grid"""
+        row, column = position
+        if 0 <= row < self.rows and 0 <= column < self.columns:
+            return row * self.columns + column
+        return None
+
+    def position(self, index):
+        return divmod(index, self.columns)
+
+    def copy(self):
+        """An independent copy of the field"""
+        field = DistanceField.__new__(DistanceField)
+        field.__dict__.update(self.__dict__)
+        for name in ('blocked', 'neighbors', 'distance', 'source', 'toward'):
+            setattr(field, name, list(getattr(self, name)))
+        field.sources = set(self.sources)
+        field._from = dict((i, list(d)) for i, d in self._from.items())
+        field._paths = collections.OrderedDict()
+        return field
+
+    def _spread(self, distances, cell):
+        """Lower distances outward from ``cell`` wherever it is nearer"""
+        nearest = distances is self.distance
+        queue = collections.deque([cell])
+        while queue:
+            cell = queue.popleft()
+            d = distances[cell] + 1
+            for direction, neighbor in self.neighbors[cell]:
+                if distances[neighbor] is None or distances[neighbor] > d:
+                    distances[neighbor] = d
+                    if nearest:
+                        self.source[neighbor] = self.source[cell]
+                        self.toward[neighbor] = OPPOSITE[direction]
+                    queue.append(neighbor)
+
+    def _refill(self, distances, orphans):
+        """Fill in the distances of ``orphans``, which have been cleared,
+        from the cells around them, nearest first"""
+        nearest = distances is self.distance
+        frontier = []
+        for cell in orphans:
+            for direction, neighbor in self.neighbors[cell]:
+                if distances[neighbor] is not None:
+                    frontier.append((distances[neighbor], neighbor))
+        heapq.heapify(frontier)
+        while frontier:
+            d, cell = heapq.heappop(frontier)
+            if d != distances[cell]:
+                continue
+            for direction, neighbor in self.neighbors[cell]:
+                if distances[neighbor] is None or distances[neighbor] > d + 1:
+                    distances[neighbor] = d + 1
+                    if nearest:
+                        self.source[neighbor] = self.source[cell]
+                        self.toward[neighbor] = OPPOSITE[direction]
+                    heapq.heappush(frontier, (d + 1, neighbor))
+
+    def _downstream(self, distances, cell):
+        """The cells every shortest path to which may pass through ``cell``"""
+        if distances[cell] is None:
+            return [cell]
+        cells = [cell]
+        found = set(cells)
+        for cell in cells:
+            d = distances[cell] + 1
+            for direction, neighbor in self.neighbors[cell]:
+                if distances[neighbor] == d and neighbor not in found:
+                    found.add(neighbor)
+                    cells.append(neighbor)
+        return cells
+
+    def add(self, position):
+        """Make ``position`` a source"""
+        i = self.index(position)
+        if i is None or i in self.sources or self.blocked[i]:
+            return
+        self.sources.add(i)
+        self.distance[i] = 0
+        self.source[i] = i
+        self.toward[i] = None
+        # Spread out only as far as the new source is the nearest
+        self._spread(self.distance, i)
+
+    def remove(self, position):
+        """Stop ``position`` from being a source"""
+        i = self.index(position)
+        if i not in self.sources:
+            return
+        self.sources.discard(i)
+        self._from.pop(i, None)
+        # The cells nearest to it are connected through each other
+        orphans = [i]
+        self.source[i] = self.distance[i] = self.toward[i] = None
+        for cell in orphans:
+            for direction, neighbor in self.neighbors[cell]:
+                if self.source[neighbor] == i:
+                    self.source[neighbor] = None
+                    self.distance[neighbor] = self.toward[neighbor] = None
+                    orphans.append(neighbor)
+        self._refill(self.distance, orphans)
+
+    def update(self, positions):
+        """Make exactly ``positions`` the sources; returns the field"""
+        wanted = set(self.index(p) for p in positions)
+        for i in self.sources - wanted:
+            self.remove(self.position(i))
+        for i in wanted - self.sources:
+            if i is not None:
+                self.add(self.position(i))
+        return self
+
+    def with_sources(self, positions):
+        """A field like this one with exactly ``positions`` as its sources,
+        built from it by adding and removing the sources that differ.
+
+        The walls are the same, so the tables that depend on walls alone
+        are shared with this field rather than copied.
+        """
+        wanted = set(self.index(p) for p in positions)
+        wanted.discard(None)
+        if wanted == self.sources:
+            return self
+        field = DistanceField.__new__(DistanceField)
+        field.__dict__.update(self.__dict__)
+        for name in ('distance', 'source', 'toward'):
+            setattr(field, name, list(getattr(self, name)))
+        field.sources = set(self.sources)
+        field._from = dict(self._from)
+        return field.update(positions)
+
+    def add_wall(self, position):
+        """Block the cell at ``position``"""
+        i = self.index(position)
+        if i is None or self.blocked[i]:
+            return
+        self.remove(position)
+        tables = [self.distance] + list(self._from.values())
+        # Distances can only grow, and only behind the new wall
+        affected = [self._downstream(distances, i) for distances in tables]
+        self.blocked[i] = True
+        self.neighbors[i] = ()
+        for direction, neighbor in self._open_neighbors_of_wall(i):
+            self.neighbors[neighbor] = self._open_neighbors(neighbor)
+        for distances, orphans in zip(tables, affected):
+            for cell in orphans:
+                distances[cell] = None
+                if distances is self.distance:
+                    self.source[cell] = self.toward[cell] = None
+            self._refill(distances, orphans)
+        self.walls = self.walls | frozenset([tuple(position)])
+        self._paths = collections.OrderedDict()
+
+    def _open_neighbors_of_wall(self, cell):
+        row, column = divmod(cell, self.columns)
+        for direction, dr, dc in STEPS:
+            if 0 <= row + dr < self.rows and 0 <= column + dc < self.columns:
+                neighbor = cell + dr * self.columns + dc
+                if not self.blocked[neighbor]:
+                    yield direction, neighbor
+
+    def remove_wall(self, position):
+        """Open the cell at ``position``"""
+        i = self.index(position)
+        if i is None or not self.blocked[i]:
+            return
+        self.blocked[i] = False
+        self.neighbors[i] = self._open_neighbors(i)
+        for direction, neighbor in self.neighbors[i]:
+            self.neighbors[neighbor] = self._open_neighbors(neighbor)
+        # Distances can only shrink, outward from the opening
+        for distances in [self.distance] + list(self._from.values()):
+            reachable = [
+                (distances[neighbor], direction, neighbor)
+                for direction, neighbor in self.neighbors[i]
+                if distances[neighbor] is not None
+            ]
+            if not reachable:
+                continue
+            d, direction, neighbor = min(reachable)
+            distances[i] = d + 1
+            if distances is self.distance:
+                self.source[i] = self.source[neighbor]
+                self.toward[i] = direction
+            self._spread(distances, i)
+        self.walls = self.walls - frozenset([tuple(position)])
+        self._paths = collections.OrderedDict()
+
+    def with_walls(self, walls):
+        """A field like this one with ``walls``, built from it by adding and
+        removing the walls that differ"""
+        walls = frozenset(tuple(w) for w in walls)
+        if walls == self.walls:
+            return self
+        field = self.copy()
+        for position in self.walls - walls:
+            field.remove_wall(position)
+        for position in walls - self.walls:
+            field.add_wall(position)
+        field.walls = walls
+        return field
+
+    def nearest(self, position):
+        """The distance to the nearest source and its position, or
+        (None, None) if none can be reached"""
+        i = self.index(position)
+        if i is None or self.distance[i] is None:
+            return None, None
+        return self.distance[i], self.position(self.source[i])
+
+    def step(self, position):
+        """The direction of the first step toward the nearest source, or None"""
+        i = self.index(position)
+        return None if i is None else self.toward[i]
+
+    def distances_from(self, position):
+        """The distance of every cell from ``position``, None where it can't
+        be reached"""
+        i = self.index(position)
+        if i in self._from:
+            return self._from[i]
+        distances = self._paths.pop(i, None)
+        if distances is None:
+            distances = [None] * (self.rows * self.columns)
+            if i is not None and not self.blocked[i]:
+                distances[i] = 0
+                self._spread(distances, i)
+        if i in self.sources:
+            self._from[i] = distances
+        else:
+            while len(self._paths) >= self.paths_cached:
+                self._paths.popitem(last=False)
+            self._paths[i] = distances
+        return distances
+
+    def path(self, origin, endpoint):
+        """The distance from ``origin`` to ``endpoint`` and the directions
+        of a shortest path, or (None, '') if there is none"""
+        i = self.index(origin)
+        if i is None:
+            return None, ''
+        distances = self.distances_from(endpoint)
+        d = distances[i]
+        if d is None:
+            return None, ''
+        directions = []
+        for remaining in range(d - 1, -1, -1):
+            for direction, neighbor in self.neighbors[i]:
+                if distances[neighbor] == remaining:
+                    directions.append(direction)
+                    i = neighbor
+                    break
+        return d, ''.join(directions)
@@ -2,6 +2,18 @@ import numpy
 import random
 
 
+def _streams(kwargs):
+    """The Python and NumPy generators a distribution should draw from.
+
+    Distributions take an optional ``rng`` keyword argument, a stream from
+    `dlgr.griduniverse.rng`, and use the global random state without one.
+    """
+    rng = kwargs.get('rng')
+    if rng is None:
+        return random, numpy.random
+    return rng, rng.numpy
+
+
 def _is_valid_boundary(rows, columns, row, column):
     """Truncate random sample"""
     if row < rows and row >= 0 and column < columns and column >= 0:
@@ -9,14 +21,16 @@ def _is_valid_boundary(rows, columns, row, column):
     return False
 
 
-def random_probability_distribution(rows, columns, *args):
+def random_probability_distribution(rows, columns, *args, **kwargs):
     """A probability distribution function always returns a [row, column] pair."""
-    row = random.randint(0, rows - 1)
-    column = random.randint(0, columns - 1)
+    rng, nprng = _streams(kwargs)
+    row = rng.randint(0, rows - 1)
+    column = rng.randint(0, columns - 1)
     return [row, column]
 
 
-def sinusoidal_probability_distribution(rows, columns, *args):
+def sinusoidal_probability_distribution(rows, columns, *args, **kwargs):
+    nprng = _streams(kwargs)[1]
     frequency = 10
     if len(args):
         try:
@@ -26,60 +40,64 @@ def sinusoidal_probability_distribution(rows, columns, *args):
     grid = numpy.tile(numpy.linspace(0, 1, columns), (rows, 1))
     p = 0.5 + 0.5 * numpy.sin(frequency * grid)
     p = p / numpy.sum(p)
-    value = numpy.random.choice(rows * columns, p=p.flatten())
+    value = nprng.choice(rows * columns, p=p.flatten())
     row = value / columns
     column = value - (row * columns)
     return [int(row), int(column)]
 
 
-def horizontal_gradient_probability_distribution(rows, columns, *args):
+def horizontal_gradient_probability_distribution(rows, columns, *args, **kwargs):
     """Vertical gradient on the x axis"""
+    rng, nprng = _streams(kwargs)
     size = columns - 1
-    column = random.randint(0, size)
-    row = random.triangular(0, size, size)
+    column = rng.randint(0, size)
+    row = rng.triangular(0, size, size)
     return [int(row), int(column)]
 
 
-def vertical_gradient_probability_distribution(rows, columns, *args):
+def vertical_gradient_probability_distribution(rows, columns, *args, **kwargs):
     """Vertical gradient on the y axis"""
+    rng, nprng = _streams(kwargs)
     size = rows - 1
-    row = random.randint(0, size)
-    column = random.triangular(0, size, size)
+    row = rng.randint(0, size)
+    column = rng.triangular(0, size, size)
     return [int(row), int(column)]
 
 
-def edge_bias_probability_distribution(rows, columns, *args):
+def edge_bias_probability_distribution(rows, columns, *args, **kwargs):
     """Do the inverse to a normal distribution """
+    rng, nprng = _streams(kwargs)
     mu = rows / 2  # mean
     sigma = 15  # standard deviation
-    row = numpy.random.normal(mu, sigma)
-    column = numpy.random.normal(mu, sigma)
+    row = nprng.normal(mu, sigma)
+    column = nprng.normal(mu, sigma)
     valid = False
     while not valid:
         if row > mu and column > mu:
-            row = (mu + numpy.random.normal(mu, sigma))
-            column = random.randint(0, columns - 1)
+            row = (mu + nprng.normal(mu, sigma))
+            column = rng.randint(0, columns - 1)
         elif row > mu and column < mu:
-            row = abs(numpy.random.normal(mu, sigma) - mu)
-            column = random.randint(0, columns - 1)
+            row = abs(nprng.normal(mu, sigma) - mu)
+            column = rng.randint(0, columns - 1)
         elif row < mu and column > mu:
-            column = mu + numpy.random.normal(mu, sigma)
-            row = random.randint(0, columns - 1)
+            column = mu + nprng.normal(mu, sigma)
+            row = rng.randint(0, columns - 1)
         else:
-            column = abs(numpy.random.normal(mu, sigma) - mu)
-            row = random.randint(0, columns - 1)
+            column = abs(nprng.normal(mu, sigma) - mu)
+            row = rng.randint(0, columns - 1)
         valid = _is_valid_boundary(rows, columns, row, column)
     return [int(row), int(column)]
 
 
-def center_bias_probability_distribution(rows, columns, *args):
+def center_bias_probability_distribution(rows, columns, *args, **kwargs):
     """Do normal distribution in two dimensions"""
+    nprng = _streams(kwargs)[1]
     mu = rows / 2  # mean
     sigma = 15  # standard deviation
     valid = False
     while not valid:
-        row = numpy.random.normal(mu, sigma)
-        column = numpy.random.normal(mu, sigma)
+        row = nprng.normal(mu, sigma)
+        column = nprng.normal(mu, sigma)
         # Create some cutoff for values
         valid = _is_valid_boundary(rows, columns, row, column)
     return [int(row), int(column)]
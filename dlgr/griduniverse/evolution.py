@@ -0,0 +1,232 @@
+"""Evolutionary search over Griduniverse parameters.
+
+An `Evolution` breeds populations of genomes, configurations of the genes
+it is given, keeping the fittest of each generation (elitism) and picking
+parents by tournament. Each generation is scored at once by an evaluator:
+`SimulationEvaluator` plays it in parallel with bots, in virtual time, and
+`DeploymentEvaluator` runs real experiments.
+
+    >>> from dlgr.griduniverse.evolution import Evolution, SimulationEvaluator
+    >>> evaluator = SimulationEvaluator(bot_policy='FoodSeekingBot',
+    ...                                 time_per_round=60.0)
+    >>> evolution = Evolution(evaluator, population_size=20,
+    ...                       checkpoint='evolution.json', seed=1)
+    >>> best = evolution.run(generations=10)
+
+With a checkpoint file, the population and its fitness are saved after
+every generation, and a run continues from the last generation saved.
+"""
+import json
+import logging
+import os
+import random
+from multiprocessing.pool import ThreadPool
+
+from .experiment import GU_PARAMS
+from .rng import derive_seed
+from .sweep import Sweep
+
+logger = logging.getLogger('griduniverse')
+
+
+#: Samplers for the genes explored by demos/iec_demo.py
+GENES = {
+    'time_per_round': lambda rng: max(int(rng.gauss(100, 15)), 10),
+    'num_food': lambda rng: max(int(rng.gauss(12, 2)), 0),
+    'respawn_food': lambda rng: bool(rng.getrandbits(1)),
+    'rows': lambda rng: max(int(rng.gauss(40, 5)), 5),
+    'columns': lambda rng: max(int(rng.gauss(40, 5)), 5),
+    'walls_density': lambda rng: rng.betavariate(2, 2),
+    'walls_contiguity': lambda rng: rng.betavariate(2, 2),
+    'motion_speed_limit': lambda rng: max(rng.gauss(12, 5), 1.0),
+    'motion_auto': lambda rng: bool(rng.getrandbits(1)),
+}
+
+
+class SimulationEvaluator(object):
+    """Scores genomes by playing simulated games with them.
+
+    Keyword arguments are parameters shared by every game. The fitness of
+    a genome is ``metric`` averaged over ``repeats`` games, played in a
+    `Sweep` with ``processes`` workers and the optional ``cache``.
+    """
+
+    def __init__(self, metric='average_payoff', repeats=1, processes=None,
+                 cache=None, **fixed):
+        self.metric = metric
+        self.repeats = repeats
+        self.processes = processes
+        self.cache = cache
+        self.fixed = fixed
+
+    def __call__(self, genomes):
+        rows = Sweep(
+            genomes,
+            repeats=self.repeats,
+            processes=self.processes,
+            cache=self.cache,
+            **self.fixed
+        ).run()
+        fitness = []
+        for i in range(len(genomes)):
+            games = rows[i * self.repeats:(i + 1) * self.repeats]
+            fitness.append(sum(row[self.metric] for row in games) / float(len(games)))
+        return fitness
+
+
+class DeploymentEvaluator(object):
+    """Scores genomes by running an experiment with each of them.
+
+    ``metric`` takes the experiment and the data of a run and returns its
+    fitness, by default the average payoff. Keyword arguments are passed to
+    every `run`. Up to ``concurrency`` experiments run at once; only raise it
+    for modes that can run experiments side by side, such as sandbox.
+    """
+
+    def __init__(self, experiment, metric=None, concurrency=1, **run_kwargs):
+        self.experiment = experiment
+        self.metric = metric or (lambda exp, data: exp.average_payoff(data))
+        self.concurrency = concurrency
+        self.run_kwargs = run_kwargs
+
+    def evaluate(self, genome):
+        data = self.experiment.run(**dict(self.run_kwargs, **genome))
+        return self.metric(self.experiment, data)
+
+    def __call__(self, genomes):
+        if self.concurrency == 1:
+            return [self.evaluate(genome) for genome in genomes]
+        pool = ThreadPool(self.concurrency)
+        try:
+            return pool.map(self.evaluate, genomes)
+        finally:
+            pool.close()
+
+
+class Evolution(object):
+    """Evolves genomes toward the highest fitness.
+
+    ``genes`` maps parameter names to functions drawing a value from a
+    `random.Random`. The ``elitism`` fittest genomes pass to the next
+    generation unchanged; every other genome is bred from two parents, each
+    the fittest of ``tournament_size`` genomes drawn at random, taking each
+    gene from either parent and redrawing it with ``mutation_rate``.
+    """
+
+    def __init__(self, evaluator, genes=None, population_size=10, elitism=1,
+                 tournament_size=3, mutation_rate=0.1, checkpoint=None,
+                 seed=None):
+        self.evaluator = evaluator
+        self.genes = genes or GENES
+        unknown = sorted(set(self.genes) - set(GU_PARAMS))
+        if unknown:
+            raise ValueError('Unknown parameters: {}'.format(', '.join(unknown)))
+        self.population_size = population_size
+        self.elitism = elitism
+        self.tournament_size = tournament_size
+        self.mutation_rate = mutation_rate
+        self.checkpoint = checkpoint
+        self.seed = random.randrange(2 ** 31) if seed is None else seed
+        self.generation = -1
+        self.population = []
+        self.fitness = []
+        self.history = []
+
+    def _rng(self, generation):
+        # Seeded per generation, so that a resumed run breeds as it would have
+        return random.Random(derive_seed(self.seed, 'generation {}'.format(generation)))
+
+    def random_genome(self, rng):
+        return dict((name, self.genes[name](rng)) for name in sorted(self.genes))
+
+    def tournament(self, rng):
+        """The fittest of ``tournament_size`` genomes drawn at random"""
+        contenders = rng.sample(
+            range(len(self.population)),
+            min(self.tournament_size, len(self.population)),
+        )
+        return self.population[max(contenders, key=lambda i: self.fitness[i])]
+
+    def breed(self, rng):
+        """A child of two parents picked by tournament"""
+        mother = self.tournament(rng)
+        father = self.tournament(rng)
+        child = {}
+        for name in sorted(self.genes):
+            if rng.random() < self.mutation_rate:
+                child[name] = self.genes[name](rng)
+            else:
+                child[name] = rng.choice((mother, father))[name]
+        return child
+
+    def next_population(self, rng):
+        if not self.population:
+            return [self.random_genome(rng) for i in range(self.population_size)]
+        ranked = sorted(
+            range(len(self.population)),
+            key=lambda i: self.fitness[i],
+            reverse=True,
+        )
+        population = [self.population[i] for i in ranked[:self.elitism]]
+        while len(population) < self.population_size:
+            population.append(self.breed(rng))
+        return population
+
+    def step(self):
+        """Breed and evaluate the next generation"""
+        generation = self.generation + 1
+        population = self.next_population(self._rng(generation))
+        fitness = list(self.evaluator(population))
+        self.generation = generation
+        self.population = population
+        self.fitness = fitness
+        self.history.append({
+            'generation': generation,
+            'best_fitness': max(fitness),
+            'mean_fitness': sum(fitness) / float(len(fitness)),
+            'best': self.best,
+        })
+        logger.info('Generation {}: best fitness {}'.format(generation, max(fitness)))
+        self.save()
+
+    @property
+    def best(self):
+        """The fittest genome of the last generation"""
+        if not self.population:
+            return None
+        return self.population[max(range(len(self.fitness)), key=lambda i: self.fitness[i])]
+
+    def run(self, generations):
+        """Evolve until ``generations`` generations have been evaluated"""
+        self.load()
+        while self.generation + 1 < generations:
+            self.step()
+        return self.best
+
+    def save(self):
+        if not self.checkpoint:
+            return
+        state = {
+            'seed': self.seed,
+            'generation': self.generation,
+            'population': self.population,
+            'fitness': self.fitness,
+            'history': self.history,
+        }
+        # Replace the checkpoint in one step, so a crash never leaves half of it
+        partial = self.checkpoint + '.partial'
+        with open(partial, 'w') as checkpoint:
+            json.dump(state, checkpoint)
+        os.rename(partial, self.checkpoint)
+
+    def load(self):
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return
+        with open(self.checkpoint) as checkpoint:
+            state = json.load(checkpoint)
+        self.seed = state['seed']
+        self.generation = state['generation']
+        self.population = state['population']
+        self.fitness = state['fitness']
+        self.history = state['history']
+        logger.info('Resuming evolution after generation {}'.format(self.generation))
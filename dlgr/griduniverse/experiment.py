@@ -1,12 +1,13 @@
 """The Griduniverse."""
 
+import collections
 import datetime
 import flask
-import gevent
 import itertools
 import json
 import logging
 import math
+import numpy
 import random
 import string
 import time
@@ -28,8 +29,16 @@ from dallinger.config import get_config
 from dallinger.experiment import Experiment
 
 from . import distributions
+from . import wire
+from .clock import WallClock
+from .clock import clock_for
+from .labyrinths import LabyrinthCache
+from .rng import RandomStreams
+from .rng import Stream
+from .rng import derive_seed
 from .maze import Wall
 from .maze import labyrinth
+from .spatial import SpatialHash
 from .bots import Bot
 from .models import Event
 
@@ -121,6 +130,12 @@ GU_PARAMS = {
     'donation_multiplier': float,
     'num_recruits': int,
     'state_interval': float,
+    'interest_management': bool,
+    'inbound_batch_interval': float,
+    'clock_speed': float,
+    'seed': int,
+    'labyrinth_seed': int,
+    'labyrinth_cache': unicode,
 }
 
 
@@ -142,12 +157,207 @@ formatter = PluralFormatter()
 def softmax(vector, temperature=1):
     """The softmax activation function."""
     vector = [math.pow(x, temperature) for x in vector]
-    if sum(vector):
-        return [float(x) / sum(vector) for x in vector]
+    total = sum(vector)
+    if total:
+        return [float(x) / total for x in vector]
     else:
         return [float(len(vector)) for _ in vector]
 
 
+def group_scores(scores, color_idx, num_groups):
+    """The total score of each group, indexed by color, added up in player
+    order."""
+    return numpy.bincount(color_idx, weights=scores, minlength=num_groups)
+
+
+def group_payoffs(scores, color_idx, num_groups, intragroup_competition,
+                  intergroup_competition, dollars_per_point):
+    """Payoffs of players from their scores, as arrays ordered by player.
+
+    See `Gridworld.compute_payoffs`.
+    """
+    # Totals are recounted every time: running sums drift below zero
+    totals = group_scores(scores, color_idx, num_groups)
+    total_payoff = sum(scores.tolist())
+    powered = numpy.power(scores, intragroup_competition)
+    group_totals = numpy.bincount(
+        color_idx, weights=powered, minlength=num_groups
+    )[color_idx]
+    # Like `softmax`, a group with no points splits them by its size
+    group_sizes = numpy.bincount(color_idx, minlength=num_groups)[color_idx]
+    intra_proportions = numpy.where(
+        group_totals != 0,
+        powered / numpy.where(group_totals != 0, group_totals, 1),
+        group_sizes.astype(float),
+    )
+    inter_proportions = numpy.array(softmax(
+        totals.tolist(), temperature=intergroup_competition
+    ))
+    payoffs = total_payoff * intra_proportions
+    payoffs *= inter_proportions[color_idx]
+    payoffs *= dollars_per_point
+    return payoffs
+
+
+class SnapshotSection(object):
+    """One section of a serialized grid, JSON encoded on first use."""
+
+    def __init__(self, data, version):
+        self.data = data
+        self.version = version
+        self._encoded = None
+        self._indexes = {}
+
+    @property
+    def encoded(self):
+        if self._encoded is None:
+            self._encoded = json.dumps(self.data)
+        return self._encoded
+
+    @cached_property
+    def encoded_records(self):
+        """The JSON encoding of each record, for views of the section"""
+        return [json.dumps(record) for record in self.data]
+
+    @cached_property
+    def packed(self):
+        """The section in the `packed` state format"""
+        return wire.pack_section(self.data)
+
+    @cached_property
+    def record_ids(self):
+        return dict((record['id'], i) for i, record in enumerate(self.data))
+
+    def within(self, bounds, cell_size):
+        """The indexes of the records positioned within ``bounds``, which
+        are (top, left, bottom, right)"""
+        index = self._indexes.get(cell_size)
+        if index is None:
+            index = self._indexes[cell_size] = SpatialHash(
+                range(len(self.data)), cell_size=cell_size,
+                position=lambda i: self.data[i]['position']
+            )
+        return index.within(*bounds)
+
+
+class SectionView(object):
+    """The records of a snapshot section at the given indexes."""
+
+    def __init__(self, section, indexes):
+        self.section = section
+        self.indexes = indexes
+        self.version = section.version
+
+    @property
+    def data(self):
+        return [self.section.data[i] for i in self.indexes]
+
+    @property
+    def encoded(self):
+        records = self.section.encoded_records
+        return '[' + ', '.join(records[i] for i in self.indexes) + ']'
+
+    @property
+    def packed(self):
+        return wire.pack_section(self.data)
+
+
+class GridSnapshot(object):
+    """The state of a Gridworld at one tick of the game loop.
+
+    Snapshots must not be modified once taken. Sections that did not change
+    since the previous snapshot are shared with it, together with their JSON
+    and packed encodings, so the broadcaster and the database writer can both use a
+    snapshot without walking or encoding the grid again.
+    """
+
+    def __init__(self, version, header, sections, wall_log):
+        self.version = version
+        self._header = header
+        self._sections = sections
+        self._wall_log = wall_log
+
+    def section_version(self, name):
+        """A number that changes whenever the named section changes"""
+        return self._sections[name].version
+
+    def walls_since(self, version):
+        """The serialized walls built after walls ``version``.
+
+        Returns None if the walls were replaced since then, in which case
+        they have to be sent in full.
+        """
+        base_version, added = self._wall_log
+        if version < base_version:
+            return None
+        return added[version - base_version:self.section_version('walls') - base_version]
+
+    def view(self, bounds, player_id=None, cell_size=8):
+        """A snapshot of the players and food within ``bounds``, which are
+        (top, left, bottom, right), and of player ``player_id`` wherever it
+        is.
+
+        Records are looked up in a spatial index of ``cell_size`` cells
+        that is kept with its section, and are encoded once for all views.
+        """
+        players = self._sections['players']
+        visible = players.within(bounds, cell_size)
+        own = players.record_ids.get(player_id)
+        if own is not None and own not in visible:
+            visible = sorted(visible + [own])
+        food = self._sections['food']
+        sections = dict(
+            self._sections,
+            players=SectionView(players, visible),
+            food=SectionView(food, food.within(bounds, cell_size)),
+        )
+        return GridSnapshot(self.version, self._header, sections, self._wall_log)
+
+    def _items(self, include_walls, include_food, walls_added):
+        items = [('players', self._sections['players'])]
+        items.extend(self._header)
+        if include_walls:
+            items.append(('walls', self._sections['walls']))
+        elif walls_added:
+            items.append(('walls_added', walls_added))
+        if include_food:
+            items.append(('food', self._sections['food']))
+        return items
+
+    def serialize(self, include_walls=True, include_food=True, walls_added=None):
+        """Return the state as `Gridworld.serialize` would have.
+
+        ``walls_added`` is included when the walls themselves are not.
+        """
+        return dict(
+            (key, value.data if isinstance(value, (SnapshotSection, SectionView)) else value)
+            for key, value in self._items(include_walls, include_food, walls_added)
+        )
+
+    def encode(self, include_walls=True, include_food=True, walls_added=None):
+        """Return ``json.dumps(self.serialize(...))``, reusing cached parts."""
+        parts = []
+        for key, value in self._items(include_walls, include_food, walls_added):
+            if isinstance(value, (SnapshotSection, SectionView)):
+                value = value.encoded
+            else:
+                value = json.dumps(value)
+            parts.append('{}: {}'.format(json.dumps(key), value))
+        return '{' + ', '.join(parts) + '}'
+
+    def pack(self, include_walls=True, include_food=True, walls_added=None):
+        """Return ``wire.pack_grid(self.serialize(...))``, reusing the packed
+        sections cached with the snapshot."""
+        packed = {}
+        for key, value in self._items(include_walls, include_food, walls_added):
+            if isinstance(value, (SnapshotSection, SectionView)):
+                value = value.packed
+            elif key == 'walls_added':
+                value = wire.pack_section(value)
+            packed[key] = value
+        return packed
+
+
 class Gridworld(object):
     """A Gridworld in the Griduniverse."""
     player_color_names = [
@@ -174,8 +384,20 @@ class Gridworld(object):
     food_locations = None
     walls_updated = True
     food_updated = True
+    snapshot_version = 0
+    walls_version = 0
+    players_version = 0
+    food_version = 0
+
+    #: Cells further than this many multiples of ``visibility`` from a player
+    #: are rendered at about 1% brightness by the client's Gaussian mask, so
+    #: they are left out of that player's view of the grid.
+    visibility_cutoff = 3
 
     def __new__(cls, **kwargs):
+        if not kwargs.get('singleton', True):
+            # A grid of its own, e.g. for a simulation
+            return super(Gridworld, cls).__new__(cls)
         if not hasattr(cls, 'instance'):
             cls.instance = super(Gridworld, cls).__new__(cls)
         return cls.instance
@@ -186,6 +408,8 @@ class Gridworld(object):
             return
 
         self.log_event = kwargs.get('log_event', lambda x: None)
+        self.clock = kwargs.get('clock') or WallClock()
+        self.rng = RandomStreams(kwargs.get('seed'))
 
         # Players
         self.num_players = kwargs.get('max_participants', 3)
@@ -210,6 +434,7 @@ class Gridworld(object):
         self.visibility_ramp_time = kwargs.get('visibility_ramp_time', 4)
         self.background_animation = kwargs.get('background_animation', True)
         self.player_overlap = kwargs.get('player_overlap', False)
+        self.interest_management = kwargs.get('interest_management', False)
 
         # Motion
         self.motion_speed_limit = kwargs.get('motion_speed_limit', 8)
@@ -242,7 +467,15 @@ class Gridworld(object):
         self.walls_contiguity = kwargs.get('walls_contiguity', 1.0)
         self.build_walls = kwargs.get('build_walls', False)
         self.wall_building_cost = kwargs.get('wall_building_cost', 0)
+        self.labyrinth_seed = kwargs.get('labyrinth_seed', None)
+        if self.labyrinth_seed is not None:
+            # Shared by every game of a condition, whatever their own seeds
+            self.rng.maze = Stream(derive_seed(self.labyrinth_seed, 'maze'))
+        self.labyrinth_cache = kwargs.get('labyrinth_cache', None)
         self.wall_locations = {}
+        # Walls built since wall_locations was last replaced, one per version
+        self._walls_base_version = self.walls_version
+        self._walls_added = []
 
         # Payoffs
         self.initial_score = kwargs.get('initial_score', 0)
@@ -299,6 +532,10 @@ class Gridworld(object):
 
         # Set some variables.
         self.players = {}
+        self._payoffs_stale = True
+        self._snapshot = None
+        self._snapshot_sections = {}
+        self._food_matures_at = None
         self.food_locations = {}
         self.food_consumed = []
         self.start_timestamp = kwargs.get('start_timestamp', None)
@@ -310,11 +547,11 @@ class Gridworld(object):
 
         if self.contagion_hierarchy:
             self.contagion_hierarchy = range(self.num_colors)
-            random.shuffle(self.contagion_hierarchy)
+            self.rng.identity.shuffle(self.contagion_hierarchy)
 
         if self.costly_colors:
             self.color_costs = [2**i for i in range(self.num_colors)]
-            random.shuffle(self.color_costs)
+            self.rng.identity.shuffle(self.color_costs)
 
         # get food spawning probability distribution function and args
         self.food_probability_info = {}
@@ -351,7 +588,7 @@ class Gridworld(object):
     def elapsed_round_time(self):
         if self.start_timestamp is None:
             return 0
-        return time.time() - self.start_timestamp
+        return self.clock.time() - self.start_timestamp
 
     @property
     def remaining_round_time(self):
@@ -429,13 +666,103 @@ class Gridworld(object):
             if self.game_over:
                 return
 
-            self.start_timestamp = time.time()
+            self.start_timestamp = self.clock.time()
             # Delay round for leaderboard display
             if self.leaderboard_individual or self.leaderboard_group:
                 self.start_timestamp += self.leaderboard_time
             for player in self.players.values():
                 player.motion_timestamp = 0
 
+    def step(self, timed_events=False):
+        """Apply the game rules for one tick of the game loop.
+
+        Food growth, tax and frequency-dependent payoffs only apply when
+        ``timed_events`` is set, which the game loop does once a second.
+        """
+        if self.motion_auto:
+            self.auto_move()
+
+        if self.consumption_active:
+            self.consume()
+
+        if self.contagion > 0:
+            self.spread_contagion()
+
+        if timed_events:
+            self.grow_food()
+            self.replenish_food()
+            self.prune_excess_food()
+            self.apply_tax()
+            if self.frequency_dependence:
+                self.apply_frequency_dependent_payoff()
+
+        self.compute_payoffs()
+
+    def auto_move(self):
+        """Move every player one step in its current direction."""
+        for player in self.players.values():
+            try:
+                player.move(player.motion_direction, tremble_rate=0)
+            except IllegalMove:
+                pass
+
+    def grow_food(self):
+        """Grow or shrink the number of food items the grid should hold."""
+        # Alternate positive and negative growth rates
+        seasonal_growth = (
+            self.seasonal_growth_rate **
+            (-1 if self.round % 2 else 1)
+        )
+
+        # Compute how many food items we should have on the grid,
+        # ensuring it's not less than zero.
+        self.num_food = max(min(
+            self.num_food *
+            self.food_growth_rate *
+            seasonal_growth,
+            self.rows * self.columns,
+        ), 0)
+
+    def replenish_food(self):
+        """Spawn food until the grid holds `num_food` items."""
+        for i in range(int(round(self.num_food) - len(self.food_locations))):
+            self.spawn_food()
+
+    def prune_excess_food(self):
+        """Remove food at random until the grid holds `num_food` items."""
+        for i in range(len(self.food_locations) - int(round(self.num_food))):
+            position = self.rng.food.choice(list(self.food_locations.keys()))
+            del self.food_locations[position]
+            self.food_changed()
+
+    def apply_tax(self):
+        for player in self.players.values():
+            player.score = max(player.score - self.tax, 0)
+
+    def color_abundances(self):
+        """The number of players of each color."""
+        abundances = {}
+        for player in self.players.values():
+            if player.color not in abundances:
+                abundances[player.color] = 0
+            abundances[player.color] += 1
+        return abundances
+
+    def apply_frequency_dependent_payoff(self):
+        """Reward or penalize players depending on how common their color is."""
+        abundances = self.color_abundances()
+        for player in self.players.values():
+            relative_frequency = (
+                1.0 * abundances[player.color] / len(self.players)
+            )
+            payoff = fermi(
+                beta=self.frequency_dependence,
+                p1=relative_frequency,
+                p2=0.5
+            ) * self.frequency_dependent_payoff_rate
+
+            player.score = max(player.score + payoff, 0)
+
     def compute_payoffs(self):
         """Compute payoffs from scores.
 
@@ -455,61 +782,107 @@ class Gridworld(object):
         within a group that score in a 2:1 ratio will get payoff in a 4:1
         ratio, and therefore it pays to be a group's highest-scoring member.
         """
-        players = self.players.values()
-        player_groups = {}
-        total_payoff = 0
-        group_scores = []
-        for p in players:
-            group_info = player_groups.setdefault(
-                p.color_idx, {'players': [], 'scores': [], 'total': 0}
-            )
-            group_info['players'].append(p)
-            group_info['scores'].append(p.score)
-            group_info['total'] += p.score
-            total_payoff += p.score
-
-        for g in range(len(self.player_colors)):
-            group_info = player_groups.get(g)
-            if not group_info:
-                group_scores.append(0)
-                continue
-            ingroup_players = group_info['players']
-            ingroup_scores = group_info['scores']
-            group_scores.append(group_info['total'])
-            intra_proportions = softmax(
-                ingroup_scores,
-                temperature=self.intragroup_competition,
+        if not self._payoffs_stale:
+            return
+        players = list(self.players.values())
+        if players:
+            payoffs = group_payoffs(
+                numpy.array([p.score for p in players], dtype=float),
+                numpy.array([p.color_idx for p in players], dtype=int),
+                len(self.player_colors),
+                self.intragroup_competition,
+                self.intergroup_competition,
+                self.dollars_per_point,
             )
-            for i, player in enumerate(ingroup_players):
-                player.payoff = total_payoff * intra_proportions[i]
+            for player, payoff in zip(players, payoffs.tolist()):
+                player.payoff = payoff
+        self._payoffs_stale = False
 
-        inter_proportions = softmax(
-            group_scores,
-            temperature=self.intergroup_competition,
-        )
-        for player in players:
-            player.payoff *= inter_proportions[player.color_idx]
-            player.payoff *= self.dollars_per_point
+    @property
+    def group_scores(self):
+        """The total score of each group, indexed by color"""
+        players = list(self.players.values())
+        return group_scores(
+            numpy.array([p.score for p in players], dtype=float),
+            numpy.array([p.color_idx for p in players], dtype=int),
+            len(self.player_colors),
+        ).tolist()
+
+    def players_changed(self):
+        """Mark the players for serializing again in the next snapshot.
+
+        Players call this when an attribute in their `serialize` changes;
+        call it after replacing `players` directly.
+        """
+        self.players_version += 1
+
+    def food_changed(self):
+        """Mark the food for serializing again, and for logging."""
+        self.food_updated = True
+        self.food_version += 1
+
+    def scores_changed(self):
+        """Mark payoffs for recomputation after a score or group changes.
+
+        Call this after replacing `players` directly.
+        """
+        self._payoffs_stale = True
 
     def build_labyrinth(self):
         if self.walls_density and not self.wall_locations:
             start = time.time()
             logger.info('Building labyrinth:')
-            walls = labyrinth(
-                columns=self.columns,
-                rows=self.rows,
-                density=self.walls_density,
-                contiguity=self.walls_contiguity,
-            )
+            seed = self.labyrinth_seed
+            if seed is None:
+                seed = self.rng.seed
+            if self.labyrinth_cache and seed is not None:
+                cache = LabyrinthCache(self.labyrinth_cache)
+                try:
+                    walls = cache.fetch(
+                        rows=self.rows,
+                        columns=self.columns,
+                        density=self.walls_density,
+                        contiguity=self.walls_contiguity,
+                        seed=seed,
+                    )
+                finally:
+                    cache.close()
+            else:
+                walls = labyrinth(
+                    columns=self.columns,
+                    rows=self.rows,
+                    density=self.walls_density,
+                    contiguity=self.walls_contiguity,
+                    rng=self.rng.maze,
+                )
             logger.info('Built {} walls in {} seconds.'.format(
                 len(walls), time.time() - start
             ))
-            self.wall_locations = {tuple(w.position): w for w in walls}
+            self.set_walls(walls)
+
+    def set_walls(self, walls):
+        """Replace all of the walls."""
+        self.wall_locations = {tuple(w.position): w for w in walls}
+        self.walls_version += 1
+        self._walls_base_version = self.walls_version
+        self._walls_added = []
+        self.walls_updated = True
+
+    def add_wall(self, wall):
+        """Add a wall built during the game.
+
+        Walls should only change through this method or `set_walls`, which
+        keep track of the version used to cache the serialized walls.
+        """
+        self.wall_locations[tuple(wall.position)] = wall
+        self.walls_version += 1
+        self._walls_added.append(wall.serialize())
+        self.walls_updated = True
 
     def _start_if_ready(self):
         # Don't start unless we have a least one player
         if self.players and not self.game_started:
-            self.start_timestamp = time.time()
+            self.start_timestamp = self.clock.time()
 
     @property
     def game_started(self):
@@ -526,6 +899,7 @@ class Gridworld(object):
             "donation_active": self.donation_active,
             "rows": self.rows,
             "columns": self.columns,
+            "walls_version": self.walls_version,
         }
 
         if include_walls:
@@ -535,6 +909,91 @@ class Gridworld(object):
 
         return grid_data
 
+    def take_snapshot(self):
+        """Take a snapshot of the current state, for a new tick."""
+        self.snapshot_version += 1
+        header = [
+            ('round', self.round),
+            ('donation_active', self.donation_active),
+            ('rows', self.rows),
+            ('columns', self.columns),
+            ('walls_version', self.walls_version),
+        ]
+        if self._food_matures_at is not None and self.clock.time() >= self._food_matures_at:
+            # Some food looks riper now
+            self.food_version += 1
+        # Sections are only serialized again once they have changed
+        sections = {
+            'players': self._snapshot_section(
+                'players', self.players_version,
+                lambda: [p.serialize() for p in self.players.values()]
+            ),
+            'walls': self._snapshot_section(
+                'walls', self.walls_version,
+                lambda: [w.serialize() for w in self.wall_locations.values()]
+            ),
+            'food': self._snapshot_section('food', self.food_version, self._serialize_food),
+        }
+        self._snapshot = GridSnapshot(
+            self.snapshot_version, header, sections,
+            (self._walls_base_version, self._walls_added)
+        )
+        return self._snapshot
+
+    def snapshot(self):
+        """The latest snapshot, taking one if there is none yet."""
+        if self._snapshot is None:
+            return self.take_snapshot()
+        return self._snapshot
+
+    def _snapshot_section(self, name, version, serialize):
+        section = self._snapshot_sections.get(name)
+        if section is None or section.version != version:
+            section = SnapshotSection(serialize(), version)
+        self._snapshot_sections[name] = section
+        return section
+
+    def _serialize_food(self):
+        food = [f.serialize() for f in self.food_locations.values()]
+        changes = [f.next_change() for f in self.food_locations.values()]
+        changes = [t for t in changes if t is not None]
+        self._food_matures_at = min(changes) if changes else None
+        return food
+
+    @property
+    def view_reach(self):
+        """How many cells away from a player the visibility mask reaches"""
+        return int(math.ceil(self.visibility * self.visibility_cutoff))
+
+    @property
+    def view_cell_size(self):
+        """The cell size of the spatial indexes that views are looked up in,
+        about half as wide as a view"""
+        width = min(self.window_rows, self.window_columns, 2 * self.view_reach + 1)
+        return max(1, width // 2)
+
+    def view_bounds(self, player):
+        """Return the (top, left, bottom, right) cells visible to a player.
+
+        The window is placed the way the client places it, centered on the
+        player and clamped to the grid, and is then narrowed to the part of
+        the grid that the visibility mask does not black out.
+        """
+        row, column = player.position
+        top = max(0, min(self.rows - self.window_rows, row - self.window_rows // 2))
+        left = max(0, min(self.columns - self.window_columns,
+                          column - self.window_columns // 2))
+        bottom = top + self.window_rows - 1
+        right = left + self.window_columns - 1
+
+        reach = self.view_reach
+        return (
+            max(top, row - reach),
+            max(left, column - reach),
+            min(bottom, row + reach),
+            min(right, column + reach),
+        )
+
     def deserialize(self, state):
         if self.rows != state['rows'] or self.columns != state['columns']:
             raise ValueError(
@@ -555,20 +1014,27 @@ class Gridworld(object):
                 **player_state
             )
             self.players[player.id] = player
+        self.players_changed()
+        self.scores_changed()
 
         if 'walls' in state:
-            self.wall_locations = {}
+            walls = []
             for wall_state in state['walls']:
                 if isinstance(wall_state, list):
                     wall_state = {'position': wall_state}
-                wall = Wall(**wall_state)
-                self.wall_locations[tuple(wall.position)] = wall
+                walls.append(Wall(**wall_state))
+            self.set_walls(walls)
 
         if 'food' in state:
             self.food_locations = {}
             for food_state in state['food']:
-                food = Food(maturation_speed=self.food_maturation_speed, **food_state)
+                food = Food(
+                    maturation_speed=self.food_maturation_speed,
+                    clock=self.clock,
+                    **food_state
+                )
                 self.food_locations[tuple(food.position)] = food
+            self.food_changed()
 
     def instructions(self):
         color_costs = ''
@@ -744,7 +1210,7 @@ class Gridworld(object):
                 del self.food_locations[position]
                 # Update existence and count of food.
                 self.food_consumed.append(food)
-                self.food_updated = True
+                self.food_changed()
                 if self.respawn_food:
                     self.spawn_food()
                 else:
@@ -766,37 +1232,27 @@ class Gridworld(object):
     def spawn_food(self, position=None):
         """Respawn the food for a single position"""
         if not position:
-            position = self._random_empty_position()
+            position = self._random_empty_position(self.rng.food)
 
-        self.food_locations[tuple(position)] = Food(
+        food = Food(
             id=(len(self.food_locations) + len(self.food_consumed)),
             position=position,
             maturation_speed=self.food_maturation_speed,
+            clock=self.clock,
         )
-        self.food_updated = True
+        self.food_locations[tuple(position)] = food
+        self.food_changed()
         self.log_event({
             'type': 'spawn_food',
             'position': position,
         })
-
-    def food_changed(self, last_food):
-        locations = self.food_locations
-        if len(last_food) != len(locations):
-            return True
-        for food in last_food:
-            position = tuple(food['position'])
-            if position not in locations:
-                return True
-            found = locations[position]
-            if found.id != food['id'] or found.maturity != food['maturity']:
-                return True
-        return False
+        return food
 
     def spawn_player(self, id=None, **kwargs):
         """Spawn a player."""
         player = Player(
             id=id,
-            position=self._random_empty_position(),
+            position=self._random_empty_position(self.rng.identity),
             num_possible_colors=self.num_colors,
             motion_speed_limit=self.motion_speed_limit,
             motion_cost=self.motion_cost,
@@ -810,18 +1266,22 @@ class Gridworld(object):
             **kwargs
         )
         self.players[id] = player
+        self.players_changed()
+        self.scores_changed()
+        # New players must show up before the next tick
+        self._snapshot = None
         self._start_if_ready()
         return player
 
-    def _random_empty_position(self):
+    def _random_empty_position(self, rng):
         """Select an empty cell at random, using the configured probability
-        distribution."""
+        distribution and drawing from the stream ``rng``."""
         rows = self.rows
         columns = self.columns
         empty_cell = False
         while (not empty_cell):
             position = self.food_probability_function(
-                rows, columns, *self.probability_function_args)
+                rows, columns, *self.probability_function_args, rng=rng)
             empty_cell = self._empty(position)
 
         return position
@@ -849,12 +1309,13 @@ class Gridworld(object):
     def spread_contagion(self):
         """Spread contagion."""
         color_updates = []
+        index = SpatialHash(self.players.values(), cell_size=self.contagion)
         for player in self.players.values():
-            colors = [n.color for n in player.neighbors(d=self.contagion)]
+            colors = [n.color for n in index.neighbors(player, d=self.contagion)]
             if colors:
                 colors.append(player.color)
-                plurality_color = max(colors, key=colors.count)
-                if colors.count(plurality_color) > len(colors) / 2.0:
+                plurality_color, count = collections.Counter(colors).most_common(1)[0]
+                if count > len(colors) / 2.0:
                     if (self.rank(plurality_color) <= self.rank(player.color)):
                         color_updates.append((player, plurality_color))
 
@@ -877,7 +1338,8 @@ class Food(object):
         self.position = kwargs.get('position', [0, 0])
         self.color = kwargs.get('color')
         self.maturation_speed = kwargs.get('maturation_speed', 0.1)
-        self.creation_timestamp = time.time()
+        self.clock = kwargs.get('clock') or WallClock()
+        self.creation_timestamp = self.clock.time()
 
     def serialize(self):
         return {
@@ -896,9 +1358,20 @@ class Food(object):
     def maturity(self):
         return round(1 - math.exp(-self._age * self.maturation_speed), 1)
 
+    def next_change(self):
+        """The time at which `maturity` next changes, or None if it won't"""
+        if self.maturation_speed <= 0:
+            return None
+        ripeness = 1 - math.exp(-self._age * self.maturation_speed)
+        # Maturity is rounded to tenths, so changes halfway between them
+        boundary = (math.floor(ripeness * 10 + 0.5) + 0.5) / 10
+        if boundary >= 1:
+            return None
+        return self.creation_timestamp - math.log(1 - boundary) / self.maturation_speed
+
     @property
     def _age(self):
-        return time.time() - self.creation_timestamp
+        return self.clock.time() - self.creation_timestamp
 
 
 class IllegalMove(Exception):
@@ -912,6 +1385,14 @@ class IllegalMove(Exception):
 class Player(object):
     """A player."""
 
+    #: The attributes in `serialize`; the grid's snapshot is taken again
+    #: when one of them changes.
+    serialized_attributes = frozenset([
+        'id', 'position', 'score', 'payoff', 'color', 'motion_auto',
+        'motion_direction', 'motion_speed_limit', 'motion_timestamp', 'name',
+        'identity_visible', 'recruiter_id',
+    ])
+
     def __init__(self, **kwargs):
         super(Player, self).__init__()
 
@@ -930,6 +1411,7 @@ class Player(object):
         self.identity_visible = kwargs.get('identity_visible', True)
         self.recruiter_id = kwargs.get('recruiter_id', '')
         self.add_wall = None
+        rng = self.grid.rng.identity if self.grid else random
 
         # Determine the player's color. We don't have access to the specific
         # gridworld we are running in, so we can't use the `limited_` variables
@@ -941,13 +1423,14 @@ class Player(object):
         elif 'color_name' in kwargs:
             self.color_idx = Gridworld.player_color_names.index(kwargs['color_name'])
         else:
-            self.color_idx = random.randint(0, self.num_possible_colors - 1)
+            self.color_idx = rng.randint(0, self.num_possible_colors - 1)
 
         self.color_name = Gridworld.player_color_names[self.color_idx]
         self.color = Gridworld.player_color_names[self.color_idx]
 
         # Determine the player's profile.
         self.fake = Factory.create(self.pseudonym_locale)
+        self.fake.seed_instance(rng.getrandbits(32))
         self.profile = self.fake.simple_profile(
             sex=kwargs.get('pseudonym_gender', None)
         )
@@ -959,6 +1442,45 @@ class Player(object):
         self.motion_timestamp = 0
         self.last_timestamp = 0
 
+    def __setattr__(self, name, value):
+        changed = (
+            name in self.serialized_attributes and
+            getattr(self, name, None) != value
+        )
+        super(Player, self).__setattr__(name, value)
+        if changed and self._in_grid():
+            self.grid.players_changed()
+
+    def _in_grid(self):
+        grid = getattr(self, 'grid', None)
+        return grid is not None and grid.players.get(self.id) is self
+
+    @property
+    def score(self):
+        return self._score
+
+    @score.setter
+    def score(self, score):
+        changed = score != getattr(self, '_score', None)
+        self._score = score
+        if changed and self._in_grid():
+            self.grid.scores_changed()
+
+    @property
+    def color_idx(self):
+        return self._color_idx
+
+    @color_idx.setter
+    def color_idx(self, color_idx):
+        self._color_idx = color_idx
+        if self._in_grid():
+            self.grid.scores_changed()
+
+    @property
+    def _rng(self):
+        """The random stream that motion draws from"""
+        return self.grid.rng.motion if self.grid else random
+
     def tremble(self, direction):
         """Change direction with some probability."""
         directions = [
@@ -968,22 +1490,36 @@ class Player(object):
             "right"
         ]
         directions.remove(direction)
-        direction = random.choice(directions)
+        direction = self._rng.choice(directions)
         return direction
 
-    def move(self, direction, tremble_rate=None, timestamp=None):
-        """Move the player."""
-
-        if not self.grid.movement_enabled:
-            return
-
+    def turn(self, direction, tremble_rate=None):
+        """Face ``direction``, or another one if trembling; returns the
+        direction faced."""
         if tremble_rate is None:
             tremble_rate = self.motion_tremble_rate
 
-        if random.random() < tremble_rate:
+        if self._rng.random() < tremble_rate:
             direction = self.tremble(direction)
 
         self.motion_direction = direction
+        return direction
+
+    def refuse_move(self, direction):
+        """Do what `move` does for a move it would refuse for coming too
+        soon, without checking; returns False if movement is disabled."""
+        if not self.grid.movement_enabled:
+            return False
+        self.turn(direction)
+        return True
+
+    def move(self, direction, tremble_rate=None, timestamp=None):
+        """Move the player."""
+
+        if not self.grid.movement_enabled:
+            return
+
+        direction = self.turn(direction, tremble_rate)
 
         new_position = self.position[:]
 
@@ -1032,7 +1568,7 @@ class Player(object):
         # now that player moved, check if wall needs to be built
         if self.add_wall is not None:
             new_wall = Wall(position=self.add_wall)
-            self.grid.wall_locations[tuple(new_wall.position)] = new_wall
+            self.grid.add_wall(new_wall)
             self.add_wall = None
             wall_msg = {
                 'type': 'wall_built',
@@ -1115,8 +1651,10 @@ def serve_grid():
 class Griduniverse(Experiment):
     """Define the structure of the experiment."""
     channel = 'griduniverse_ctrl'
+    broadcast_channel = 'griduniverse'
     state_count = 0
     replay_path = '/grid'
+    clock = WallClock()
 
     def __init__(self, session=None):
         """Initialize the experiment."""
@@ -1124,11 +1662,17 @@ class Griduniverse(Experiment):
         super(Griduniverse, self).__init__(session)
         self.experiment_repeats = 1
         self.redis_conn = db.redis_conn
+        self.clock = clock_for(self.config.get('clock_speed', 1.0))
+        self.seed = self.config.get('seed', None)
+        if self.seed is None:
+            # Pick one, so that the game can be reproduced from its record
+            self.seed = random.SystemRandom().randint(0, 2 ** 31 - 1)
         if session:
             self.setup()
             self.grid = Gridworld(
                 log_event=self.record_event,
-                **self.config.as_dict()
+                clock=self.clock,
+                **dict(self.config.as_dict(), seed=self.seed)
             )
             self.session.commit()
 
@@ -1164,10 +1708,13 @@ class Griduniverse(Experiment):
     def background_tasks(self):
         if self.config.get('replay', False):
             return []
-        return [
+        tasks = [
             self.send_state_thread,
             self.game_loop,
         ]
+        if self.config.get('inbound_batch_interval', 0):
+            tasks.append(self.inbound_thread)
+        return tasks
 
     def create_network(self):
         """Create a new network by reading the configuration file."""
@@ -1191,6 +1738,8 @@ class Griduniverse(Experiment):
     def setup(self):
         """Setup the networks."""
         self.node_by_player_id = {}
+        self.state_formats = {}
+        self.inbound_messages = []
         if not self.networks():
             super(Griduniverse, self).setup()
             for net in self.networks():
@@ -1250,23 +1799,98 @@ class Griduniverse(Experiment):
         param raw_message is a string with a channel prefix, for example:
 
             'griduniverse_ctrl:{"type":"move","player_id":0,"move":"left"}'
+
+        When `inbound_batch_interval` is set, messages received while the
+        game is running are queued and processed in batches by
+        `inbound_thread`. A `batch` message carries the messages of many
+        players, as sent by a `BotHost`, and is handled as they would be:
+        together when batching is on, one at a time otherwise.
         """
         message = self.parse_message(raw_message)
         if message is not None:
-            message['server_time'] = time.time()
-            self.dispatch((message))
-            if 'player_id' in message:
-                self.record_event(message, message['player_id'])
+            if message['type'] == 'batch':
+                messages = message['messages']
+            else:
+                messages = [message]
+            server_time = self.clock.time()
+            for message in messages:
+                message['server_time'] = server_time
+            batching = self.config.get('inbound_batch_interval', 0)
+            if (batching and
+                    not self.config.get('replay', False) and
+                    not self.grid.game_over):
+                self.inbound_messages.extend(messages)
+            elif batching:
+                if messages:
+                    self.process_messages(messages)
+            else:
+                for message in messages:
+                    self.process_messages([message])
 
     def parse_message(self, raw_message):
-        if raw_message.startswith(self.channel + ":"):
-            body = raw_message.replace(self.channel + ":", "")
-            message = json.loads(body)
+        prefix = self.channel + ":"
+        if raw_message.startswith(prefix):
+            return json.loads(raw_message[len(prefix):])
 
-            return message
+    def process_messages(self, messages):
+        """Dispatch a batch of messages in order and record them together.
 
-    def record_event(self, details, player_id=None):
-        """Record an event in the Info table."""
+        A move from a player who already moved earlier in the batch would be
+        refused by the speed limit, so it is rejected without being
+        validated, with the same effects on the player and random streams.
+
+        A message that fails is logged and left out of the record, and the
+        rest of the batch is processed as usual.
+        """
+        moved = {}
+        events = []
+        for message in messages:
+            try:
+                if message['type'] == 'move' and self._move_superseded(message, moved):
+                    player = self.grid.players[message['player_id']]
+                    if player.refuse_move(message['move']):
+                        self.publish_move_rejection(player)
+                else:
+                    self.dispatch(message)
+                    if 'actual' in message:
+                        # Player.move only keeps timestamps that are set
+                        moved[message['player_id']] = message.get('timestamp') or None
+            except Exception:
+                logger.exception('Could not process message {}'.format(message))
+                continue
+            if 'player_id' in message:
+                events.append((message, message['player_id']))
+        self.record_events(events)
+
+    def _move_superseded(self, message, moved):
+        player_id = message['player_id']
+        if player_id not in moved or player_id not in self.grid.players:
+            return False
+        player = self.grid.players[player_id]
+        if player.motion_speed_limit <= 0:
+            return False
+        timestamp = message.get('timestamp')
+        if timestamp is None:
+            # The round clock has barely moved since the accepted move
+            return True
+        last_timestamp = moved[player_id]
+        return (last_timestamp is not None and
+                timestamp <= last_timestamp + 1.0 / player.motion_speed_limit)
+
+    def inbound_thread(self):
+        """Process the messages queued by `send` in batches"""
+        interval = self.config.get('inbound_batch_interval', 0)
+        while True:
+            self.clock.sleep(interval)
+            game_over = self.grid.game_over
+            messages, self.inbound_messages = self.inbound_messages, []
+            if messages:
+                self.process_messages(messages)
+            if game_over:
+                # `send` no longer queues once the game is over
+                return
+
+    def _event_for(self, details, player_id=None):
         session = self.socket_session
         if player_id == 'spectator':
             return
@@ -1277,20 +1901,111 @@ class Griduniverse(Experiment):
             node = self.environment
 
         try:
-            info = Event(origin=node, details=details)
+            return Event(origin=node, details=details)
         except ValueError:
             logger.info(
                 "Tried to record an event after node#{} failure: {}".format(
                     node.id, details
                 )
             )
+
+    def record_event(self, details, player_id=None):
+        """Record an event in the Info table."""
+        info = self._event_for(details, player_id)
+        if info is None:
+            return
+        self.socket_session.add(info)
+        self.socket_session.commit()
+
+    def record_events(self, events):
+        """Record ``(details, player_id)`` pairs with a single commit."""
+        infos = [self._event_for(details, player_id) for details, player_id in events]
+        infos = [info for info in infos if info is not None]
+        if not infos:
             return
-        session.add(info)
-        session.commit()
+        self.socket_session.add_all(infos)
+        self.socket_session.commit()
+
+    def publish(self, msg, channel=None):
+        """Publish a message to all griduniverse clients, or only to those
+        listening on the given channel"""
+        self.redis_conn.publish(channel or self.broadcast_channel, json.dumps(msg))
+
+    def player_channel(self, player_id):
+        """The channel carrying state updates for a single player when
+        interest management is enabled"""
+        return '{}_{}'.format(self.broadcast_channel, player_id)
+
+    def format_channel(self, state_format):
+        """The channel carrying state updates in a non-default format"""
+        return '{}_{}'.format(self.broadcast_channel, state_format)
+
+    def publish_state(self, message, snapshot, grid_state, walls_sent):
+        """Publish a state message in each format that clients asked for.
 
-    def publish(self, msg):
-        """Publish a message to all griduniverse clients"""
-        self.redis_conn.publish('griduniverse', json.dumps(msg))
+        JSON goes to the shared channel if any client wants it, or if nobody
+        has connected yet. Other formats are published once on a channel of
+        their own, so clients never decode a state they did not ask for.
+
+        With interest management, players get their states on channels of
+        their own, and the whole grid only goes to the shared channel, as
+        JSON, once a spectator has connected.
+        """
+        if self.grid.interest_management:
+            self.publish_player_states(message, snapshot, walls_sent)
+            if 'spectator' not in self.state_formats:
+                return
+            formats = {wire.DEFAULT_FORMAT}
+        else:
+            formats = set(self.state_formats.values()) or {wire.DEFAULT_FORMAT}
+
+        for state_format in sorted(formats):
+            if state_format == wire.DEFAULT_FORMAT:
+                state_message = dict(message, grid=snapshot.encode(
+                    include_walls='walls' in grid_state,
+                    include_food='food' in grid_state,
+                    walls_added=grid_state.get('walls_added'),
+                ))
+                channel = self.broadcast_channel
+            else:
+                state_message = dict(message, grid=snapshot.pack(
+                    include_walls='walls' in grid_state,
+                    include_food='food' in grid_state,
+                    walls_added=grid_state.get('walls_added'),
+                ), format=state_format)
+                channel = self.format_channel(state_format)
+            self.publish(state_message, channel=channel)
+
+    def publish_player_states(self, message, snapshot, walls_sent):
+        """Publish each player's own view of the grid on its player channel.
+
+        Each player gets the walls once, then only the walls built since
+        the version it last received; ``walls_sent`` tracks those versions.
+        """
+        walls_version = snapshot.section_version('walls')
+        cell_size = self.grid.view_cell_size
+        for player in list(self.grid.players.values()):
+            view = snapshot.view(
+                self.grid.view_bounds(player), player.id, cell_size=cell_size
+            )
+            include_walls = False
+            walls_added = None
+            sent_version = walls_sent.get(player.id)
+            if sent_version != walls_version:
+                if sent_version is not None:
+                    walls_added = snapshot.walls_since(sent_version)
+                include_walls = walls_added is None
+                walls_sent[player.id] = walls_version
+            state_format = self.state_formats.get(player.id, wire.DEFAULT_FORMAT)
+            if state_format == wire.DEFAULT_FORMAT:
+                state_message = dict(message, grid=view.encode(
+                    include_walls=include_walls, walls_added=walls_added
+                ))
+            else:
+                state_message = dict(message, grid=view.pack(
+                    include_walls=include_walls, walls_added=walls_added
+                ), format=state_format)
+            self.publish(state_message, channel=self.player_channel(player.id))
 
     def handle_connect(self, msg):
         player_id = msg['player_id']
@@ -1298,10 +2013,19 @@ class Griduniverse(Experiment):
             # Force all participants to be specatators
             msg['player_id'] = 'spectator'
             if not self.grid.start_timestamp:
-                self.grid.start_timestamp = time.time()
+                self.grid.start_timestamp = self.clock.time()
+        state_format = msg.get('state_format', wire.DEFAULT_FORMAT)
+        if state_format not in wire.STATE_FORMATS:
+            logger.info('Unknown state format {}, using {} instead.'.format(
+                state_format, wire.DEFAULT_FORMAT
+            ))
+            state_format = wire.DEFAULT_FORMAT
         if player_id == 'spectator':
             logger.info('A spectator has connected.')
+            # Spectators watch the shared channel from a browser
+            self.state_formats['spectator'] = wire.DEFAULT_FORMAT
             return
+        self.state_formats[player_id] = state_format
 
         logger.info("Client {} has connected.".format(player_id))
         client_count = len(self.grid.players)
@@ -1383,11 +2107,7 @@ class Griduniverse(Experiment):
         try:
             msgs = player.move(msg['move'], timestamp=msg.get('timestamp'))
         except IllegalMove:
-            error_msg = {
-                'type': 'move_rejection',
-                'player_id': player.id,
-            }
-            self.publish(error_msg)
+            self.publish_move_rejection(player)
         else:
             if msgs is not None:
                 msg["actual"] = msgs["direction"]
@@ -1396,6 +2116,13 @@ class Griduniverse(Experiment):
                     self.publish(wall_msg)
                     self.record_event(wall_msg)
 
+    def publish_move_rejection(self, player):
+        error_msg = {
+            'type': 'move_rejection',
+            'player_id': player.id,
+        }
+        self.publish(error_msg)
+
     def handle_donation(self, msg):
         """Send a donation from one player to one or more other players."""
         if not self.grid.donation_active:
@@ -1458,16 +2185,18 @@ class Griduniverse(Experiment):
         """Publish the current state of the grid and game"""
         count = 0
         last_player_count = 0
-        gevent.sleep(1.00)
+        self.clock.sleep(1.00)
         last_walls = []
-        last_food = []
+        last_walls_version = None
+        last_food_version = None
+        walls_sent = {}
 
         # Sleep until we have walls
         while (self.grid.walls_density and not self.grid.wall_locations):
-            gevent.sleep(0.1)
+            self.clock.sleep(0.1)
 
         while True:
-            gevent.sleep(self.config.get('state_interval', 0.050))
+            self.clock.sleep(self.config.get('state_interval', 0.050))
 
             # Send all food data once every 40 loops
             update_walls = update_food = False
@@ -1484,143 +2213,94 @@ class Griduniverse(Experiment):
             if not last_walls:
                 update_walls = True
 
-            if not last_food or self.grid.food_changed(last_food):
+            # The game loop takes a snapshot every tick; reuse the latest
+            snapshot = self.grid.snapshot()
+            if snapshot.section_version('food') != last_food_version:
+                update_food = True
+
+            # Views move with their players, so each one needs current food
+            if self.grid.interest_management:
                 update_food = True
 
-            grid_state = self.grid.serialize(
+            # Walls built since the last update go out as a delta
+            walls_version = snapshot.section_version('walls')
+            walls_added = None
+            if not update_walls and walls_version != last_walls_version:
+                walls_added = snapshot.walls_since(last_walls_version)
+                if walls_added is None:
+                    update_walls = True
+            last_walls_version = walls_version
+
+            grid_state = snapshot.serialize(
                 include_walls=update_walls,
-                include_food=update_food
+                include_food=update_food,
+                walls_added=walls_added
             )
 
             if update_walls:
                 last_walls = grid_state['walls']
 
             if update_food:
-                last_food = grid_state['food']
+                last_food_version = snapshot.section_version('food')
 
             message = {
                 'type': 'state',
-                'grid': json.dumps(grid_state),
                 'count': count,
                 'remaining_time': self.grid.remaining_round_time,
                 'round': self.grid.round,
             }
 
-            self.publish(message)
+            self.publish_state(message, snapshot, grid_state, walls_sent)
             if self.grid.game_over:
                 return
 
     def game_loop(self):
         """Update the world state."""
-        gevent.sleep(0.1)
+        self.clock.sleep(0.1)
         if not self.config.get('replay', False):
+            self.record_event({'type': 'random_seed', 'seed': self.grid.rng.seed})
             self.grid.build_labyrinth()
             logger.info('Spawning food')
             for i in range(self.grid.num_food):
                 if (i % 250) == 0:
-                    gevent.sleep(0.00001)
+                    self.clock.sleep(0.00001)
                 self.grid.spawn_food()
 
         while not self.grid.game_started:
-            gevent.sleep(0.01)
+            self.clock.sleep(0.01)
 
         previous_second_timestamp = self.grid.start_timestamp
         count = 0
 
         while not self.grid.game_over:
             # Record grid state to database
-            state_data = self.grid.serialize(
-                include_walls=self.grid.walls_updated,
-                include_food=self.grid.food_updated
-            )
+            snapshot = self.grid.take_snapshot()
+            include = {
+                'include_walls': self.grid.walls_updated,
+                'include_food': self.grid.food_updated,
+            }
             state = self.environment.update(
-                json.dumps(state_data),
-                details=state_data
+                snapshot.encode(**include),
+                details=snapshot.serialize(**include)
             )
             self.socket_session.add(state)
             self.socket_session.commit()
             count += 1
             self.grid.walls_updated = False
             self.grid.food_updated = False
-            gevent.sleep(0.010)
-
-            # TODO: Most of this code belongs in Gridworld; we're just looking
-            # at properties of that class and then telling it to do things based
-            # on the values.
+            self.clock.sleep(0.010)
 
             # Log food updates every hundred rounds to capture maturity changes
             if self.grid.food_maturation_threshold and (count % 100) == 0:
                 self.grid.food_updated = True
-            now = time.time()
-
-            # Update motion.
-            if self.grid.motion_auto:
-                for player in self.grid.players.values():
-                    player.move(player.motion_direction, tremble_rate=0)
-
-            # Consume the food.
-            if self.grid.consumption_active:
-                self.grid.consume()
-
-            # Spread through contagion.
-            if self.grid.contagion > 0:
-                self.grid.spread_contagion()
-
-            # Trigger time-based events.
-            if (now - previous_second_timestamp) > 1.000:
-
-                # Grow or shrink the food stores.
-
-                # Alternate positive and negative growth rates
-                seasonal_growth = (
-                    self.grid.seasonal_growth_rate **
-                    (-1 if self.grid.round % 2 else 1)
-                )
-
-                # Compute how many food items we should have on the grid,
-                # ensuring it's not less than zero.
-                self.grid.num_food = max(min(
-                    self.grid.num_food *
-                    self.grid.food_growth_rate *
-                    seasonal_growth,
-                    self.grid.rows * self.grid.columns,
-                ), 0)
-
-                # TODO: self.grid.replenish_food()
-                for i in range(int(round(self.grid.num_food) - len(self.grid.food_locations))):
-                    self.grid.spawn_food()
-
-                # TODO: self.grid.prune_excess_food()
-                for i in range(len(self.grid.food_locations) - int(round(self.grid.num_food))):
-                    del self.grid.food_locations[random.choice(self.grid.food_locations.keys())]
-                    self.grid.food_updated = True
-
-                abundances = {}
-                for player in self.grid.players.values():
-                    # Apply tax.
-                    player.score = max(player.score - self.grid.tax, 0)
-                    if player.color not in abundances:
-                        abundances[player.color] = 0
-                    abundances[player.color] += 1
-
-                # Apply frequency-dependent payoff.
-                if self.grid.frequency_dependence:
-                    for player in self.grid.players.values():
-                        relative_frequency = (
-                            1.0 * abundances[player.color] / len(self.grid.players)
-                        )
-                        payoff = fermi(
-                            beta=self.grid.frequency_dependence,
-                            p1=relative_frequency,
-                            p2=0.5
-                        ) * self.grid.frequency_dependent_payoff_rate
-
-                        player.score = max(player.score + payoff, 0)
+            now = self.clock.time()
 
+            # Trigger time-based events once a second.
+            timed_events = (now - previous_second_timestamp) > 1.000
+            self.grid.step(timed_events=timed_events)
+            if timed_events:
                 previous_second_timestamp = now
 
-            self.grid.compute_payoffs()
-
             game_round = self.grid.round
             self.grid.check_round_completion()
             if self.grid.round != game_round and not self.grid.game_over:
@@ -1646,7 +2326,8 @@ class Griduniverse(Experiment):
     def replay_start(self):
         self.grid = Gridworld(
             log_event=self.record_event,
-            **self.config.as_dict()
+            clock=self.clock,
+            **dict(self.config.as_dict(), seed=self.seed)
         )
 
     def replay_started(self):
@@ -1764,7 +2445,9 @@ class Griduniverse(Experiment):
         self.state_count = 0
         self.grid.players = {}
         self.grid.food_locations = {}
-        self.grid.wall_locations = {}
+        self.grid.players_changed()
+        self.grid.food_changed()
+        self.grid.set_walls([])
 
     def replay_finish(self):
         self.publish({'type': 'stop'})
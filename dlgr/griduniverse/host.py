@@ -0,0 +1,200 @@
+"""Many high performance bots in one process, sharing one connection.
+
+Each bot normally subscribes to the game's channels on its own and decodes
+every state message itself. A `BotHost` listens on one Redis subscription
+for all the bots it runs instead: each message is decoded once, states are
+merged into one view of the grid per channel, and the same view is handed
+to every bot listening on that channel, so bots must not change it. The
+bots' messages to the server are collected and published together, as one
+`batch` message, every ``flush_interval`` seconds.
+
+    >>> host = BotHost('http://localhost:5000', AdvantageSeekingBot, count=200)
+    >>> host.run()
+
+Run as a script to play a game with many bots from one process:
+
+    python -m dlgr.griduniverse.host http://localhost:5000 --bots 200 \\
+        --policy AdvantageSeekingBot
+"""
+if __name__ == '__main__':
+    # Run as a script: patch before requests and redis are imported
+    from gevent import monkey
+    monkey.patch_all()
+
+import argparse  # noqa: E402
+import collections  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+
+import gevent  # noqa: E402
+from dallinger.utils import generate_random_id  # noqa: E402
+
+from . import bots  # noqa: E402
+from .bots import merge_state  # noqa: E402
+
+logger = logging.getLogger('griduniverse')
+
+
+class BotHost(object):
+    """Runs bots against the game at ``url`` over one Redis subscription.
+
+    ``count`` bots of ``bot_class`` are added to start with; more can be
+    added with `add` before the host is run.
+    """
+
+    def __init__(self, url, bot_class=None, count=0, flush_interval=0.02, redis=None):
+        self.url = url
+        self.flush_interval = flush_interval
+        self._redis = redis
+        self.bots = []
+        # The bots listening on each channel, and the grid last seen on it
+        self.listeners = collections.defaultdict(list)
+        self.views = {}
+        # The channels to listen on, and those not subscribed to yet
+        self.channels = set(['quorum', 'griduniverse'])
+        self.new_channels = set(self.channels)
+        self.outbox = []
+        for i in range(count):
+            self.add(bot_class(
+                url,
+                assignment_id=generate_random_id(),
+                worker_id=generate_random_id(),
+                hit_id=generate_random_id(),
+            ))
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import dallinger.db
+            self._redis = dallinger.db.redis_conn
+        return self._redis
+
+    def add(self, bot):
+        """Run ``bot`` on this host"""
+        bot.bot_host = self
+        self.bots.append(bot)
+        return bot
+
+    def subscribe(self, bot, channels):
+        """Pass the messages of ``channels`` on to ``bot``"""
+        for channel in channels:
+            if bot not in self.listeners[channel]:
+                self.listeners[channel].append(bot)
+            if channel not in self.channels:
+                self.channels.add(channel)
+                self.new_channels.add(channel)
+
+    def take_new_channels(self):
+        """The channels to subscribe to since the last call, sorted"""
+        channels, self.new_channels = self.new_channels, set()
+        return sorted(channels)
+
+    def publish(self, message):
+        """Queue a message to the `griduniverse_ctrl` channel"""
+        self.outbox.append(message)
+
+    def take_batch(self):
+        """The queued messages as one encoded `batch` message, or None"""
+        if self.outbox:
+            messages, self.outbox = self.outbox, []
+            return json.dumps({'type': 'batch', 'messages': messages})
+
+    def flush(self):
+        """Publish the queued messages as one `batch` message"""
+        batch = self.take_batch()
+        if batch is not None:
+            self.redis.publish('griduniverse_ctrl', batch)
+
+    def receive(self, channel, payload):
+        """Handle a message from Redis, if any bot listens on ``channel``"""
+        if isinstance(channel, bytes):
+            channel = channel.decode('utf-8')
+        if self.listeners.get(channel):
+            self.dispatch(channel, json.loads(payload))
+
+    def dispatch(self, channel, data):
+        """Pass a decoded message from ``channel`` on to its bots.
+
+        A state is merged into the channel's view of the grid, which is
+        then given to each bot as its grid.
+        """
+        if data.get('type') != 'state':
+            for bot in list(self.listeners[channel]):
+                bot.receive(channel, data)
+            return
+        listening = [
+            bot for bot in self.listeners[channel]
+            # Bots whose states come on another channel ignore the shared one
+            if channel != 'griduniverse' or not bot.own_states
+        ]
+        if listening:
+            view = merge_state(self.views.get(channel, {}), data)
+            self.views[channel] = view
+            for bot in listening:
+                bot.grid = view
+                if channel != 'griduniverse':
+                    bot.own_states = True
+
+    def listen(self):
+        """Receive messages for the bots until killed.
+
+        Only the channels that bots listen on are subscribed to; those of
+        bots that join later are added between messages.
+        """
+        pubsub = self.redis.pubsub()
+        while True:
+            channels = self.take_new_channels()
+            if channels:
+                pubsub.subscribe(*channels)
+            message = pubsub.get_message(timeout=self.flush_interval)
+            if message is not None and message['type'] == 'message':
+                self.receive(message['channel'], message['data'])
+            gevent.sleep(0)
+
+    def keep_flushing(self):
+        while True:
+            gevent.sleep(self.flush_interval)
+            self.flush()
+
+    def run(self):
+        """Play every bot's experiment through to the end"""
+        helpers = [gevent.spawn(self.listen), gevent.spawn(self.keep_flushing)]
+        try:
+            gevent.joinall([gevent.spawn(bot.run_experiment) for bot in self.bots])
+        finally:
+            self.flush()
+            gevent.killall(helpers)
+
+
+def parse_args(description, argv=None):
+    """The arguments of a script running bots, with the bot class as
+    ``bot_class``; loads the experiment configuration"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('url', help='the URL of the experiment server')
+    parser.add_argument('--bots', type=int, default=1)
+    parser.add_argument('--policy', default='RandomBot',
+                        help='the name of the bot class to run')
+    parser.add_argument('--flush-interval', type=float, default=0.02)
+    args = parser.parse_args(argv)
+
+    args.bot_class = getattr(bots, args.policy, None)
+    if not isinstance(args.bot_class, type) or not hasattr(args.bot_class, 'receive'):
+        parser.error('{} is not a high performance bot'.format(args.policy))
+    from dallinger.config import get_config
+    config = get_config()
+    if not config.ready:
+        config.load()
+    return args
+
+
+def main(argv=None):
+    args = parse_args('Run many Griduniverse bots in one process.', argv)
+    host = BotHost(
+        args.url, args.bot_class, count=args.bots, flush_interval=args.flush_interval
+    )
+    logger.info('Running {} bots.'.format(len(host.bots)))
+    host.run()
+
+
+if __name__ == '__main__':
+    main()
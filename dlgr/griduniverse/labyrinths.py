@@ -0,0 +1,260 @@
+"""A persistent cache of pre-generated labyrinths.
+
+Labyrinths are stored in an SQLite file under their size, density,
+contiguity and seed, the seed of the game's maze stream. A grid with a
+``labyrinth_cache`` loads its walls from the cache rather than building
+them, and games of a condition that share a ``labyrinth_seed`` share a
+labyrinth.
+
+    >>> cache = LabyrinthCache('labyrinths.db')
+    >>> walls = cache.fetch(rows=500, columns=500, density=0.5,
+    ...                     contiguity=0.9, seed=1)
+
+Run as a script to fill the cache before a session, for the conditions of
+experiment configuration files or those given on the command line:
+
+    python -m dlgr.griduniverse.labyrinths labyrinths.db --config config.txt
+    python -m dlgr.griduniverse.labyrinths labyrinths.db --rows 500 \\
+        --columns 500 --density 0.5 --contiguity 0.9 --seed 1 --seed 2
+
+Each entry records a hash of the maze generator that built it; entries
+built by another version are never returned.
+"""
+import argparse
+import hashlib
+import itertools
+import logging
+import os
+import sqlite3
+import time
+import zlib
+
+import numpy
+
+from . import maze
+from .rng import RandomStreams
+
+try:
+    from configparser import ConfigParser
+except ImportError:
+    from ConfigParser import SafeConfigParser as ConfigParser
+
+logger = logging.getLogger('griduniverse')
+
+_maze_version = None
+
+
+def maze_version():
+    """A hash of the source of the maze generator"""
+    global _maze_version
+    if _maze_version is None:
+        source = os.path.splitext(os.path.abspath(maze.__file__))[0] + '.py'
+        with open(source, 'rb') as module:
+            _maze_version = hashlib.sha256(module.read()).hexdigest()
+    return _maze_version
+
+
+def build(rows, columns, density, contiguity, seed):
+    """The labyrinth of a grid whose maze stream has ``seed``"""
+    return maze.labyrinth(
+        columns=columns,
+        rows=rows,
+        density=density,
+        contiguity=contiguity,
+        rng=RandomStreams(seed).maze,
+    )
+
+
+def _encode(walls):
+    positions = numpy.array([w.position for w in walls], dtype='<i4')
+    return zlib.compress(positions.tobytes())
+
+
+def _decode(blob):
+    positions = numpy.frombuffer(zlib.decompress(bytes(blob)), dtype='<i4')
+    return [maze.Wall(position=p) for p in positions.reshape(-1, 2).tolist()]
+
+
+class LabyrinthCache(object):
+    """Labyrinths, evicting the least recently used beyond ``max_bytes``
+    of stored walls."""
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, version=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version or maze_version()
+        # Every web process of a deployment may share the file
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS labyrinths ('
+            'rows INTEGER, columns INTEGER, density REAL, contiguity REAL, '
+            'seed INTEGER, version TEXT, walls BLOB, size INTEGER, '
+            'last_used REAL, '
+            'PRIMARY KEY (rows, columns, density, contiguity, seed))'
+        )
+        self.connection.commit()
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM labyrinths'
+        ).fetchone()[0]
+
+    @property
+    def size(self):
+        """The number of bytes of walls stored"""
+        return self.connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM labyrinths'
+        ).fetchone()[0]
+
+    @staticmethod
+    def _key(rows, columns, density, contiguity, seed):
+        return (int(rows), int(columns), float(density), float(contiguity), int(seed))
+
+    def get(self, rows, columns, density, contiguity, seed, default=None):
+        """The cached walls of a labyrinth, or ``default``"""
+        key = self._key(rows, columns, density, contiguity, seed)
+        where = 'rows = ? AND columns = ? AND density = ? AND contiguity = ? AND seed = ?'
+        row = self.connection.execute(
+            'SELECT walls FROM labyrinths WHERE ' + where + ' AND version = ?',
+            key + (self.version,)
+        ).fetchone()
+        if row is None:
+            return default
+        self.connection.execute(
+            'UPDATE labyrinths SET last_used = ? WHERE ' + where,
+            (time.time(),) + key
+        )
+        self.connection.commit()
+        return _decode(row[0])
+
+    def set(self, rows, columns, density, contiguity, seed, walls):
+        """Store the walls of a labyrinth"""
+        blob = _encode(walls)
+        self.connection.execute(
+            'INSERT OR REPLACE INTO labyrinths VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            self._key(rows, columns, density, contiguity, seed) + (
+                self.version,
+                sqlite3.Binary(blob),
+                len(blob),
+                time.time(),
+            )
+        )
+        self.evict()
+        self.connection.commit()
+
+    def fetch(self, rows, columns, density, contiguity, seed):
+        """The walls of a labyrinth, built and stored on a miss"""
+        walls = self.get(rows, columns, density, contiguity, seed)
+        if walls is None:
+            walls = build(rows, columns, density, contiguity, seed)
+            self.set(rows, columns, density, contiguity, seed, walls)
+        return walls
+
+    def warm(self, conditions, seeds):
+        """Build the labyrinths missing for every (rows, columns, density,
+        contiguity) condition and seed; returns the number built."""
+        built = 0
+        for condition, seed in itertools.product(conditions, seeds):
+            args = tuple(condition) + (seed,)
+            if self.get(*args) is None:
+                start = time.time()
+                self.set(*(args + (build(*args),)))
+                built += 1
+                logger.info('Built labyrinth {} in {} seconds.'.format(
+                    args, time.time() - start
+                ))
+        return built
+
+    def evict(self):
+        """Remove the least recently used labyrinths beyond ``max_bytes``"""
+        excess = self.size - self.max_bytes
+        rows = self.connection.execute(
+            'SELECT rowid, size FROM labyrinths ORDER BY last_used'
+        ).fetchall()
+        doomed = []
+        for rowid, size in rows:
+            if excess <= 0:
+                break
+            doomed.append((rowid,))
+            excess -= size
+        self.connection.executemany('DELETE FROM labyrinths WHERE rowid = ?', doomed)
+
+    def prune_stale(self):
+        """Remove labyrinths built by other versions of the generator"""
+        self.connection.execute(
+            'DELETE FROM labyrinths WHERE version != ?', (self.version,)
+        )
+        self.connection.commit()
+
+    def clear(self):
+        self.connection.execute('DELETE FROM labyrinths')
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def read_condition(path):
+    """The labyrinth condition and seed of an experiment configuration file"""
+    parser = ConfigParser()
+    parser.read(path)
+    values = {}
+    for section in parser.sections():
+        values.update(parser.items(section))
+    condition = (
+        int(values.get('rows', 25)),
+        int(values.get('columns', 25)),
+        float(values.get('walls_density', 0.0)),
+        float(values.get('walls_contiguity', 1.0)),
+    )
+    seed = values.get('labyrinth_seed', values.get('seed'))
+    return condition, None if seed is None else int(seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Pre-generate labyrinths into a labyrinth cache.'
+    )
+    parser.add_argument('path', help='the cache file')
+    parser.add_argument('--config', action='append', default=[],
+                        help='an experiment configuration file to read a '
+                             'condition and seed from; may be repeated')
+    parser.add_argument('--rows', type=int)
+    parser.add_argument('--columns', type=int)
+    parser.add_argument('--density', type=float)
+    parser.add_argument('--contiguity', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, action='append', default=[],
+                        help='a seed to build labyrinths for; may be repeated')
+    parser.add_argument('--max-bytes', type=int, default=256 * 1024 * 1024)
+    args = parser.parse_args(argv)
+
+    conditions = []
+    seeds = list(args.seed)
+    for path in args.config:
+        condition, seed = read_condition(path)
+        conditions.append(condition)
+        if seed is not None and seed not in seeds:
+            seeds.append(seed)
+    if args.rows or args.columns or args.density is not None:
+        conditions.append((
+            args.rows or 25,
+            args.columns or 25,
+            1.0 if args.density is None else args.density,
+            args.contiguity,
+        ))
+    conditions = [c for c in conditions if c[2]]
+    if not conditions or not seeds:
+        parser.error('need at least one condition with walls, and a seed')
+
+    cache = LabyrinthCache(args.path, max_bytes=args.max_bytes)
+    try:
+        built = cache.warm(conditions, seeds)
+        print('Built {} labyrinths; {} cached in {}.'.format(
+            built, len(cache), args.path
+        ))
+    finally:
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+"""Load tests of a Griduniverse server, measuring input-to-broadcast latency.
+
+`LoadTest` runs synthetic players over the bot message protocol on an
+`AsyncBotHost`. Each player sends moves at ``rate`` moves per second, on a
+schedule that does not wait for the server to answer, and records how long
+each accepted move takes to show up in the states the server broadcasts:
+from when its move is published to `griduniverse_ctrl` to when a state
+arrives with the player in its new position. Moves the server refuses are
+counted from its `move_rejection` messages.
+
+Run it against a server started with ``dallinger debug`` (or ``develop``),
+with its local Redis and Postgres:
+
+    python -m dlgr.griduniverse.loadtest http://localhost:5000 --players 200 \\
+        --rate 4 --json results.json
+
+The server is not told which move a state or a rejection follows from, so
+a player's moves are matched with them in the order they were sent. Players
+don't step back to a cell they just left, which keeps the match unambiguous
+in practice; moves that can't be matched (after a tremble, or when players
+are moved to start a new round) are counted as ``unmatched``.
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import logging
+import random
+
+import numpy
+from selenium.webdriver.common.keys import Keys
+
+from .asyncbots import AsyncBotHost
+from .bots import HighPerformanceBaseGridUniverseBot
+
+logger = logging.getLogger('griduniverse')
+
+#: The change of position of each move
+STEPS = {'up': (-1, 0), 'down': (1, 0), 'left': (0, -1), 'right': (0, 1)}
+OPPOSITE = {'up': 'down', 'down': 'up', 'left': 'right', 'right': 'left'}
+KEYS = {'up': Keys.UP, 'down': Keys.DOWN, 'left': Keys.LEFT, 'right': Keys.RIGHT}
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def step(position, direction):
+    dr, dc = STEPS[direction]
+    return (position[0] + dr, position[1] + dc)
+
+
+class MoveTracker(object):
+    """Matches a player's moves with the states and rejections that
+    follow from them.
+
+    The server handles a player's moves in the order they were sent, so
+    the moves handled by the time of a state are the oldest ones; those of
+    them that were refused are as many as the rejections received since the
+    previous state, and the rest moved the player one step each.
+    """
+
+    #: Ways to match moves tried before giving up on a state
+    max_candidates = 1000
+
+    def __init__(self):
+        # The last position seen, and where the moves sent since lead
+        self.position = None
+        self.planned = None
+        # [direction, time published] of the moves not yet matched
+        self.pending = collections.deque()
+        self.rejections = 0
+        self.latencies = []
+        self.sent = self.accepted = self.rejected = self.unmatched = 0
+
+    def plan(self, direction):
+        """Record a move about to be sent"""
+        self.pending.append([direction, None])
+        self.planned = step(self.planned, direction)
+
+    def published(self, time):
+        """Record that the oldest unpublished move was published at ``time``"""
+        for move in self.pending:
+            if move[1] is None:
+                move[1] = time
+                self.sent += 1
+                return
+
+    def reject(self):
+        """Record a `move_rejection`"""
+        self.rejections += 1
+        self.rejected += 1
+
+    def _match(self, position):
+        """The number of moves handled to reach ``position``, and which of
+        them were refused; (None, None) if there is no such match"""
+        published = sum(1 for move in self.pending if move[1] is not None)
+        tried = 0
+        for handled in range(self.rejections, published + 1):
+            moves = list(itertools.islice(self.pending, handled))
+            for refused in itertools.combinations(range(handled), self.rejections):
+                tried += 1
+                if tried > self.max_candidates:
+                    return None, None
+                reached = self.position
+                for i, (direction, sent) in enumerate(moves):
+                    if i not in refused:
+                        reached = step(reached, direction)
+                if reached == position:
+                    return handled, set(refused)
+        return None, None
+
+    def observe(self, position, time):
+        """Record a state showing the player at ``position`` at ``time``"""
+        position = tuple(position)
+        if self.position is None:
+            self.position = self.planned = position
+            return
+        handled, refused = self._match(position)
+        if handled is None:
+            # Moved by other means: start afresh from here
+            self.unmatched += sum(1 for move in self.pending if move[1] is not None)
+            self.pending.clear()
+            handled, refused = 0, set()
+        for i in range(handled):
+            direction, sent = self.pending.popleft()
+            if i not in refused:
+                self.accepted += 1
+                self.latencies.append(time - sent)
+        self.rejections = 0
+        self.position = self.planned = position
+        for direction, sent in self.pending:
+            self.planned = step(self.planned, direction)
+
+
+class LoadTestBot(HighPerformanceBaseGridUniverseBot):
+    """A synthetic player that moves at random at ``rate`` moves per second.
+
+    Moves come at exponentially distributed intervals, or at fixed ones if
+    ``poisson`` is False. The player keeps off walls and the edges of the
+    grid, and doesn't step straight back.
+    """
+
+    rate = 4.0
+    poisson = True
+    state_format = 'packed'
+
+    def __init__(self, *args, **kwargs):
+        super(LoadTestBot, self).__init__(*args, **kwargs)
+        self.moves = MoveTracker()
+        self._walls = (None, frozenset())
+
+    def get_wait_time(self):
+        if self.poisson:
+            return random.expovariate(self.rate)
+        return 1.0 / self.rate
+
+    @property
+    def wall_set(self):
+        walls = self.state.get('walls')
+        if self._walls[0] is not walls:
+            self._walls = (walls, frozenset(self.wall_positions))
+        return self._walls[1]
+
+    def get_next_key(self):
+        planned = self.moves.planned
+        if planned is None:
+            return None
+        rows, columns = self.state['rows'], self.state['columns']
+        back = OPPOSITE[self.moves.pending[-1][0]] if self.moves.pending else None
+        open_directions = [
+            direction for direction in sorted(STEPS)
+            if 0 <= step(planned, direction)[0] < rows
+            and 0 <= step(planned, direction)[1] < columns
+            and step(planned, direction) not in self.wall_set
+        ]
+        directions = [d for d in open_directions if d != back] or open_directions
+        if not directions:
+            return None
+        direction = random.choice(directions)
+        self.moves.plan(direction)
+        return KEYS[direction]
+
+    def handle_move_rejection(self, data):
+        self.moves.reject()
+
+
+class LoadTest(AsyncBotHost):
+    """Plays ``players`` `LoadTestBot` players against the server at ``url``,
+    each sending ``rate`` moves per second.
+
+    Each move is published as a message of its own, as browsers send them,
+    unless ``batch`` is True, in which case the moves queued over each
+    ``flush_interval`` go to the server as one `batch` message.
+    """
+
+    def __init__(self, url, players, rate=4.0, poisson=True, flush_interval=0.005,
+                 batch=False, redis=None):
+        super(LoadTest, self).__init__(
+            url, LoadTestBot, count=players, flush_interval=flush_interval, redis=redis
+        )
+        for bot in self.bots:
+            bot.rate = rate
+            bot.poisson = poisson
+        self.batch = batch
+        self.first_move = self.last_move = None
+        self._players = {}
+
+    def players(self):
+        """The bots in the game by player id"""
+        bots = self.listeners['griduniverse']
+        if len(self._players) != len(bots):
+            self._players = dict((str(bot.participant_id), bot) for bot in bots)
+        return self._players
+
+    def now(self):
+        return asyncio.get_event_loop().time()
+
+    async def flush(self):
+        if self.batch:
+            moves = [m for m in self.outbox if m.get('type') == 'move']
+            # Latency counts the time taken to publish the moves
+            now = self.now()
+            await super(LoadTest, self).flush()
+            self.published(moves, now)
+            return
+        messages, self.outbox = self.outbox, []
+        for message in messages:
+            now = self.now()
+            await self.redis.publish('griduniverse_ctrl', json.dumps(message))
+            if message.get('type') == 'move':
+                self.published([message], now)
+
+    def published(self, moves, now):
+        """Record that ``moves`` were published at ``now``"""
+        if not moves:
+            return
+        self.last_move = now
+        if self.first_move is None:
+            self.first_move = now
+        players = self.players()
+        for move in moves:
+            players[str(move['player_id'])].moves.published(now)
+
+    def dispatch(self, channel, data):
+        if data.get('type') == 'move_rejection':
+            # Only the player concerned needs to hear of it
+            bot = self.players().get(str(data['player_id']))
+            if bot is not None:
+                bot.receive(channel, data)
+            return
+        before = self.views.get(channel)
+        super(LoadTest, self).dispatch(channel, data)
+        view = self.views.get(channel)
+        if view is None or view is before:
+            return
+        now = self.now()
+        positions = dict(
+            (str(player['id']), player['position'])
+            for player in view.get('grid', {}).get('players', [])
+        )
+        for bot in self.listeners[channel]:
+            position = positions.get(str(bot.participant_id))
+            if position is not None:
+                bot.moves.observe(position, now)
+
+    def summary(self):
+        """Counts, throughput and latency percentiles of the moves so far"""
+        trackers = [bot.moves for bot in self.bots]
+        latencies = numpy.array(sum((t.latencies for t in trackers), []))
+        duration = 0.0
+        if self.first_move is not None:
+            duration = self.last_move - self.first_move
+        summary = {
+            'players': len(self.bots),
+            'duration': duration,
+            'sent': sum(t.sent for t in trackers),
+            'accepted': sum(t.accepted for t in trackers),
+            'rejected': sum(t.rejected for t in trackers),
+            'unmatched': sum(t.unmatched for t in trackers),
+            'latency': {},
+        }
+        summary['throughput'] = summary['sent'] / duration if duration else 0.0
+        if latencies.size:
+            summary['latency'] = dict(
+                ('p{}'.format(p), float(numpy.percentile(latencies, p)))
+                for p in PERCENTILES
+            )
+            summary['latency'].update(
+                mean=float(latencies.mean()),
+                max=float(latencies.max()),
+            )
+        return summary
+
+
+def format_summary(summary):
+    """A report of a load test's summary, one figure per line"""
+    lines = [
+        'Players: {players}'.format(**summary),
+        'Moves sent: {sent} in {duration:.1f}s ({throughput:.1f}/s)'.format(**summary),
+        'Moves accepted: {accepted}, rejected: {rejected}, '
+        'unmatched: {unmatched}'.format(**summary),
+    ]
+    latency = summary['latency']
+    if latency:
+        lines.append('Latency (ms): ' + ', '.join(
+            '{} {:.1f}'.format(name, latency[name] * 1000)
+            for name in ['p{}'.format(p) for p in PERCENTILES] + ['mean', 'max']
+        ))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Measure how long moves take to reach the states a '
+                    'Griduniverse server broadcasts, under load.'
+    )
+    parser.add_argument('url', help='the URL of the experiment server')
+    parser.add_argument('--players', type=int, default=10)
+    parser.add_argument('--rate', type=float, default=4.0,
+                        help='moves per second sent by each player')
+    parser.add_argument('--constant', action='store_true',
+                        help='send moves at fixed intervals rather than at '
+                             'exponentially distributed ones')
+    parser.add_argument('--flush-interval', type=float, default=0.005)
+    parser.add_argument('--batch', action='store_true',
+                        help='send the moves of each flush interval as one '
+                             'batch message rather than one message each')
+    parser.add_argument('--json', help='a file to write the summary to')
+    args = parser.parse_args(argv)
+
+    from dallinger.config import get_config
+    config = get_config()
+    if not config.ready:
+        config.load()
+    test = LoadTest(
+        args.url,
+        players=args.players,
+        rate=args.rate,
+        poisson=not args.constant,
+        flush_interval=args.flush_interval,
+        batch=args.batch,
+    )
+    asyncio.run(test.run())
+    summary = test.summary()
+    print(format_summary(summary))
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(summary, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,8 @@
-import gevent
-import itertools
+import collections
 import random
 
+import numpy
+
 
 class Wall(object):
     """A segment of colored wall occupying a single grid postion"""
@@ -21,131 +22,147 @@ class Wall(object):
             return self.position
 
 
-def labyrinth(columns=25, rows=25, density=1.0, contiguity=1.0):
+def labyrinth(columns=25, rows=25, density=1.0, contiguity=1.0, rng=random):
     """Builds a labyrinth of Wall objects of a given size, with a given
     density and contiguity. A density of 1.0 will produce a maze that
     is 50% Wall and 50% open space. A contiguity of 1.0 will produce a maze with
     no neighborless Walls. A contiguity < 1 will be increasingly likely to
-    contain neighborless Walls.
+    contain neighborless Walls. Random choices are drawn from ``rng``.
     """
     if density:
-        walls = [Wall(position=pos) for pos in _generate(rows, columns)]
-        # Add sleep to avoid timeouts
-        gevent.sleep(0.00001)
-        return _prune(walls, density, contiguity)
+        positions = _generate(rows, columns, rng)
+        kept = _survivors(positions, density, contiguity, rng)
+        return [Wall(position=positions[i]) for i in kept]
     else:
         return []
 
 
-def _generate(rows, columns):
+def _generate(rows, columns, rng=random):
     """Generate an initial maze with 50% wall and 50% space."""
+    return numpy.argwhere(wall_grid(rows, columns, rng)).tolist()
+
+
+def wall_grid(rows, columns, rng=random):
+    """Generate an initial maze as a boolean array, True where walls are.
+
+    The maze has a cell at every odd row and column, joined to the cells
+    around it by a random spanning tree; it is laid out row after row across
+    a grid of ``rows`` by ``columns``. Random draws come from the NumPy
+    generator of ``rng`` if it has one, and from one seeded by ``rng``
+    otherwise.
+    """
     c = (columns - 1) // 2
     r = (rows - 1) // 2
-    visited = [[0] * c + [1] for _ in range(r)] + [[1] * (c + 1)]
-    ver = [["* "] * c + ['*'] for _ in range(r)] + [[]]
-    hor = [["**"] * c + ['*'] for _ in range(r + 1)]
-
-    # Select a starting position at random, and mark it as visited:
-    sx = random.randrange(c)
-    sy = random.randrange(r)
-    visited[sy][sx] = 1
-
-    stack = [(sx, sy)]
-    while len(stack) > 0:
-        (x, y) = stack.pop()
-        d = [
-            (x - 1, y),
-            (x, y + 1),
-            (x + 1, y),
-            (x, y - 1)
-        ]
-        random.shuffle(d)
-        for (xx, yy) in d:
-            if visited[yy][xx]:
+    maze = numpy.ones((2 * r + 1, 2 * c + 1), dtype=bool)
+    grid = numpy.zeros((rows, columns), dtype=bool)
+    if not (r > 0 and c > 0):
+        grid.ravel()[:maze.size] = maze.ravel()
+        return grid
+    nprng = getattr(rng, 'numpy', None)
+    if nprng is None:
+        nprng = numpy.random.RandomState(rng.getrandbits(32))
+
+    # Cells are numbered row by row; -1 marks a neighbor off the grid.
+    cells = numpy.arange(r * c)
+    y, x = cells // c, cells % c
+    neighbors = numpy.stack([
+        numpy.where(x > 0, cells - 1, -1),
+        numpy.where(y < r - 1, cells + c, -1),
+        numpy.where(x < c - 1, cells + 1, -1),
+        numpy.where(y > 0, cells - c, -1),
+    ], axis=1)
+    # Visit each cell's neighbors in a random order
+    order = nprng.random_sample((r * c, 4)).argsort(axis=1)
+    neighbors = numpy.take_along_axis(neighbors, order, axis=1).tolist()
+
+    start = nprng.randint(r * c)
+    visited = [False] * (r * c)
+    visited[start] = True
+    stack = [start]
+    parents = []
+    children = []
+    while stack:
+        cell = stack.pop()
+        for neighbor in neighbors[cell]:
+            if neighbor < 0 or visited[neighbor]:
+                continue
+            visited[neighbor] = True
+            stack.append(neighbor)
+            parents.append(cell)
+            children.append(neighbor)
+
+    # Open every cell, and the wall between each cell and the one it was
+    # reached from, halfway between the two.
+    maze[1::2, 1::2] = False
+    parents = numpy.array(parents, dtype=int)
+    children = numpy.array(children, dtype=int)
+    maze[
+        parents // c + children // c + 1,
+        parents % c + children % c + 1,
+    ] = False
+    grid.ravel()[:maze.size] = maze.ravel()
+    return grid
+
+
+def _prune(walls, density, contiguity, rng=random):
+    """Prune walls to a labyrinth with the given density and contiguity.
+
+    Terminal walls, with at most one neighbor, are removed first, exposing
+    the walls behind them as new terminals, until enough walls are gone or
+    only loops of wall remain. Then walls are removed at random to lower
+    the contiguity.
+    """
+    kept = _survivors([w.position for w in walls], density, contiguity, rng)
+    return [walls[i] for i in kept]
+
+
+def _survivors(positions, density, contiguity, rng=random):
+    """The indexes of the wall positions left standing by `_prune`."""
+    num_to_prune = int(round(len(positions) * (1 - density)))
+    to_prune = _peel_terminals(positions, num_to_prune)
+    kept = [i for i in range(len(positions)) if i not in to_prune]
+
+    num_to_prune = int(round(len(kept) * (1 - contiguity)))
+    to_prune = set(rng.sample(range(len(kept)), num_to_prune))
+    return [k for i, k in enumerate(kept) if i not in to_prune]
+
+
+def _peel_terminals(positions, limit):
+    """The indexes of up to ``limit`` wall positions removed from the ends
+    inward.
+
+    Walls are queued as they become terminal, so each wall and each pair of
+    neighbors is visited once.
+    """
+    if not len(positions) or not limit:
+        return set()
+    positions = numpy.asarray(positions, dtype=int)
+    # Look neighbors up in a padded grid of wall indexes, -1 where open
+    origin = positions.min(axis=0) - 1
+    rows, columns = (positions - origin).T
+    index = -numpy.ones((rows.max() + 2, columns.max() + 2), dtype=int)
+    index[rows, columns] = numpy.arange(len(positions))
+    adjacent = numpy.stack([
+        index[rows + 1, columns],
+        index[rows - 1, columns],
+        index[rows, columns + 1],
+        index[rows, columns - 1],
+    ], axis=1)
+
+    degrees = (adjacent >= 0).sum(axis=1)
+    queued = (degrees <= 1).tolist()
+    terminals = collections.deque(numpy.flatnonzero(degrees <= 1).tolist())
+    degrees = degrees.tolist()
+    neighbors = adjacent.tolist()
+    removed = set()
+    while terminals and len(removed) < limit:
+        i = terminals.popleft()
+        removed.add(i)
+        for j in neighbors[i]:
+            if j < 0 or j in removed:
                 continue
-            if xx == x:
-                hor[max(y, yy)][x] = "* "
-            if yy == y:
-                ver[y][max(x, xx)] = "  "
-            stack.append((xx, yy))
-            visited[yy][xx] = 1
-
-    # Convert the maze to a list of wall cell positions.
-    the_rows = ([j for i in zip(hor, ver) for j in i])
-    the_rows = [list("".join(j)) for j in the_rows]
-    maze = [item == '*' for sublist in the_rows for item in sublist]
-    positions = []
-    for idx, value in enumerate(maze):
-        if value:
-            positions.append([idx // columns, idx % columns])
-
-    return positions
-
-
-def _prune(walls, density, contiguity):
-    """Prune walls to a labyrinth with the given density and contiguity."""
-    num_to_prune = int(round(len(walls) * (1 - density)))
-    num_pruned = 0
-    while num_pruned < num_to_prune:
-        to_prune = _classify_terminals(
-            walls, limit=num_to_prune - num_pruned
-        )
-        walls = [w for i, w in enumerate(walls) if i not in to_prune]
-        if len(to_prune) == 0:
-            break
-        num_pruned += len(to_prune)
-
-    num_to_prune = int(round(len(walls) * (1 - contiguity)))
-    to_prune = set(random.sample(range(len(walls)), num_to_prune))
-    walls = [w for i, w in enumerate(walls) if i not in to_prune]
-
-    return walls
-
-
-def _classify_terminals(walls, limit=None):
-    found = [set()]
-    unmatched = {}
-    enumerated_walls = tuple(enumerate(walls))
-    position_map = {tuple(w.position): i for i, w in enumerated_walls}
-
-    for i, w in enumerated_walls:
-        neighbors = set()
-        for adj in ([1, 0], [-1, 0], [0, 1], [0, -1]):
-            neighbor = tuple(p1 + p2 for p1, p2 in zip(w.position, adj))
-            if neighbor in position_map:
-                neighbors.add(neighbor)
-        if len(neighbors) <= 1:
-            found[0].add(i)
-            if limit and len(found[0]) >= limit:
-                break
-        elif len(neighbors) == 2:
-            n_indexes = {position_map[i] for i in neighbors}
-            j = 0
-            while j < len(found):
-                if n_indexes.intersection(found[j]):
-                    if len(found) < j + 2:
-                        found.append(set())
-                    up_next = found[j + 1]
-                    up_next.add(i)
-                    break
-                j += 1
-            else:
-                unmatched[i] = n_indexes
-
-    for index in unmatched:
-        j = 0
-        n_indexes = unmatched[index]
-        while j < len(found):
-            if n_indexes.intersection(found[j]):
-                if len(found) < j + 2:
-                    found.append(set())
-                up_next = found[j + 1]
-                up_next.add(index)
-                break
-            j += 1
-
-    to_prune = set()
-    for entries in found:
-        if len(to_prune) < limit:
-            to_prune = to_prune.union(set(itertools.islice(entries, limit - len(to_prune))))
-    return to_prune
+            degrees[j] -= 1
+            if degrees[j] <= 1 and not queued[j]:
+                queued[j] = True
+                terminals.append(j)
+    return removed
@@ -0,0 +1,100 @@
+"""Oracles that score batches of active-learning queries with simulated games.
+
+A `BatchOracle` turns each query point into a configuration with the
+function it is given, plays a simulated game for every point of a batch in
+a pool of processes, and returns the scores together:
+
+    >>> oracle = BatchOracle(lambda x: {'num_food': int(100 * x[0])},
+    ...                      bot_policy='AdvantageSeekingBot',
+    ...                      time_per_round=20.0, concurrency=4, timeout=60)
+    >>> scores = oracle([learner.next_query() for i in range(4)])
+
+Called with a single point, as `learner.query(oracle.single, x)` does, it
+plays one game.
+"""
+import json
+import logging
+import multiprocessing
+import signal
+
+from .rng import derive_seed
+from .simulation import simulate
+
+logger = logging.getLogger('griduniverse')
+
+
+class EvaluationTimeout(Exception):
+    """A game took longer to play than the oracle allows."""
+
+
+def _timed_out(signum, frame):
+    raise EvaluationTimeout()
+
+
+def _evaluate(task):
+    config, seed, metric, timeout = task
+    if timeout:
+        # Worker processes run each game in their main thread, where an
+        # alarm can interrupt it
+        previous = signal.signal(signal.SIGALRM, _timed_out)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return simulate(seed=seed, **config)[metric]
+    except EvaluationTimeout:
+        logger.info('Evaluation of {} timed out after {}s'.format(config, timeout))
+        return None
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+class BatchOracle(object):
+    """Scores query points by playing a simulated game for each.
+
+    ``to_config`` maps a point to the parameters of its game, and
+    ``to_score`` the game's ``metric`` to the score returned. Keyword
+    arguments are parameters shared by every game. Up to ``concurrency``
+    games are played at once, each stopped after ``timeout`` seconds; the
+    score of a game that was stopped is ``timeout_score``.
+    """
+
+    def __init__(self, to_config, metric='average_score', to_score=None,
+                 concurrency=None, timeout=None, timeout_score=None, seed=0,
+                 **fixed):
+        self.to_config = to_config
+        self.metric = metric
+        self.to_score = to_score or (lambda value: value)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.timeout_score = timeout_score
+        self.seed = seed
+        self.fixed = fixed
+
+    def tasks(self, points):
+        tasks = []
+        for point in points:
+            config = dict(self.fixed, **self.to_config(point))
+            seed = derive_seed(self.seed, json.dumps(config, sort_keys=True))
+            tasks.append((config, seed, self.metric, self.timeout))
+        return tasks
+
+    def __call__(self, points):
+        """The scores of a batch of points, in the same order"""
+        tasks = self.tasks(points)
+        if self.concurrency == 1 or len(tasks) <= 1:
+            values = [_evaluate(task) for task in tasks]
+        else:
+            pool = multiprocessing.Pool(self.concurrency)
+            try:
+                values = pool.map(_evaluate, tasks)
+            finally:
+                pool.terminate()
+        return [
+            self.timeout_score if value is None else self.to_score(value)
+            for value in values
+        ]
+
+    def single(self, point):
+        """The score of one point"""
+        return self([point])[0]
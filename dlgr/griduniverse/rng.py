@@ -0,0 +1,54 @@
+"""Named random number streams for the parts of the game that use chance.
+
+Each subsystem draws from a stream of its own, so that, for example, how
+often players move does not change where food spawns. All streams of a grid
+are derived from a single seed; a grid without a seed draws from the global
+`random` and `numpy.random` state instead.
+"""
+import hashlib
+import random
+
+import numpy
+
+#: The subsystems with a stream of their own
+STREAMS = ('maze', 'food', 'motion', 'identity')
+
+
+def derive_seed(seed, name):
+    """The seed of the stream ``name``, stable across processes and versions"""
+    key = u'{}:{}'.format(seed, name).encode('utf-8')
+    return int(hashlib.sha256(key).hexdigest()[:8], 16)
+
+
+class Stream(random.Random):
+    """A `random.Random` with a NumPy generator seeded alongside it."""
+
+    def __init__(self, seed):
+        super(Stream, self).__init__(seed)
+        self.numpy = numpy.random.RandomState(seed)
+
+
+class GlobalStream(object):
+    """The global random state, behind the interface of a `Stream`."""
+
+    numpy = numpy.random
+
+    def __getattr__(self, name):
+        return getattr(random, name)
+
+
+class RandomStreams(object):
+    """The random streams of one game, one attribute per subsystem.
+
+        >>> streams = RandomStreams(seed=42)
+        >>> streams.food.randint(0, 24)
+    """
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        for name in STREAMS:
+            if seed is None:
+                stream = GlobalStream()
+            else:
+                stream = Stream(derive_seed(seed, name))
+            setattr(self, name, stream)
@@ -0,0 +1,153 @@
+"""Headless Griduniverse games in virtual time.
+
+A `Simulator` plays a game on a Gridworld of its own, without Flask, Redis,
+gevent or a database, advancing a virtual clock instead of sleeping. Each
+player is driven by a policy; `BotPolicy` reuses the decision logic of the
+high performance bots.
+
+    >>> from dlgr.griduniverse.simulation import Simulator
+    >>> results = Simulator(bot_policy='FoodSeekingBot', num_food=20).run()
+    >>> results['average_score']
+"""
+import logging
+import random
+
+from selenium.webdriver.common.keys import Keys
+
+from . import bots
+from .clock import ManualClock
+from .experiment import Gridworld
+from .experiment import IllegalMove
+
+logger = logging.getLogger('griduniverse')
+
+
+class BotPolicy(object):
+    """Chooses a simulated player's moves with a griduniverse bot's logic.
+
+    The bot never connects to a server: it is handed the serialized grid
+    directly, and the key it picks is turned into a move. Keys other than
+    the arrow keys are ignored.
+    """
+
+    #: Moves sent by the browser for each arrow key
+    KEY_MOVES = {
+        Keys.UP: 'up',
+        Keys.DOWN: 'down',
+        Keys.LEFT: 'left',
+        Keys.RIGHT: 'right',
+    }
+
+    def __init__(self, bot_class, player_id):
+        self.bot = bot_class('http://localhost')
+        self.bot.player_id = player_id
+        self.bot.participant_id = player_id
+
+    def wait_time(self):
+        """Seconds until this player acts again"""
+        return self.bot.get_wait_time()
+
+    def next_move(self, state):
+        """The move to make given the serialized grid, or None"""
+        self.bot.state = state
+        return self.KEY_MOVES.get(self.bot.get_next_key())
+
+
+class Simulator(object):
+    """Plays one game of Griduniverse in virtual time.
+
+    Takes the experiment's parameters as keyword arguments, for example
+    ``Simulator(bot_policy='AdvantageSeekingBot', num_food=50).run()``.
+    ``tick`` is the virtual time between steps of the game rules, 10ms as
+    in `Griduniverse.game_loop`.
+    """
+
+    def __init__(self, tick=0.010, policy_factory=None, **config):
+        self.tick = tick
+        self.config = config
+        self.policy_factory = policy_factory or self.bot_policy
+        self.clock = ManualClock()
+
+    def bot_policy(self, player_id):
+        """Create a `BotPolicy` for the configured ``bot_policy``"""
+        bot_class = getattr(bots, self.config.get('bot_policy', u'RandomBot'))
+        return BotPolicy(bot_class, player_id)
+
+    def setup(self):
+        """Build a grid with its labyrinth, food and players"""
+        config = dict(self.config, clock=self.clock, singleton=False)
+        grid = Gridworld(**config)
+        grid.build_labyrinth()
+        for i in range(grid.num_food):
+            grid.spawn_food()
+        policies = {}
+        for i in range(grid.num_players):
+            player_id = str(i + 1)
+            grid.spawn_player(id=player_id)
+            policies[player_id] = self.policy_factory(player_id)
+        return grid, policies
+
+    def run(self):
+        """Play the game to its end and return a summary of the results"""
+        grid, policies = self.setup()
+        moves = rejected = 0
+        next_actions = {
+            player_id: self.clock.time() + policy.wait_time()
+            for player_id, policy in policies.items()
+        }
+        previous_second_timestamp = self.clock.time()
+
+        while not grid.game_over:
+            self.clock.advance(self.tick)
+            now = self.clock.time()
+
+            state = None
+            for player_id, policy in policies.items():
+                if next_actions[player_id] > now:
+                    continue
+                next_actions[player_id] = now + policy.wait_time()
+                if state is None:
+                    state = grid.serialize()
+                move = policy.next_move(state)
+                if move is None:
+                    continue
+                moves += 1
+                try:
+                    if grid.players[player_id].move(move) is not None:
+                        # The positions seen by the other policies changed
+                        state = None
+                except IllegalMove:
+                    rejected += 1
+
+            timed_events = (now - previous_second_timestamp) > 1.000
+            grid.step(timed_events=timed_events)
+            if timed_events:
+                previous_second_timestamp = now
+            grid.check_round_completion()
+
+        return self.results(grid, moves, rejected)
+
+    def results(self, grid, moves, rejected):
+        players = list(grid.players.values())
+        count = float(len(players)) or 1.0
+        return {
+            'scores': dict((p.id, p.score) for p in players),
+            'payoffs': dict((p.id, p.payoff) for p in players),
+            'average_score': sum(p.score for p in players) / count,
+            'average_payoff': sum(p.payoff for p in players) / count,
+            'food_consumed': len(grid.food_consumed),
+            'moves': moves,
+            'rejected_moves': rejected,
+            'duration': self.clock.time(),
+            'seed': grid.rng.seed,
+        }
+
+
+def simulate(seed=None, **config):
+    """Run one simulated game.
+
+    ``seed`` seeds the game's random streams, and `random` for the bots.
+    """
+    if seed is not None:
+        random.seed(seed)
+    return Simulator(seed=seed, **config).run()
@@ -0,0 +1,53 @@
+"""Spatial lookups of players on the grid."""
+import collections
+import math
+import operator
+
+
+class SpatialHash(object):
+    """Players bucketed into square cells, so that the players near a
+    position can be found without scanning every player.
+
+    Other items can be indexed by giving the ``position`` function that
+    returns an item's position.
+    """
+
+    def __init__(self, players, cell_size=1, position=operator.attrgetter('position')):
+        self.cell_size = max(1, int(cell_size))
+        self.position = position
+        self.buckets = collections.defaultdict(list)
+        for order, player in enumerate(players):
+            self.buckets[self._cell(position(player))].append((order, player))
+
+    def _cell(self, position):
+        return (position[0] // self.cell_size, position[1] // self.cell_size)
+
+    def neighbors(self, player, d=1):
+        """Return the other players within Manhattan distance ``d`` of
+        ``player``, in the order the players were indexed.
+        """
+        reach = int(math.ceil(float(d) / self.cell_size))
+        row, column = self._cell(player.position)
+        found = []
+        for r in range(row - reach, row + reach + 1):
+            for c in range(column - reach, column + reach + 1):
+                for order, other in self.buckets.get((r, c), ()):
+                    if other is not player and player.is_neighbor(other, d=d):
+                        found.append((order, other))
+        found.sort(key=lambda item: item[0])
+        return [other for order, other in found]
+
+    def within(self, top, left, bottom, right):
+        """Return the items in the rectangle of cells from (``top``,
+        ``left``) to (``bottom``, ``right``) inclusive, in the order they
+        were indexed.
+        """
+        found = []
+        for r in range(top // self.cell_size, bottom // self.cell_size + 1):
+            for c in range(left // self.cell_size, right // self.cell_size + 1):
+                for order, item in self.buckets.get((r, c), ()):
+                    row, column = self.position(item)
+                    if top <= row <= bottom and left <= column <= right:
+                        found.append((order, item))
+        found.sort(key=lambda item: item[0])
+        return [item for order, item in found]
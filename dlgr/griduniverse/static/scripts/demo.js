@@ -357,6 +357,8 @@ var playerSet = (function () {
     PlayerSet.prototype.update = function (allPlayersData) {
       var freshPlayerData,
           existingPlayer,
+          inView = {},
+          id,
           i;
 
       for (i = 0; i < allPlayersData.length; i++) {
@@ -382,6 +384,20 @@ var playerSet = (function () {
         }
         this._players[freshPlayerData.id] = new Player(freshPlayerData, last_dimness);
       }
+
+      if (settings.interest_management) {
+        // A player's own state only holds the players in view, so drop the
+        // ones that have wandered out of it.
+        for (i = 0; i < allPlayersData.length; i++) {
+          inView[allPlayersData[i].id] = true;
+        }
+        for (id in this._players) {
+          if (this._players.hasOwnProperty(id) && !inView[id] &&
+              this._players[id].id !== this.ego_id) {
+            delete this._players[id];
+          }
+        }
+      }
     };
 
     PlayerSet.prototype.startScheduledAutosyncOfEgoPosition = function () {
@@ -1124,6 +1140,18 @@ $(document).ready(function() {
           'move_rejection': onMoveRejected
         }
   };
+  if (settings.interest_management && !isSpectator) {
+    // Players get their states on a channel of their own, and ignore the
+    // whole grid sent to the shared channel for spectators.
+    new GUSocket({
+      'endpoint': 'chat',
+      'broadcast': CHANNEL + '_' + player_id,
+      'control': CONTROL_CHANNEL,
+      'lagTolerance': 0.001,
+      'callbackMap': {'state': onGameStateChange}
+    });
+    socketSettings.callbackMap.state = function () {};
+  }
   var socket = new GUSocket(socketSettings);
 
   socket.open().done(function () {
@@ -0,0 +1,207 @@
+"""Parameter sweeps over simulated Griduniverse games.
+
+A `Sweep` plays every configuration of a design with `simulate`, in a pool
+of worker processes, and collects the results into a table with one row
+per game. Designs are lists of configurations, built over `GU_PARAMS` keys
+with `grid_design` or `random_design`:
+
+    >>> from dlgr.griduniverse.sweep import Sweep, grid_design
+    >>> design = grid_design(num_food=[10, 50], walls_density=[0.0, 0.5])
+    >>> rows = Sweep(design, repeats=3, checkpoint='sweep.jsonl',
+    ...              bot_policy='FoodSeekingBot', time_per_round=60.0).run()
+
+With a checkpoint file, each finished game is appended to it as it
+completes, and running the same sweep again skips the games found there.
+Given a `ResultCache`, games already played by any sweep are not played
+again.
+"""
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+
+from .experiment import GU_PARAMS
+from .rng import derive_seed
+from .simulation import simulate
+
+logger = logging.getLogger('griduniverse')
+
+#: The results of each game, alongside its configuration
+METRICS = (
+    'average_payoff',
+    'average_score',
+    'number_of_actions',
+    'rejected_moves',
+    'food_consumed',
+    'duration',
+)
+
+
+def _check_params(names):
+    unknown = sorted(set(names) - set(GU_PARAMS))
+    if unknown:
+        raise ValueError('Unknown parameters: {}'.format(', '.join(unknown)))
+
+
+def grid_design(**space):
+    """Every combination of the values listed for each parameter"""
+    _check_params(space)
+    names = sorted(space)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(space[name] for name in names))
+    ]
+
+
+def random_design(samples, seed=None, **space):
+    """``samples`` configurations drawn at random.
+
+    Each parameter takes a list of values to choose from, or a
+    ``(low, high)`` tuple to draw from uniformly, as an integer for integer
+    parameters.
+    """
+    _check_params(space)
+    rng = random.Random(seed)
+    design = []
+    for i in range(samples):
+        config = {}
+        for name in sorted(space):
+            values = space[name]
+            if isinstance(values, tuple):
+                low, high = values
+                if GU_PARAMS[name] is int:
+                    config[name] = rng.randint(low, high)
+                else:
+                    config[name] = rng.uniform(low, high)
+            else:
+                config[name] = rng.choice(values)
+        design.append(config)
+    return design
+
+
+def run_key(config, repeat):
+    """Identifies one game of a sweep, in its checkpoint among others"""
+    return json.dumps(dict(config, repeat=repeat), sort_keys=True)
+
+
+def _play(task):
+    key, config, repeat, seed = task
+    results = simulate(seed=seed, **config)
+    row = dict(config, key=key, repeat=repeat, seed=seed)
+    row['number_of_actions'] = results['moves']
+    for metric in METRICS:
+        row.setdefault(metric, results.get(metric))
+    return row
+
+
+class Sweep(object):
+    """Plays each configuration of a design ``repeats`` times.
+
+    Keyword arguments are parameters shared by every configuration. Each
+    game's seed is derived from ``seed`` and the game's configuration, so
+    a sweep gives the same results however its games are scheduled.
+    """
+
+    def __init__(self, design, repeats=1, processes=None, checkpoint=None,
+                 seed=0, cache=None, **fixed):
+        _check_params(fixed)
+        self.design = design
+        self.repeats = repeats
+        self.processes = processes
+        self.checkpoint = checkpoint
+        self.seed = seed
+        self.cache = cache
+        self.fixed = fixed
+
+    def tasks(self):
+        """The ``(key, config, repeat, seed)`` of every game in the sweep"""
+        tasks = []
+        for config in self.design:
+            config = dict(self.fixed, **config)
+            for repeat in range(self.repeats):
+                key = run_key(config, repeat)
+                seed = derive_seed(self.seed, key)
+                tasks.append((key, config, repeat, seed))
+        return tasks
+
+    def completed(self):
+        """Rows already in the checkpoint, by key"""
+        rows = {}
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return rows
+        with open(self.checkpoint) as checkpoint:
+            for line in checkpoint:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    # The last line of a sweep that crashed mid-write
+                    continue
+                rows[row['key']] = row
+        return rows
+
+    def _open_checkpoint(self):
+        complete = True
+        if os.path.exists(self.checkpoint) and os.path.getsize(self.checkpoint):
+            with open(self.checkpoint, 'rb') as existing:
+                existing.seek(-1, os.SEEK_END)
+                complete = existing.read(1) == b'\n'
+        checkpoint = open(self.checkpoint, 'a')
+        if not complete:
+            # Start after the unfinished line rather than on it
+            checkpoint.write('\n')
+        return checkpoint
+
+    def run(self):
+        """Play the games not already checkpointed; return all the rows"""
+        tasks = self.tasks()
+        rows = self.completed()
+        pending = [task for task in tasks if task[0] not in rows]
+        cached = []
+        if self.cache is not None:
+            for key, config, repeat, seed in pending:
+                # Games are told apart by their seed, not their repeat number
+                row = self.cache.get(dict(config, seed=seed))
+                if row is not None:
+                    cached.append(dict(row, key=key, repeat=repeat))
+            done = set(row['key'] for row in cached)
+            pending = [task for task in pending if task[0] not in done]
+        logger.info('Sweep: {} games to play, {} already done'.format(
+            len(pending), len(tasks) - len(pending)
+        ))
+
+        checkpoint = self._open_checkpoint() if self.checkpoint else None
+        pool = None
+        if self.processes == 1 or len(pending) <= 1:
+            results = (_play(task) for task in pending)
+        else:
+            pool = multiprocessing.Pool(self.processes)
+            results = pool.imap_unordered(_play, pending)
+        try:
+            for row in itertools.chain(cached, results):
+                rows[row['key']] = row
+                if self.cache is not None:
+                    # Only the configuration and seed of the row make its key
+                    self.cache.set(row, row)
+                if checkpoint is not None:
+                    checkpoint.write(json.dumps(row) + '\n')
+                    checkpoint.flush()
+        finally:
+            if pool is not None:
+                pool.terminate()
+            if checkpoint is not None:
+                checkpoint.close()
+
+        return [rows[task[0]] for task in tasks]
+
+
+def write_table(rows, path):
+    """Write the rows of a sweep to a CSV file, one column per field"""
+    fields = sorted(set(itertools.chain.from_iterable(rows)))
+    with open(path, 'w') as table:
+        writer = csv.DictWriter(table, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
@@ -0,0 +1,286 @@
+"""Array-backed game rules for simulations with large populations.
+
+`ArrayGridworld` holds the players of a `Gridworld` in NumPy arrays and
+applies auto-motion, food consumption, tax, frequency-dependent payoffs and
+payoff computation to all of them at once. It follows `Gridworld.step` rule
+by rule, including the order in which random numbers are drawn and in which
+floating point sums are accumulated, so that both produce the same results
+from the same seed.
+"""
+import collections
+
+import numpy
+
+from .experiment import Gridworld
+from .experiment import fermi
+from .experiment import group_payoffs
+
+DIRECTIONS = ('up', 'down', 'left', 'right')
+OFFSETS = numpy.array([[-1, 0], [1, 0], [0, -1], [0, 1]])
+
+
+class ArrayGridworld(object):
+    """Runs the rules of a `Gridworld` over arrays of player state.
+
+    Food, walls, rounds and configuration stay on the wrapped grid. Player
+    state is copied into arrays by `load` and back onto the `Player` objects
+    by `sync`; call `sync` before using the grid's own methods or
+    serializing it. Auto-motion reads the elapsed round time once per tick,
+    where `Player.move` reads it once per player.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.load()
+
+    def load(self):
+        """Copy the state of the grid's players into arrays."""
+        grid = self.grid
+        self.players = list(grid.players.values())
+        count = len(self.players)
+        self.positions = numpy.array(
+            [p.position for p in self.players], dtype=int
+        ).reshape(count, 2)
+        self.scores = numpy.array([p.score for p in self.players], dtype=float)
+        self.payoffs = numpy.array([p.payoff for p in self.players], dtype=float)
+        self.color_idx = numpy.array([p.color_idx for p in self.players], dtype=int)
+        self.directions = numpy.array(
+            [DIRECTIONS.index(p.motion_direction) for p in self.players], dtype=int
+        )
+        self.motion_timestamps = numpy.array(
+            [p.motion_timestamp for p in self.players], dtype=float
+        )
+        self.speed_limits = numpy.array(
+            [p.motion_speed_limit for p in self.players], dtype=float
+        )
+        self.motion_costs = numpy.array(
+            [p.motion_cost for p in self.players], dtype=float
+        )
+        self._load_colors()
+
+        self.walls = numpy.zeros((grid.rows, grid.columns), dtype=bool)
+        for position in grid.wall_locations:
+            self.walls[position] = True
+        self._load_food()
+
+    def _load_colors(self):
+        # Contagion changes a player's color name but not its color index
+        names = Gridworld.player_color_names
+        self.colors = numpy.array(
+            [names.index(p.color) for p in self.players], dtype=int
+        )
+
+    def _load_food(self):
+        self.food = numpy.zeros((self.grid.rows, self.grid.columns), dtype=bool)
+        for position in self.grid.food_locations:
+            self.food[position] = True
+
+    def sync(self):
+        """Copy the arrays back onto the grid's players."""
+        positions = self.positions.tolist()
+        scores = self.scores.tolist()
+        payoffs = self.payoffs.tolist()
+        timestamps = self.motion_timestamps.tolist()
+        for i, player in enumerate(self.players):
+            player.position = positions[i]
+            player.score = scores[i]
+            player.payoff = payoffs[i]
+            player.motion_timestamp = timestamps[i]
+
+    def step(self, timed_events=False):
+        """Apply the game rules for one tick, as `Gridworld.step` does."""
+        grid = self.grid
+        if grid.motion_auto:
+            self.auto_move()
+
+        if grid.consumption_active:
+            self.consume()
+
+        if grid.contagion > 0:
+            self.sync()
+            grid.spread_contagion()
+            self._load_colors()
+
+        if timed_events:
+            grid.grow_food()
+            self.replenish_food()
+            grid.prune_excess_food()
+            self._load_food()
+            self.apply_tax()
+            if grid.frequency_dependence:
+                self.apply_frequency_dependent_payoff()
+
+        self.compute_payoffs()
+
+    def auto_move(self):
+        """Move every player one step in its current direction."""
+        grid = self.grid
+        if not grid.movement_enabled:
+            return
+
+        count = len(self.players)
+        # Player.move draws a tremble number even at a tremble rate of 0
+        for i in range(count):
+            grid.rng.motion.random()
+
+        elapsed = grid.elapsed_round_time
+        targets = self.positions + OFFSETS[self.directions]
+        numpy.clip(targets[:, 0], 0, grid.rows - 1, out=targets[:, 0])
+        numpy.clip(targets[:, 1], 0, grid.columns - 1, out=targets[:, 1])
+
+        limited = self.speed_limits > 0
+        wait_times = numpy.zeros(count)
+        wait_times[limited] = 1.0 / self.speed_limits[limited]
+        waited = ~limited | (elapsed > self.motion_timestamps + wait_times)
+        can_afford = self.scores >= self.motion_costs
+        open_cells = ~self.walls[targets[:, 0], targets[:, 1]]
+        candidates = waited & can_afford & open_cells
+
+        if grid.player_overlap:
+            moved = candidates
+        else:
+            moved = self._resolve_collisions(candidates, targets)
+
+        self.positions[moved] = targets[moved]
+        self.motion_timestamps[moved] = elapsed
+        self.scores[moved] -= self.motion_costs[moved]
+
+    def _resolve_collisions(self, candidates, targets):
+        """Decide which candidates move when players may not overlap.
+
+        `Gridworld.auto_move` moves players one at a time, so a player can
+        step into a cell that a player earlier in the order has just left.
+        Candidates heading for a cell that nobody occupies or also heads
+        for move regardless of the order. The rest are settled one by one.
+        """
+        columns = self.grid.columns
+        cells = self.grid.rows * columns
+        sources = self.positions[:, 0] * columns + self.positions[:, 1]
+        destinations = targets[:, 0] * columns + targets[:, 1]
+        occupancy = numpy.bincount(sources, minlength=cells)
+        demand = numpy.bincount(destinations[candidates], minlength=cells)
+        independent = (
+            candidates &
+            (occupancy[destinations] == 0) &
+            (demand[destinations] == 1)
+        )
+        moved = independent.copy()
+
+        contested = numpy.flatnonzero(candidates & ~independent)
+        if not len(contested):
+            return moved
+
+        occupants = collections.defaultdict(set)
+        contested_cells = numpy.unique(destinations[contested])
+        for j in numpy.flatnonzero(numpy.isin(sources, contested_cells)):
+            occupants[sources[j]].add(j)
+        for i in contested:
+            cell = destinations[i]
+            # Independent movers earlier in the order have left already
+            if any(not (independent[j] and j < i) for j in occupants[cell]):
+                continue
+            moved[i] = True
+            occupants[sources[i]].discard(i)
+            occupants[cell].add(i)
+        return moved
+
+    def consume(self):
+        """Players consume the food they are standing on."""
+        grid = self.grid
+        rows, columns = self.positions[:, 0], self.positions[:, 1]
+        on_food = numpy.flatnonzero(self.food[rows, columns])
+        if not len(on_food):
+            return
+
+        # Only the first player on a cell can eat its food
+        cells = rows[on_food] * grid.columns + columns[on_food]
+        first = numpy.unique(cells, return_index=True)[1]
+        eaters = []
+        for i in numpy.sort(on_food[first]):
+            position = (int(rows[i]), int(columns[i]))
+            food = grid.food_locations[position]
+            if food.maturity < grid.food_maturation_threshold:
+                continue
+            eaters.append(i)
+        if not eaters:
+            return
+
+        # Consumed cells hold players, so new food can never land on them
+        # and removing all of it first spawns food exactly where
+        # Gridworld.consume would.
+        for i in eaters:
+            position = (int(rows[i]), int(columns[i]))
+            grid.food_consumed.append(grid.food_locations.pop(position))
+            self.food[position] = False
+            grid.food_changed()
+        for i in eaters:
+            if grid.respawn_food:
+                self.spawn_food()
+            else:
+                grid.num_food -= 1
+
+        eaters = numpy.array(eaters)
+        rewards = numpy.where(
+            self.color_idx[eaters] > 0,
+            grid.food_reward,
+            grid.food_reward * grid.relative_deprivation,
+        )
+        self.scores[eaters] += rewards
+        if grid.public_good:
+            self.scores += grid.public_good * len(eaters)
+
+    def spawn_food(self):
+        """Spawn food in an empty cell, as `Gridworld.spawn_food` does."""
+        grid = self.grid
+        occupied = numpy.zeros((grid.rows, grid.columns), dtype=bool)
+        occupied[self.positions[:, 0], self.positions[:, 1]] = True
+        occupied |= self.food | self.walls
+        while True:
+            position = grid.food_probability_function(
+                grid.rows, grid.columns, *grid.probability_function_args,
+                rng=grid.rng.food)
+            row, column = position
+            inside = 0 <= row < grid.rows and 0 <= column < grid.columns
+            if not inside or not occupied[row, column]:
+                break
+        food = grid.spawn_food(position=position)
+        if inside:
+            self.food[tuple(food.position)] = True
+
+    def replenish_food(self):
+        """Spawn food until the grid holds `num_food` items."""
+        grid = self.grid
+        for i in range(int(round(grid.num_food) - len(grid.food_locations))):
+            self.spawn_food()
+
+    def apply_tax(self):
+        numpy.maximum(self.scores - self.grid.tax, 0, out=self.scores)
+
+    def apply_frequency_dependent_payoff(self):
+        """Reward or penalize players depending on how common their color is."""
+        grid = self.grid
+        abundances = numpy.bincount(self.colors, minlength=len(Gridworld.player_color_names))
+        # Only a handful of colors, so use the scalar function for each
+        payoffs = numpy.array([
+            fermi(
+                beta=grid.frequency_dependence,
+                p1=1.0 * abundance / len(self.players),
+                p2=0.5
+            ) * grid.frequency_dependent_payoff_rate
+            for abundance in abundances
+        ])
+        numpy.maximum(self.scores + payoffs[self.colors], 0, out=self.scores)
+
+    def compute_payoffs(self):
+        """Compute payoffs from scores, as `Gridworld.compute_payoffs` does."""
+        grid = self.grid
+        if not len(self.players):
+            return
+        self.payoffs = group_payoffs(
+            self.scores,
+            self.color_idx,
+            len(grid.player_colors),
+            grid.intragroup_competition,
+            grid.intergroup_competition,
+            grid.dollars_per_point,
+        )
@@ -0,0 +1,99 @@
+"""Encodings for the grid state carried by `state` messages.
+
+The default `json` encoding nests the grid as a JSON string inside the
+message, which is what the browser client expects. The `packed` encoding
+embeds the grid directly, so the whole message is decoded with a single
+`json.loads`, and stores players, food and walls column by column, with
+positions flattened into ``[row0, column0, row1, column1, ...]``.
+
+Dallinger relays pubsub messages as UTF-8 text, so both encodings are text;
+`packed` is the compact one.
+"""
+import json
+
+DEFAULT_FORMAT = 'json'
+STATE_FORMATS = ('json', 'packed')
+
+# Grid sections holding lists of positioned records
+_SECTIONS = ('players', 'food', 'walls', 'walls_added')
+_WALL_SECTIONS = ('walls', 'walls_added')
+
+
+def _pack_records(records):
+    """Turn a list of dicts into a dict of columns."""
+    columns = {}
+    for i, record in enumerate(records):
+        for key, value in record.items():
+            column = columns.setdefault(key, [None] * len(records))
+            column[i] = value
+    if 'position' in columns:
+        columns['position'] = [c for position in columns['position'] for c in position]
+    columns['count'] = len(records)
+    return columns
+
+
+def _unpack_records(columns):
+    """Turn a dict of columns back into a list of dicts."""
+    columns = dict(columns)
+    count = columns.pop('count')
+    if 'position' in columns:
+        flat = columns['position']
+        columns['position'] = [flat[i:i + 2] for i in range(0, len(flat), 2)]
+    records = [{} for _ in range(count)]
+    for key, values in columns.items():
+        for record, value in zip(records, values):
+            record[key] = value
+    return records
+
+
+def _wall_record(wall):
+    if isinstance(wall, list):
+        return {'position': wall}
+    return wall
+
+
+def pack_section(records):
+    """Return the `packed` form of one section of a serialized grid."""
+    return _pack_records([_wall_record(record) for record in records])
+
+
+def pack_grid(grid_state):
+    """Return the `packed` form of a serialized grid."""
+    packed = dict(grid_state)
+    for section in _SECTIONS:
+        if section in grid_state:
+            packed[section] = pack_section(grid_state[section])
+    return packed
+
+
+def unpack_grid(packed):
+    """Return the serialized grid described by its `packed` form."""
+    grid_state = dict(packed)
+    for section in _SECTIONS:
+        if section in packed:
+            grid_state[section] = _unpack_records(packed[section])
+    for section in _WALL_SECTIONS:
+        if section in grid_state:
+            grid_state[section] = [
+                w['position'] if w.get('color') is None else w
+                for w in grid_state[section]
+            ]
+    return grid_state
+
+
+def encode_state(message, grid_state, state_format=DEFAULT_FORMAT):
+    """Return a `state` message carrying ``grid_state`` in the given format."""
+    if state_format == 'packed':
+        return dict(message, grid=pack_grid(grid_state), format='packed')
+    return dict(message, grid=json.dumps(grid_state))
+
+
+def decode_grid(message):
+    """Return the grid state carried by a decoded `state` message."""
+    grid = message['grid']
+    if message.get('format') == 'packed':
+        return unpack_grid(grid)
+    if isinstance(grid, dict):
+        # Replayed states carry the grid as-is
+        return grid
+    return json.loads(grid)
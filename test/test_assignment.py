@@ -0,0 +1,99 @@
+import itertools
+import random
+
+import numpy
+
+from dlgr.griduniverse.assignment import TargetAssignment
+from dlgr.griduniverse.assignment import hungarian
+from dlgr.griduniverse.assignment import shared_assignment
+from dlgr.griduniverse.distance import DistanceField
+
+
+def best_total(costs):
+    n, m = costs.shape
+    if n <= m:
+        return min(
+            sum(costs[i, j] for i, j in enumerate(columns))
+            for columns in itertools.permutations(range(m), n)
+        )
+    return best_total(costs.T)
+
+
+def total(field, players, food, choices):
+    return sum(
+        field.path(players[player], food[j])[0] for player, j in choices.items()
+    )
+
+
+class TestHungarian(object):
+
+    def test_finds_minimum_cost(self):
+        rng = numpy.random.RandomState(0)
+        for shape in [(1, 1), (3, 3), (4, 4), (2, 5), (5, 3)]:
+            for i in range(5):
+                costs = rng.randint(0, 20, size=shape)
+                pairs = hungarian(costs)
+                assert len(pairs) == min(shape)
+                assert len(set(i for i, j in pairs)) == len(pairs)
+                assert len(set(j for i, j in pairs)) == len(pairs)
+                assert sum(costs[i, j] for i, j in pairs) == best_total(costs)
+
+    def test_empty(self):
+        assert hungarian(numpy.zeros((0, 3))) == []
+
+
+class TestTargetAssignment(object):
+
+    def field(self):
+        # A wall down column 3, open at the bottom
+        walls = [(row, 3) for row in range(9)]
+        return DistanceField(10, 10, walls)
+
+    def test_prefers_closest_players_among_equal_totals(self):
+        # 1 is 3 and 5 away from the food; 2 is 4 and 6 away
+        field = DistanceField(1, 12).update([(0, 0), (0, 11)])
+        players = {1: (0, 3), 2: (0, 4)}
+        choices = TargetAssignment(field).update(players, [(0, 0), (0, 11)])
+        assert choices == {1: 0, 2: 1}
+
+    def test_minimizes_total_distance(self):
+        food = [(0, 0), (0, 5)]
+        field = DistanceField(1, 6).update(food)
+        # Greedy would send 1 to the food 1 away, and 2 all the way across
+        choices = TargetAssignment(field).update({1: (0, 4), 2: (0, 2)}, food)
+        assert choices == {1: 1, 2: 0}
+
+    def test_skips_unreachable_food(self):
+        field = self.field()
+        food = [(0, 0)]
+        field.update(food)
+        choices = TargetAssignment(field).update({1: (0, 8), 2: (0, 1)}, food)
+        assert choices == {2: 0}
+        field = DistanceField(3, 3, [(1, 0), (1, 1), (1, 2)]).update(food)
+        assert TargetAssignment(field).update({1: (2, 2)}, food) == {}
+
+    def test_incremental_updates_match_fresh_ones(self):
+        field = self.field()
+        rng = random.Random(3)
+        cells = [(r, c) for r in range(10) for c in range(10) if c != 3 or r == 9]
+        assignment = TargetAssignment(field)
+        players = dict((i, rng.choice(cells)) for i in range(6))
+        food = rng.sample(cells, 5)
+        for step in range(20):
+            players[rng.randrange(6)] = rng.choice(cells)
+            if rng.random() < 0.3:
+                food[rng.randrange(len(food))] = rng.choice(cells)
+            field.update(food)
+            choices = assignment.update(players, food)
+            fresh = TargetAssignment(field).update(players, food)
+            assert len(choices) == len(fresh)
+            assert len(set(choices.values())) == len(choices)
+            assert total(field, players, food, choices) == total(field, players, food, fresh)
+
+    def test_shared_by_walls(self):
+        field = self.field()
+        assert shared_assignment(field) is shared_assignment(field)
+        fed = field.with_sources([(0, 0)])
+        assert shared_assignment(fed) is shared_assignment(field)
+        assert shared_assignment(fed).field is fed
+        assert shared_assignment(field.with_walls([(1, 1)])) is not shared_assignment(field)
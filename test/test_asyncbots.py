@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+import mock
+import pytest
+
+from dlgr.griduniverse.asyncbots import AsyncBotHost
+from dlgr.griduniverse.bots import RandomBot
+from dlgr.griduniverse.wire import encode_state
+
+
+@pytest.fixture
+def grid():
+    return {
+        'rows': 5,
+        'columns': 5,
+        'players': [{'id': 1, 'position': [1, 1]}],
+        'walls': [],
+        'food': [],
+    }
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+@pytest.mark.usefixtures('active_config')
+class TestAsyncBotHost(object):
+
+    @pytest.fixture
+    def host(self):
+        host = AsyncBotHost('http://example.com', RandomBot, count=2, redis=mock.Mock())
+        host.redis.publish = mock.AsyncMock()
+        for participant_id, bot in enumerate(host.bots, 1):
+            bot.participant_id = participant_id
+            bot.state_format = 'packed'
+            bot.get_wait_time = lambda: 0.001
+            bot.subscribe_to_quorum_channel()
+        return host
+
+    def state(self, grid, remaining_time):
+        return encode_state({'type': 'state', 'remaining_time': remaining_time}, grid, 'packed')
+
+    def test_bots_play_on_messages_as_they_arrive(self, host, grid):
+        bot = host.bots[0]
+
+        async def game():
+            playing = asyncio.ensure_future(host.participate(bot))
+            await asyncio.sleep(0.01)
+            assert not host.outbox
+            host.dispatch('quorum', {'q': 2, 'n': 2})
+            await asyncio.sleep(0.01)
+            # Connected, and waiting for the grid
+            assert [m['type'] for m in host.outbox] == ['connect']
+            host.dispatch('griduniverse_packed', self.state(grid, 60))
+            await asyncio.sleep(0.05)
+            host.dispatch('griduniverse', {'type': 'stop'})
+            return await playing
+
+        assert run(game()) is True
+        assert len(host.outbox) > 1
+        assert all(m['player_id'] == 1 for m in host.outbox)
+
+    def test_skips_the_game_if_overrecruited(self, host):
+        bot = host.bots[0]
+        bot._quorum_reached = bot._skip_experiment = True
+        assert run(host.participate(bot)) is True
+        assert host.outbox == []
+
+    def test_flush_publishes_one_batch(self, host):
+        host.publish({'type': 'move', 'player_id': 1, 'move': 'up'})
+        host.publish({'type': 'move', 'player_id': 2, 'move': 'up'})
+        run(host.flush())
+        run(host.flush())
+        host.redis.publish.assert_awaited_once()
+        channel, payload = host.redis.publish.call_args[0]
+        assert channel == 'griduniverse_ctrl'
+        assert len(json.loads(payload)['messages']) == 2
+
+    def test_listens_only_on_the_bots_channels(self, host):
+        pubsub = mock.Mock()
+        pubsub.subscribe = mock.AsyncMock()
+        late = RandomBot('http://example.com')
+        replies = [
+            lambda: host.subscribe(late, ['griduniverse_7']),
+            lambda: {'type': 'message', 'channel': b'quorum', 'data': '{"q": 2, "n": 2}'},
+        ]
+
+        class Done(Exception):
+            pass
+
+        async def get_message(timeout):
+            if not replies:
+                raise Done()
+            return replies.pop(0)()
+
+        pubsub.get_message = get_message
+        with pytest.raises(Done):
+            run(host.listen(pubsub))
+        subscribed = [list(c[0]) for c in pubsub.subscribe.call_args_list]
+        assert subscribed == [['griduniverse', 'quorum'], ['griduniverse_7']]
+        assert all(bot._quorum_reached for bot in host.bots)
+
+    def test_signs_up_from_the_event_loop(self, host):
+        bot = RandomBot('http://example.com', worker_id='w', hit_id='h', assignment_id='a')
+        host.add(bot)
+        response = mock.Mock()
+        response.json.side_effect = [
+            {'status': 'error'},
+            {'status': 'OK', 'participant': {'id': 7, 'status': 'working'},
+             'quorum': {'q': 3, 'n': 1, 'overrecruited': False}},
+        ]
+        host.request = mock.AsyncMock(return_value=response)
+        host.retry_delay = lambda: 0
+        assert run(host.sign_up(bot)) is True
+        assert bot.participant_id == 7
+        assert bot in host.listeners['quorum']
+        assert host.request.await_count == 2
+        method, url = host.request.call_args[0]
+        assert method == 'post'
+        assert url.startswith('http://example.com/participant/w/h/a/debug?')
+
+    def test_requests_are_retried_until_they_succeed(self, host):
+        from requests.exceptions import ConnectionError
+        host.retry_delay = lambda: 0
+        ok = mock.Mock()
+        with mock.patch('dlgr.griduniverse.asyncbots.requests.request') as request:
+            request.side_effect = [ConnectionError(), ok]
+            result = run(host.request('get', 'http://example.com/worker_complete'))
+        assert result is ok
+        assert request.call_count == 2
@@ -173,6 +173,56 @@ class TestRandomMovementBot(object):
         assert not bot._skip_experiment
 
 
+class TestStateMessages(object):
+
+    @pytest.fixture
+    def bot(self):
+        b = RandomBot('http://example.com')
+        b.grid = {}
+        return b
+
+    def test_asks_for_json_states_by_default(self, bot):
+        assert bot.state_format == 'json'
+
+    def test_handles_packed_state(self, bot, grid_state):
+        from dlgr.griduniverse.wire import encode_state
+        message = encode_state({'type': 'state', 'remaining_time': 60},
+                               json.loads(grid_state), 'packed')
+        bot.send('griduniverse_packed:' + json.dumps(message))
+        assert bot.grid['grid'] == json.loads(grid_state)
+        assert bot.grid['remaining_time'] == 60
+
+    def test_uses_shared_json_state_until_packed_state_arrives(self, bot, grid_state):
+        from dlgr.griduniverse.wire import encode_state
+        bot.state_format = 'packed'
+        message = {'type': 'state', 'grid': grid_state, 'remaining_time': 60}
+        bot.send('griduniverse:' + json.dumps(message))
+        assert bot.grid['remaining_time'] == 60
+        packed = encode_state({'type': 'state', 'remaining_time': 59},
+                              json.loads(grid_state), 'packed')
+        bot.send('griduniverse_packed:' + json.dumps(packed))
+        bot.send('griduniverse:' + json.dumps(message))
+        assert bot.grid['remaining_time'] == 59
+
+    def test_partial_state_keeps_walls(self, bot, grid_state):
+        from dlgr.griduniverse.wire import encode_state
+        full = json.loads(grid_state)
+        bot.handle_state(encode_state({'type': 'state'}, full, 'packed'))
+        partial = dict(full)
+        del partial['walls']
+        bot.handle_state(encode_state({'type': 'state'}, partial, 'packed'))
+        assert len(bot.grid['grid']['walls']) == len(full['walls'])
+
+    def test_appends_walls_added(self, bot, grid_state):
+        full = json.loads(grid_state)
+        bot.handle_state({'type': 'state', 'grid': json.dumps(full)})
+        partial = dict(full, walls_added=[[9, 9]])
+        del partial['walls']
+        bot.handle_state({'type': 'state', 'grid': json.dumps(partial)})
+        assert bot.grid['grid']['walls'] == full['walls'] + [[9, 9]]
+        assert 'walls_added' not in bot.grid['grid']
+
+
 class TestAdvantageSeekingBot(object):
 
     @pytest.fixture
@@ -217,6 +267,32 @@ class TestAdvantageSeekingBot(object):
             }
         }
 
+    def test_reads_walls_serialized_as_positions(self, bot_in_maze):
+        walls = bot_in_maze.wall_positions
+        bot_in_maze.state['walls'] = [list(w) for w in walls]
+        assert bot_in_maze.wall_positions == walls
+
+    def test_distances_follow_new_walls(self, bot_in_maze):
+        bot_in_maze.state['walls_version'] = 1
+        assert bot_in_maze.distances()[1][2] == 2
+        # Wall off the food at (4, 4) from player 1 at (5, 5)
+        bot_in_maze.state['walls'] = bot_in_maze.state['walls'] + [[4, 5], [5, 4]]
+        bot_in_maze.state['walls_version'] = 2
+        assert bot_in_maze.distances()[1][2] == 6
+
+    def test_bots_seeing_other_food_keep_fields_of_their_own(self, bot_in_maze, grid_state):
+        other = AdvantageSeekingBot('http://example.com')
+        other.grid = {}
+        state = json.loads(grid_state)
+        state['food'] = state['food'][:1]
+        other.handle_state({'grid': json.dumps(state), u'remaining_time': 60})
+        other.state = other.observe_state()
+        field, other_field = bot_in_maze.distance_field, other.distance_field
+        assert field is not other_field
+        assert len(field.sources) == 3 and len(other_field.sources) == 1
+        assert bot_in_maze.distance_field is field
+        assert other.distance_field is other_field
+
     def test_advantage_seeking_bot_goes_for_closest_food_not_already_a_target(self, bot_in_maze):
         bot_in_maze.player_id = 1
         assert bot_in_maze.get_next_key() == Keys.UP
@@ -0,0 +1,61 @@
+import mock
+import pytest
+
+from dlgr.griduniverse.cache import ResultCache
+from dlgr.griduniverse.cache import config_key
+
+
+class TestResultCache(object):
+
+    @pytest.fixture
+    def path(self, tmpdir):
+        return str(tmpdir.join('results.db'))
+
+    @pytest.fixture
+    def cache(self, path):
+        cache = ResultCache(path, max_entries=3, version='1')
+        yield cache
+        cache.close()
+
+    def test_keys_ignore_settings_that_do_not_change_the_game(self):
+        config = {'num_food': 10, 'bot_policy': u'RandomBot', 'seed': 1}
+        assert config_key(config) == config_key(
+            dict(config, num_food=10.0, mode=u'debug', num_dynos_worker=2)
+        )
+        assert config_key(config) != config_key(dict(config, seed=2))
+
+    def test_stores_results(self, cache):
+        assert cache.get({'num_food': 10}) is None
+        cache.set({'num_food': 10}, {'average_score': 3.5})
+        assert cache.get({'num_food': 10.0}) == {'average_score': 3.5}
+        assert {'num_food': 10} in cache
+
+    def test_persists(self, cache, path):
+        cache.set({'num_food': 10}, 3.5)
+        assert ResultCache(path, version='1').get({'num_food': 10}) == 3.5
+
+    def test_fetch_computes_only_on_a_miss(self, cache):
+        compute = mock.Mock(return_value=None)
+        assert cache.fetch({'num_food': 10}, compute) is None
+        assert cache.fetch({'num_food': 10}, compute) is None
+        assert compute.call_count == 1
+
+    def test_evicts_least_recently_used(self, cache):
+        with mock.patch('time.time') as now:
+            for i in range(3):
+                now.return_value = i
+                cache.set({'num_food': i}, i)
+            now.return_value = 3
+            cache.get({'num_food': 0})
+            now.return_value = 4
+            cache.set({'num_food': 3}, 3)
+        assert len(cache) == 3
+        assert {'num_food': 0} in cache
+        assert {'num_food': 1} not in cache
+
+    def test_other_code_versions_are_stale(self, cache, path):
+        cache.set({'num_food': 10}, 3.5)
+        newer = ResultCache(path, version='2')
+        assert newer.get({'num_food': 10}) is None
+        newer.prune_stale()
+        assert len(newer) == 0
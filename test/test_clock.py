@@ -0,0 +1,86 @@
+import pytest
+
+from dlgr.griduniverse.clock import AcceleratedClock
+from dlgr.griduniverse.clock import ManualClock
+from dlgr.griduniverse.clock import WallClock
+from dlgr.griduniverse.clock import clock_for
+from dlgr.griduniverse.experiment import Gridworld
+from dlgr.griduniverse.experiment import IllegalMove
+
+
+class TestManualClock(object):
+
+    def test_moves_only_when_advanced(self):
+        clock = ManualClock(start=10.0)
+        assert clock.time() == 10.0
+        clock.advance(2.5)
+        assert clock.time() == 12.5
+
+    def test_sleep_advances(self):
+        clock = ManualClock()
+        clock.sleep(0.25)
+        assert clock.time() == 0.25
+
+
+class TestAcceleratedClock(object):
+
+    def test_runs_faster_than_real_time(self):
+        with pytest.raises(ValueError):
+            AcceleratedClock(speed=0)
+        clock = AcceleratedClock(speed=1000, start=0.0)
+        # Ten seconds of game time take ten milliseconds
+        clock.sleep(10.0)
+        assert clock.time() >= 10.0
+
+    def test_clock_for(self):
+        assert isinstance(clock_for(1.0), WallClock)
+        clock = clock_for(10.0)
+        assert isinstance(clock, AcceleratedClock)
+        assert clock.speed == 10.0
+
+
+class TestGridworldClock(object):
+
+    @pytest.fixture
+    def clock(self):
+        return ManualClock(start=1000.0)
+
+    @pytest.fixture
+    def gridworld(self, clock):
+        return Gridworld(
+            singleton=False,
+            clock=clock,
+            num_rounds=2,
+            time_per_round=300.0,
+            food_maturation_speed=0.1,
+            motion_speed_limit=2,
+        )
+
+    def test_round_follows_clock(self, gridworld, clock):
+        gridworld.start_timestamp = clock.time()
+        clock.advance(299.0)
+        assert gridworld.remaining_round_time == pytest.approx(1.0)
+        gridworld.check_round_completion()
+        assert gridworld.round == 0
+        clock.advance(2.0)
+        gridworld.check_round_completion()
+        assert gridworld.round == 1
+
+    def test_food_matures_with_clock(self, gridworld, clock):
+        food = gridworld.spawn_food(position=[0, 0])
+        assert food.maturity == pytest.approx(0.0)
+        clock.advance(1000.0)
+        assert food.maturity == pytest.approx(1.0)
+
+    def test_speed_limit_follows_clock(self, gridworld, clock):
+        gridworld.start_timestamp = clock.time()
+        player = gridworld.spawn_player(id=1)
+        player.position = [0, 0]
+        clock.advance(1.0)
+        player.move('right')
+        assert player.position == [0, 1]
+        with pytest.raises(IllegalMove):
+            player.move('right')
+        clock.advance(1.0)
+        player.move('right')
+        assert player.position == [0, 2]
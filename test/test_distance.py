@@ -0,0 +1,140 @@
+import collections
+import random
+
+import mock
+import pytest
+
+from dlgr.griduniverse.distance import DistanceField
+from dlgr.griduniverse.distance import shared_field
+from dlgr.griduniverse.maze import labyrinth
+
+
+def brute_force(rows, columns, walls, sources):
+    """Distances to the nearest source by a fresh search"""
+    walls = set(map(tuple, walls))
+    distances = {}
+    queue = collections.deque()
+    for source in sources:
+        if source not in walls:
+            distances[source] = 0
+            queue.append(source)
+    while queue:
+        row, column = queue.popleft()
+        for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            cell = (row + dr, column + dc)
+            if (0 <= cell[0] < rows and 0 <= cell[1] < columns and
+                    cell not in walls and cell not in distances):
+                distances[cell] = distances[row, column] + 1
+                queue.append(cell)
+    return distances
+
+
+class TestDistanceField(object):
+
+    @pytest.fixture
+    def walls(self):
+        return [w.position for w in labyrinth(12, 12, 0.6, 0.9, rng=random.Random(2))]
+
+    def check(self, field, walls, sources):
+        expected = brute_force(12, 12, walls, sources)
+        for row in range(12):
+            for column in range(12):
+                distance, source = field.nearest((row, column))
+                assert distance == expected.get((row, column))
+                if distance:
+                    # The first step leads one closer to the same source
+                    dr, dc = {'N': (-1, 0), 'S': (1, 0), 'E': (0, 1), 'W': (0, -1)}[
+                        field.step((row, column))]
+                    assert field.nearest((row + dr, column + dc)) == (distance - 1, source)
+
+    def test_tracks_sources_as_they_come_and_go(self, walls):
+        rng = random.Random(1)
+        open_cells = [(r, c) for r in range(12) for c in range(12)
+                      if [r, c] not in walls]
+        field = DistanceField(12, 12, walls)
+        sources = []
+        for i in range(30):
+            if sources and rng.random() < 0.4:
+                sources.remove(rng.choice(sources))
+            else:
+                sources.append(rng.choice(open_cells))
+            field.update(sources)
+            self.check(field, walls, sources)
+
+    def test_tracks_walls_as_they_are_built_and_removed(self, walls):
+        rng = random.Random(4)
+        sources = [(r, c) for r, c in [(1, 1), (5, 6), (10, 3)] if [r, c] not in walls]
+        field = DistanceField(12, 12, walls).update(sources)
+        from_first = field.distances_from(sources[0])
+        walls = set(map(tuple, walls))
+        for i in range(40):
+            position = (rng.randrange(12), rng.randrange(12))
+            if position in sources:
+                continue
+            if position in walls:
+                walls.discard(position)
+                field.remove_wall(position)
+            else:
+                walls.add(position)
+                field.add_wall(position)
+            assert field.walls == walls
+            self.check(field, walls, sources)
+            expected = brute_force(12, 12, walls, sources[:1])
+            assert field.distances_from(sources[0]) is from_first
+            assert from_first == [
+                expected.get(divmod(j, 12)) for j in range(144)
+            ]
+
+    def test_with_walls_leaves_the_original_alone(self):
+        field = DistanceField(4, 4, [(1, 1)]).update([(0, 0)])
+        built = [(1, 1), (0, 1)]
+        derived = field.with_walls(built)
+        assert derived.nearest((0, 2)) == (6, (0, 0))
+        assert field.nearest((0, 2)) == (2, (0, 0))
+        assert field.with_walls(field.walls) is field
+        fresh = DistanceField(4, 4, built).update([(0, 0)])
+        assert derived.distance == fresh.distance
+
+    def test_paths_go_around_walls(self):
+        walls = [(1, 0), (1, 1), (1, 2)]
+        field = DistanceField(3, 4, walls)
+        assert field.path((0, 0), (2, 0)) == (8, 'EEESSWWW')
+        assert field.path((0, 0), (1, 0)) == (None, '')
+        assert field.path((0, 0), (5, 5)) == (None, '')
+
+    def test_no_sources(self):
+        field = DistanceField(3, 3)
+        assert field.nearest((1, 1)) == (None, None)
+        assert field.step((1, 1)) is None
+
+    def test_fields_are_shared_by_walls(self):
+        first = shared_field(5, 5, [[1, 1]])
+        assert shared_field(5, 5, [(1, 1)]) is first
+        assert shared_field(5, 5, [(1, 2)]) is not first
+
+    def test_shared_fields_derive_from_the_previous_walls(self):
+        first = shared_field(5, 5, [[1, 1]], [(0, 0)])
+        second = shared_field(5, 5, [(1, 1), (0, 1)], [(0, 0)], previous=first)
+        assert second.sources == first.sources
+        assert second.nearest((0, 2)) == (6, (0, 0))
+        assert first.nearest((0, 2)) == (2, (0, 0))
+
+    def test_fields_are_shared_by_walls_and_sources(self):
+        first = shared_field(5, 5, [[1, 1]], [(0, 0)])
+        assert shared_field(5, 5, [(1, 1)], [[0, 0]]) is first
+        second = shared_field(5, 5, [(1, 1)], [(4, 4)], previous=first)
+        assert second is not first
+        # Deriving a field for other sources leaves the original alone
+        assert first.nearest((4, 3)) == (7, (0, 0))
+        assert second.nearest((4, 3)) == (1, (4, 4))
+        fresh = DistanceField(5, 5, [(1, 1)]).update([(4, 4)])
+        assert second.distance == fresh.distance
+
+    def test_paths_to_other_cells_are_searched_once(self):
+        field = DistanceField(3, 4, [(1, 0), (1, 1), (1, 2)])
+        with mock.patch.object(field, '_spread', wraps=field._spread) as spread:
+            assert field.path((0, 0), (2, 0)) == (8, 'EEESSWWW')
+            assert field.path((0, 1), (2, 0)) == (7, 'EESSWWW')
+        assert spread.call_count == 1
+        field.add_wall((1, 3))
+        assert field.path((0, 0), (2, 0)) == (None, '')
@@ -0,0 +1,78 @@
+import mock
+import pytest
+
+from dlgr.griduniverse.evolution import DeploymentEvaluator
+from dlgr.griduniverse.evolution import Evolution
+from dlgr.griduniverse.evolution import SimulationEvaluator
+
+GENES = {
+    'num_food': lambda rng: rng.randint(0, 100),
+    'respawn_food': lambda rng: bool(rng.getrandbits(1)),
+}
+
+
+def food_fitness(genomes):
+    return [genome['num_food'] for genome in genomes]
+
+
+class TestEvolution(object):
+
+    @pytest.fixture
+    def evolution(self):
+        return Evolution(food_fitness, genes=GENES, population_size=8, seed=4)
+
+    def test_rejects_unknown_genes(self):
+        with pytest.raises(ValueError):
+            Evolution(food_fitness, genes={'num_fod': GENES['num_food']})
+
+    def test_fitness_improves(self, evolution):
+        evolution.step()
+        first = evolution.history[0]
+        evolution.run(generations=10)
+        last = evolution.history[-1]
+        assert evolution.generation == 9
+        assert last['mean_fitness'] > first['mean_fitness']
+        assert evolution.best == last['best']
+
+    def test_elites_survive(self, evolution):
+        evolution.elitism = 2
+        evolution.step()
+        ranked = sorted(evolution.population, key=lambda g: g['num_food'])
+        evolution.step()
+        assert evolution.population[:2] == [ranked[-1], ranked[-2]]
+
+    def test_resumes_from_checkpoint(self, tmpdir):
+        path = str(tmpdir.join('evolution.json'))
+        uninterrupted = Evolution(food_fitness, genes=GENES, seed=4)
+        uninterrupted.run(generations=6)
+
+        Evolution(food_fitness, genes=GENES, seed=4, checkpoint=path).run(generations=3)
+        evaluator = mock.Mock(side_effect=food_fitness)
+        resumed = Evolution(evaluator, genes=GENES, checkpoint=path)
+        resumed.run(generations=6)
+        assert evaluator.call_count == 3
+        assert resumed.history == uninterrupted.history
+
+
+class TestEvaluators(object):
+
+    def test_simulation_evaluator(self):
+        evaluate = SimulationEvaluator(
+            metric='average_score',
+            repeats=2,
+            processes=1,
+            max_participants=2,
+            time_per_round=1.0,
+            rows=8,
+            columns=8,
+        )
+        fitness = evaluate([{'num_food': 0}, {'num_food': 10}])
+        assert fitness[0] == 0
+        assert len(fitness) == 2
+
+    def test_deployment_evaluator(self):
+        experiment = mock.Mock()
+        experiment.average_payoff.side_effect = [1.0, 2.0]
+        evaluate = DeploymentEvaluator(experiment, mode=u'debug')
+        assert evaluate([{'num_food': 1}, {'num_food': 2}]) == [1.0, 2.0]
+        experiment.run.assert_called_with(mode=u'debug', num_food=2)
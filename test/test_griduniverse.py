@@ -78,10 +78,14 @@ class TestGameLoops(object):
         exp.grid.food_locations = []
         exp.grid.frequency_dependence = 1
         exp.grid.frequency_dependent_payoff_rate = 0
+        exp.grid.interest_management = False
         exp.grid.start_timestamp = time.time()
         exp.socket_session = mock.Mock()
         exp.publish = mock.Mock()
-        exp.grid.serialize.return_value = {}
+        snapshot = exp.grid.snapshot.return_value
+        exp.grid.take_snapshot.return_value = snapshot
+        snapshot.serialize.return_value = {}
+        snapshot.encode.return_value = '{}'
 
         def count_down(counter):
             for c in counter:
@@ -110,22 +114,22 @@ class TestGameLoops(object):
         # Spawn food called once for each num_food
         assert exp.grid.spawn_food.call_count == exp.grid.num_food
 
-    def test_loop_spawns_food_during_timed_events(self, loop_exp_3x):
-        # Spawn food called twice for each num_food, once at start and again
-        # on timed events to replenish empty list
+    def test_loop_triggers_timed_events(self, loop_exp_3x):
+        # Grid stepped with timed events once, since the first second passed
         exp = loop_exp_3x
 
         # Ensure one timed events round
         exp.grid.start_timestamp -= 2
 
         exp.game_loop()
-        assert exp.grid.spawn_food.call_count == exp.grid.num_food * 2
+        timed = [c[1]['timed_events'] for c in exp.grid.step.call_args_list]
+        assert timed == [True, False, False]
 
     def test_loop_serialized_and_saves(self, loop_exp_3x):
-        # Grid serialized and added to DB session once per loop
+        # Snapshot taken and added to DB session once per loop
         exp = loop_exp_3x
         exp.game_loop()
-        assert exp.grid.serialize.call_count == 3
+        assert exp.grid.take_snapshot.call_count == 3
         assert exp.socket_session.add.call_count == 3
         # Session commited once per loop and again at end
         assert exp.socket_session.commit.call_count == 4
@@ -137,21 +141,11 @@ class TestGameLoops(object):
         assert exp.grid.walls_updated is False
         assert exp.grid.food_updated is False
 
-    def test_loop_taxes_points(self, loop_exp_3x):
-        # Player is taxed one point during the timed event round
-        exp = loop_exp_3x
-
-        # Ensure one timed events round
-        exp.grid.start_timestamp -= 2
-
-        exp.game_loop()
-        assert exp.grid.players['1'].score == 9.0
-
-    def test_loop_computes_payoffs(self, loop_exp_3x):
-        # Payoffs computed once per loop before checking round completion
+    def test_loop_steps_grid(self, loop_exp_3x):
+        # Grid stepped once per loop before checking round completion
         exp = loop_exp_3x
         exp.game_loop()
-        assert exp.grid.compute_payoffs.call_count == 3
+        assert exp.grid.step.call_count == 3
         assert exp.grid.check_round_completion.call_count == 3
 
     def test_loop_publishes_stop_event(self, loop_exp_3x):
@@ -163,7 +157,7 @@ class TestGameLoops(object):
     def test_send_state_thread(self, loop_exp_3x):
         # State thread will loop 4 times before the loop is broken
         exp = loop_exp_3x
-        exp.grid.serialize.return_value = {
+        exp.grid.snapshot.return_value.serialize.return_value = {
             'grid': 'serialized',
             'walls': [],
             'food': [],
@@ -171,11 +165,65 @@ class TestGameLoops(object):
         }
 
         exp.send_state_thread()
-        # Grid serialized once per loop
-        assert exp.grid.serialize.call_count == 4
+        # The game loop's latest snapshot is reused once per loop
+        assert exp.grid.snapshot.call_count == 4
+        assert exp.grid.take_snapshot.call_count == 0
         # publish called with grid state message once per loop
         assert exp.publish.call_count == 4
 
+    def test_send_state_thread_publishes_each_requested_format(self, loop_exp_3x):
+        exp = loop_exp_3x
+        exp.state_formats = {'1': 'packed', 'spectator': 'json'}
+        exp.grid.snapshot.return_value.serialize.return_value = {
+            'walls': [],
+            'food': [],
+            'players': [{'id': '1', 'position': [0, 0]}],
+        }
+
+        exp.send_state_thread()
+        assert exp.publish.call_count == 8
+        channels = [c[1]['channel'] for c in exp.publish.call_args_list]
+        assert channels.count('griduniverse') == 4
+        assert channels.count('griduniverse_packed') == 4
+
+    def test_send_state_thread_with_interest_management(self, loop_exp_3x):
+        # Each player gets its own view of the grid, on its own channel
+        exp = loop_exp_3x
+        exp.grid.interest_management = True
+        exp.grid.players['1'].id = '1'
+        snapshot = exp.grid.snapshot.return_value
+        snapshot.serialize.return_value = {'walls': [[0, 0]], 'food': [], 'players': []}
+        snapshot.section_version.return_value = 1
+        snapshot.view.return_value.encode.side_effect = (
+            lambda include_walls, walls_added: json.dumps(
+                {'players': [{'id': '1'}], 'walls': [[0, 0]]} if include_walls
+                else {'players': [{'id': '1'}]}
+            )
+        )
+
+        exp.send_state_thread()
+        assert exp.publish.call_count == 4
+        channels = {c[1]['channel'] for c in exp.publish.call_args_list}
+        assert channels == {'griduniverse_1'}
+        grids = [json.loads(c[0][0]['grid']) for c in exp.publish.call_args_list]
+        # Walls are only sent the first time
+        assert [('walls' in grid) for grid in grids] == [True, False, False, False]
+
+    def test_spectators_see_the_grid_with_interest_management(self, loop_exp_3x):
+        exp = loop_exp_3x
+        exp.grid.interest_management = True
+        exp.grid.players['1'].id = '1'
+        exp.state_formats = {'1': 'json', 'spectator': 'json'}
+        snapshot = exp.grid.snapshot.return_value
+        snapshot.serialize.return_value = {'walls': [[0, 0]], 'food': [], 'players': []}
+        snapshot.section_version.return_value = 1
+        snapshot.view.return_value.encode.return_value = '{}'
+
+        exp.send_state_thread()
+        channels = [c[1]['channel'] for c in exp.publish.call_args_list]
+        assert channels.count('griduniverse_1') == 4
+        assert channels.count('griduniverse') == 4
+
 
 @pytest.mark.usefixtures('env')
 class TestPlayerConnects(object):
@@ -190,6 +238,16 @@ class TestPlayerConnects(object):
         exp.handle_connect({'player_id': participant.id})
         assert participant.id in exp.grid.players
 
+    def test_handle_connect_records_state_format(self, exp, a):
+        participant = a.participant()
+        exp.handle_connect({'player_id': participant.id, 'state_format': 'packed'})
+        assert exp.state_formats[participant.id] == 'packed'
+
+    def test_handle_connect_falls_back_to_json(self, exp, a):
+        participant = a.participant()
+        exp.handle_connect({'player_id': participant.id, 'state_format': 'bogus'})
+        assert exp.state_formats[participant.id] == 'json'
+
     def test_handle_connect_is_noop_for_spectators(self, exp):
         exp.handle_connect({'player_id': 'spectator'})
         assert exp.node_by_player_id == {}
@@ -290,6 +348,109 @@ class TestRecordPlayerActivity(object):
             )
 
 
+@pytest.mark.usefixtures('env')
+class TestInboundBatching(object):
+
+    @pytest.fixture
+    def batch_exp(self, exp):
+        exp.config.extend({'inbound_batch_interval': 0.05})
+        exp.grid = mock.Mock()
+        exp.grid.game_over = False
+        exp.grid.players = {'1': mock.Mock(motion_speed_limit=8)}
+        exp.grid.players['1'].move.return_value = {'direction': 'left'}
+        exp.publish = mock.Mock()
+        exp.record_events = mock.Mock()
+        yield exp
+
+    def move(self, **kwargs):
+        msg = {'type': 'move', 'player_id': '1', 'move': 'left'}
+        msg.update(kwargs)
+        return msg
+
+    def test_send_queues_messages(self, batch_exp):
+        batch_exp.send('griduniverse_ctrl:' + json.dumps(self.move()))
+        assert len(batch_exp.inbound_messages) == 1
+        assert 'server_time' in batch_exp.inbound_messages[0]
+        assert batch_exp.grid.players['1'].move.call_count == 0
+
+    def test_send_processes_immediately_after_game_over(self, batch_exp):
+        batch_exp.grid.game_over = True
+        batch_exp.send('griduniverse_ctrl:' + json.dumps(self.move()))
+        assert batch_exp.inbound_messages == []
+        assert batch_exp.grid.players['1'].move.call_count == 1
+
+    def test_send_unpacks_batch_messages(self, batch_exp):
+        batch = {'type': 'batch', 'messages': [self.move(), self.move(player_id='2')]}
+        batch_exp.send('griduniverse_ctrl:' + json.dumps(batch))
+        assert [m['player_id'] for m in batch_exp.inbound_messages] == ['1', '2']
+        assert all('server_time' in m for m in batch_exp.inbound_messages)
+
+    def test_send_processes_batch_messages_together(self, batch_exp):
+        batch_exp.grid.game_over = True
+        batch = {'type': 'batch', 'messages': [self.move(), self.move(move='up')]}
+        batch_exp.send('griduniverse_ctrl:' + json.dumps(batch))
+        assert batch_exp.grid.players['1'].move.call_count == 1
+        batch_exp.record_events.assert_called_once()
+
+    def test_batch_rejects_superseded_moves(self, batch_exp):
+        player = batch_exp.grid.players['1']
+        batch_exp.process_messages([self.move(), self.move(move='up')])
+        assert player.move.call_count == 1
+        player.refuse_move.assert_called_once_with('up')
+        batch_exp.publish.assert_called_once_with(
+            {'type': 'move_rejection', 'player_id': player.id}
+        )
+
+    def test_batch_rejects_nothing_while_movement_is_disabled(self, batch_exp):
+        player = batch_exp.grid.players['1']
+        player.refuse_move.return_value = False
+        batch_exp.process_messages([self.move(), self.move(move='up')])
+        assert not batch_exp.publish.called
+
+    def test_batch_validates_moves_far_enough_apart(self, batch_exp):
+        player = batch_exp.grid.players['1']
+        batch_exp.process_messages([
+            self.move(timestamp=1.0),
+            self.move(timestamp=1.1),
+            self.move(timestamp=1.2),
+        ])
+        # 1.1 is within 1/8 of a second of 1.0, 1.2 is not
+        assert player.move.call_count == 2
+
+    def test_batch_recorded_together(self, batch_exp):
+        batch_exp.process_messages([self.move(), self.move(move='up')])
+        batch_exp.record_events.assert_called_once()
+        events = batch_exp.record_events.call_args[0][0]
+        assert [details['move'] for details, player_id in events] == ['left', 'up']
+
+    def test_failing_message_does_not_stop_the_batch(self, batch_exp):
+        batch_exp.grid.players['2'] = mock.Mock(motion_speed_limit=8)
+        batch_exp.grid.players['2'].move.return_value = {'direction': 'left'}
+        batch_exp.grid.players['1'].move.side_effect = ValueError('bad move')
+        with mock.patch('dlgr.griduniverse.experiment.logger.exception') as log:
+            batch_exp.process_messages([self.move(), self.move(player_id='2')])
+        log.assert_called_once()
+        assert batch_exp.grid.players['2'].move.call_count == 1
+        events = batch_exp.record_events.call_args[0][0]
+        assert [player_id for details, player_id in events] == ['2']
+
+    def test_batch_messages_handled_one_by_one_without_batching(self, batch_exp):
+        batch_exp.config.extend({'inbound_batch_interval': 0})
+        batch = {'type': 'batch', 'messages': [self.move(), self.move(move='up')]}
+        batch_exp.send('griduniverse_ctrl:' + json.dumps(batch))
+        assert batch_exp.inbound_messages == []
+        # Neither move is rejected unchecked, and each is recorded on its own
+        assert batch_exp.grid.players['1'].move.call_count == 2
+        assert batch_exp.record_events.call_count == 2
+
+    def test_inbound_thread_drains_queue(self, batch_exp, fake_gsleep):
+        type(batch_exp.grid).game_over = mock.PropertyMock(return_value=True)
+        batch_exp.inbound_messages = [self.move()]
+        batch_exp.inbound_thread()
+        assert batch_exp.inbound_messages == []
+        assert batch_exp.grid.players['1'].move.call_count == 1
+
+
 @pytest.mark.usefixtures('env')
 class TestChat(object):
 
@@ -1,3 +1,6 @@
+import math
+import random
+
 import mock
 import pytest
 
@@ -61,6 +64,221 @@ class TestSerialize(object):
         assert values.get('food') is None
 
 
+@pytest.mark.usefixtures('env')
+class TestSnapshot(object):
+
+    def test_snapshot_matches_serialize(self, gridworld):
+        import json
+        gridworld.spawn_food()
+        gridworld.spawn_player(id='1')
+        snapshot = gridworld.take_snapshot()
+        assert snapshot.serialize() == gridworld.serialize()
+        assert json.loads(snapshot.encode()) == gridworld.serialize()
+        partial = snapshot.encode(include_walls=False, include_food=False)
+        assert partial == json.dumps(
+            gridworld.serialize(include_walls=False, include_food=False)
+        )
+
+    def test_snapshot_packs_sections_once(self, gridworld):
+        from dlgr.griduniverse.maze import Wall
+        from dlgr.griduniverse.wire import pack_grid
+        gridworld.spawn_food()
+        gridworld.spawn_player(id='1')
+        gridworld.add_wall(Wall(position=[1, 1]))
+        first = gridworld.take_snapshot()
+        assert first.pack() == pack_grid(gridworld.serialize())
+        partial = first.pack(include_walls=False, walls_added=[[2, 2]])
+        assert partial == pack_grid(dict(
+            gridworld.serialize(include_walls=False), walls_added=[[2, 2]]
+        ))
+        second = gridworld.take_snapshot()
+        assert second.pack()['walls'] is first.pack()['walls']
+        assert second.pack()['food'] is first.pack()['food']
+
+    def test_snapshot_is_reused_until_next_tick(self, gridworld):
+        snapshot = gridworld.take_snapshot()
+        assert gridworld.snapshot() is snapshot
+        assert gridworld.take_snapshot() is not snapshot
+
+    def test_spawning_player_invalidates_snapshot(self, gridworld):
+        snapshot = gridworld.take_snapshot()
+        gridworld.spawn_player(id='1')
+        assert gridworld.snapshot() is not snapshot
+        assert len(gridworld.snapshot().serialize()['players']) == 1
+
+    def test_unchanged_sections_are_shared(self, gridworld):
+        gridworld.spawn_food()
+        first = gridworld.take_snapshot()
+        second = gridworld.take_snapshot()
+        assert second.section_version('food') == first.section_version('food')
+        assert second.serialize()['food'] is first.serialize()['food']
+        gridworld.spawn_food()
+        third = gridworld.take_snapshot()
+        assert third.section_version('food') != first.section_version('food')
+        assert len(third.serialize()['food']) == 2
+
+    def test_players_serialized_again_only_once_changed(self, gridworld):
+        player = gridworld.spawn_player(id='1')
+        first = gridworld.take_snapshot()
+        player.position = list(player.position)
+        player.score = player.score
+        with mock.patch.object(type(player), 'serialize') as serialize:
+            second = gridworld.take_snapshot()
+        assert not serialize.called
+        assert second.serialize()['players'] is first.serialize()['players']
+        player.motion_direction = 'up' if player.motion_direction != 'up' else 'down'
+        third = gridworld.take_snapshot()
+        assert third.section_version('players') != first.section_version('players')
+        assert third.serialize()['players'] == [player.serialize()]
+
+    def test_food_serialized_again_as_it_matures(self, gridworld):
+        from dlgr.griduniverse.clock import ManualClock
+        gridworld.clock = ManualClock()
+        food = gridworld.spawn_food()
+        first = gridworld.take_snapshot()
+        gridworld.clock.advance(food.next_change() - gridworld.clock.time() - 0.001)
+        assert gridworld.take_snapshot().serialize()['food'] is first.serialize()['food']
+        gridworld.clock.advance(0.002)
+        food_state = gridworld.take_snapshot().serialize()['food']
+        assert food_state == [food.serialize()]
+        assert food_state[0]['maturity'] != first.serialize()['food'][0]['maturity']
+
+
+@pytest.mark.usefixtures('env')
+class TestContagion(object):
+
+    def test_majority_color_spreads(self, gridworld):
+        gridworld.contagion = 1
+        for id, position, color in (('1', [0, 0], 'BLUE'),
+                                    ('2', [0, 1], 'YELLOW'),
+                                    ('3', [0, 2], 'BLUE'),
+                                    ('4', [9, 9], 'YELLOW')):
+            player = gridworld.spawn_player(id)
+            player.position = position
+            player.color = color
+        gridworld.spread_contagion()
+        assert gridworld.players['2'].color == 'BLUE'
+        # Ends of the line have no majority, the loner has no neighbors
+        assert gridworld.players['1'].color == 'BLUE'
+        assert gridworld.players['3'].color == 'BLUE'
+        assert gridworld.players['4'].color == 'YELLOW'
+
+
+@pytest.mark.usefixtures('env')
+class TestStep(object):
+
+    def test_step_computes_payoffs(self, gridworld):
+        gridworld.compute_payoffs = mock.Mock()
+        gridworld.step()
+        gridworld.compute_payoffs.assert_called_once_with()
+
+    def test_timed_events_tax_points(self, gridworld):
+        gridworld.tax = 1.0
+        player = gridworld.spawn_player('1')
+        player.score = 10
+        gridworld.step()
+        assert player.score == 10
+        gridworld.step(timed_events=True)
+        assert player.score == 9.0
+
+    def test_timed_events_replenish_food(self, gridworld):
+        gridworld.num_food = 5
+        gridworld.step(timed_events=True)
+        assert len(gridworld.food_locations) == 5
+
+    def test_timed_events_prune_excess_food(self, gridworld):
+        for i in range(5):
+            gridworld.spawn_food()
+        gridworld.num_food = 2
+        gridworld.step(timed_events=True)
+        assert len(gridworld.food_locations) == 2
+
+    def test_auto_move_skips_blocked_players(self, gridworld):
+        gridworld.motion_auto = True
+        gridworld.motion_speed_limit = 0
+        player = gridworld.spawn_player('1')
+        player.position = [0, 0]
+        player.motion_direction = 'up'
+        gridworld.step()
+        assert player.position == [0, 0]
+        player.motion_direction = 'down'
+        gridworld.step()
+        assert player.position == [1, 0]
+
+
+@pytest.mark.usefixtures('env')
+class TestPayoffs(object):
+
+    @pytest.fixture
+    def groups(self, gridworld):
+        gridworld.intragroup_competition = 2
+        gridworld.intergroup_competition = 3
+        gridworld.dollars_per_point = 0.5
+        for id, color, score in (('1', 'BLUE', 4), ('2', 'BLUE', 2),
+                                 ('3', 'YELLOW', 3), ('4', 'YELLOW', 0)):
+            player = gridworld.spawn_player(id, color_name=color)
+            player.score = score
+        return gridworld
+
+    def test_softmax(self):
+        from dlgr.griduniverse.experiment import softmax
+        assert list(softmax([1, 2, 1], temperature=2)) == [1 / 6.0, 4 / 6.0, 1 / 6.0]
+        assert list(softmax([0, 0])) == [2.0, 2.0]
+
+    def test_payoffs(self, groups):
+        groups.compute_payoffs()
+        blue = (6 ** 3) / float(6 ** 3 + 3 ** 3)
+        yellow = (3 ** 3) / float(6 ** 3 + 3 ** 3)
+        expected = {
+            '1': 9 * (16 / 20.0) * blue * 0.5,
+            '2': 9 * (4 / 20.0) * blue * 0.5,
+            '3': 9 * 1.0 * yellow * 0.5,
+            '4': 0.0,
+        }
+        for id, payoff in expected.items():
+            assert groups.players[id].payoff == pytest.approx(payoff)
+
+    def test_group_totals_follow_scores_and_colors(self, groups):
+        blue = groups.player_color_names.index('BLUE')
+        yellow = groups.player_color_names.index('YELLOW')
+        assert groups.group_scores[blue] == 6
+        groups.players['1'].score -= 1
+        assert groups.group_scores[blue] == 5
+        groups.players['3'].color_idx = blue
+        assert groups.group_scores[blue] == 8
+        assert groups.group_scores[yellow] == 0
+
+    def test_payoffs_stay_finite_once_taxed_to_zero(self, gridworld):
+        gridworld.intragroup_competition = 1.5
+        gridworld.intergroup_competition = 1.5
+        gridworld.tax = 0.3
+        rng = random.Random(3)
+        players = [
+            gridworld.spawn_player(str(i), color_name=('BLUE', 'YELLOW')[i % 2])
+            for i in range(6)
+        ]
+        for i in range(200):
+            player = rng.choice(players)
+            player.score = max(player.score + rng.uniform(-1, 3), 0)
+            gridworld.compute_payoffs()
+        while any(p.score for p in players):
+            for player in players:
+                player.score = max(player.score - gridworld.tax * rng.random(), 0)
+            gridworld.compute_payoffs()
+        assert min(gridworld.group_scores) == 0
+        assert all(math.isfinite(p.payoff) for p in players)
+
+    def test_recomputes_only_after_a_change(self, groups):
+        groups.compute_payoffs()
+        with mock.patch('dlgr.griduniverse.experiment.group_payoffs') as payoffs:
+            groups.compute_payoffs()
+            assert not payoffs.called
+        groups.players['4'].score += 1
+        before = groups.players['1'].payoff
+        groups.compute_payoffs()
+        assert groups.players['1'].payoff != before
+
+
 @pytest.mark.usefixtures('env')
 class TestRoundState(object):
 
@@ -180,3 +398,130 @@ class TestInstructions(object):
                     param, getattr(gridworld, param))
             )
             instructions = gridworld.instructions()
+
+
+@pytest.mark.usefixtures('env')
+class TestInterestManagement(object):
+
+    @pytest.fixture
+    def big_gridworld(self, gridworld):
+        gridworld.rows = gridworld.columns = 100
+        gridworld.window_rows = gridworld.window_columns = 11
+        gridworld.visibility = 40
+        return gridworld
+
+    def test_view_is_window_centered_on_player(self, big_gridworld):
+        player = big_gridworld.spawn_player('1')
+        player.position = [50, 50]
+        assert big_gridworld.view_bounds(player) == (45, 45, 55, 55)
+
+    def test_view_is_clamped_to_grid(self, big_gridworld):
+        player = big_gridworld.spawn_player('1')
+        player.position = [2, 98]
+        assert big_gridworld.view_bounds(player) == (0, 89, 10, 99)
+
+    def test_view_is_limited_by_visibility(self, big_gridworld):
+        big_gridworld.visibility = 1
+        player = big_gridworld.spawn_player('1')
+        player.position = [50, 50]
+        assert big_gridworld.view_bounds(player) == (47, 47, 53, 53)
+
+    def test_view_drops_what_player_cannot_see(self, big_gridworld):
+        player = big_gridworld.spawn_player('1')
+        player.position = [50, 50]
+        big_gridworld.spawn_player('2').position = [52, 48]
+        big_gridworld.spawn_player('3').position = [80, 80]
+        big_gridworld.spawn_food(position=[45, 55])
+        big_gridworld.spawn_food(position=[10, 10])
+        snapshot = big_gridworld.take_snapshot()
+        view = snapshot.view(big_gridworld.view_bounds(player), player.id)
+        state = view.serialize()
+        assert [p['id'] for p in state['players']] == ['1', '2']
+        assert [f['position'] for f in state['food']] == [[45, 55]]
+        assert state['round'] == 0
+        # The snapshot itself is left alone
+        assert len(snapshot.serialize()['players']) == 3
+
+    def test_snapshot_views_match_brute_force(self, big_gridworld):
+        import json
+        from dlgr.griduniverse.wire import pack_grid
+        big_gridworld.visibility = 2
+        rng = random.Random(1)
+        for i in range(30):
+            player = big_gridworld.spawn_player(str(i))
+            player.position = [rng.randint(0, 99), rng.randint(0, 99)]
+        for i in range(60):
+            big_gridworld.spawn_food(position=[rng.randint(0, 99), rng.randint(0, 99)])
+        snapshot = big_gridworld.take_snapshot()
+        state = snapshot.serialize(include_walls=False)
+        for player in big_gridworld.players.values():
+            top, left, bottom, right = big_gridworld.view_bounds(player)
+
+            def visible(item):
+                row, column = item['position']
+                return top <= row <= bottom and left <= column <= right
+
+            expected = dict(state)
+            expected['players'] = [
+                p for p in state['players'] if p['id'] == player.id or visible(p)
+            ]
+            expected['food'] = [f for f in state['food'] if visible(f)]
+            view = snapshot.view(
+                big_gridworld.view_bounds(player), player.id,
+                cell_size=big_gridworld.view_cell_size,
+            )
+            assert view.serialize(include_walls=False) == expected
+            assert json.loads(view.encode(include_walls=False)) == expected
+            assert view.pack(include_walls=False) == pack_grid(expected)
+
+
+@pytest.mark.usefixtures('env')
+class TestWallVersions(object):
+
+    def test_adding_wall_bumps_version(self, gridworld):
+        from dlgr.griduniverse.maze import Wall
+        version = gridworld.walls_version
+        gridworld.walls_updated = False
+        gridworld.add_wall(Wall(position=[1, 1]))
+        assert gridworld.walls_version == version + 1
+        assert gridworld.walls_updated
+        assert gridworld.has_wall([1, 1])
+
+    def test_walls_serialized_once_per_version(self, gridworld):
+        from dlgr.griduniverse.maze import Wall
+        first = gridworld.take_snapshot()
+        second = gridworld.take_snapshot()
+        assert second.serialize()['walls'] is first.serialize()['walls']
+        gridworld.add_wall(Wall(position=[1, 1]))
+        third = gridworld.take_snapshot()
+        assert third.serialize()['walls'] == [[1, 1]]
+        assert third.serialize()['walls_version'] == gridworld.walls_version
+
+    def test_walls_since(self, gridworld):
+        from dlgr.griduniverse.maze import Wall
+        start = gridworld.take_snapshot().section_version('walls')
+        gridworld.add_wall(Wall(position=[1, 1]))
+        middle = gridworld.take_snapshot()
+        gridworld.add_wall(Wall(position=[2, 2]))
+        snapshot = gridworld.take_snapshot()
+        assert snapshot.walls_since(start) == [[1, 1], [2, 2]]
+        assert snapshot.walls_since(middle.section_version('walls')) == [[2, 2]]
+        # Older snapshots only report walls up to their own version
+        assert middle.walls_since(start) == [[1, 1]]
+
+    def test_replacing_walls_requires_full_resend(self, gridworld):
+        from dlgr.griduniverse.maze import Wall
+        start = gridworld.take_snapshot().section_version('walls')
+        gridworld.set_walls([Wall(position=[3, 3])])
+        snapshot = gridworld.take_snapshot()
+        assert snapshot.walls_since(start) is None
+        assert snapshot.serialize()['walls'] == [[3, 3]]
+
+    def test_walls_added_in_partial_state(self, gridworld):
+        import json
+        snapshot = gridworld.take_snapshot()
+        state = snapshot.serialize(include_walls=False, walls_added=[[1, 1]])
+        assert state['walls_added'] == [[1, 1]]
+        assert 'walls' not in state
+        encoded = snapshot.encode(include_walls=False, walls_added=[[1, 1]])
+        assert json.loads(encoded) == state
@@ -0,0 +1,124 @@
+import json
+
+import mock
+import pytest
+
+from dlgr.griduniverse.bots import RandomBot
+from dlgr.griduniverse.host import BotHost
+from dlgr.griduniverse.wire import encode_state
+
+
+@pytest.fixture
+def grid():
+    return {
+        'rows': 5,
+        'columns': 5,
+        'players': [{'id': 1, 'position': [1, 1]}, {'id': 2, 'position': [3, 3]}],
+        'walls': [[2, 2]],
+        'food': [{'id': 0, 'position': [4, 4]}],
+    }
+
+
+@pytest.mark.usefixtures('active_config')
+class TestBotHost(object):
+
+    @pytest.fixture
+    def host(self):
+        host = BotHost('http://example.com', RandomBot, count=3, redis=mock.Mock())
+        for participant_id, bot in enumerate(host.bots, 1):
+            bot.participant_id = participant_id
+            bot.state_format = 'packed'
+            bot.grid = {}
+            bot._make_socket()
+        return host
+
+    def test_bots_publish_through_the_host(self, host):
+        assert not host.redis.publish.called
+        host.flush()
+        channel, payload = host.redis.publish.call_args[0]
+        assert channel == 'griduniverse_ctrl'
+        batch = json.loads(payload)
+        assert batch['type'] == 'batch'
+        assert [m['player_id'] for m in batch['messages']] == [1, 2, 3]
+        host.flush()
+        assert host.redis.publish.call_count == 1
+
+    def test_states_are_decoded_once_and_shared(self, host, grid):
+        message = encode_state({'type': 'state', 'remaining_time': 60}, grid, 'packed')
+        with mock.patch('dlgr.griduniverse.bots.decode_grid') as decode_grid:
+            decode_grid.return_value = grid
+            host.receive(b'griduniverse_packed', json.dumps(message))
+        assert decode_grid.call_count == 1
+        views = [bot.grid for bot in host.bots]
+        assert all(view is views[0] for view in views)
+        assert views[0]['grid'] == grid
+
+    def test_states_are_merged_into_new_views(self, host, grid):
+        host.dispatch('griduniverse_packed', encode_state(
+            {'type': 'state', 'remaining_time': 60}, grid, 'packed'
+        ))
+        first = host.bots[0].grid
+        partial = dict(grid, walls_added=[[0, 4]])
+        del partial['walls']
+        host.dispatch('griduniverse_packed', encode_state(
+            {'type': 'state', 'remaining_time': 59}, partial, 'packed'
+        ))
+        assert first['grid']['walls'] == [[2, 2]]
+        assert first['remaining_time'] == 60
+        assert host.bots[0].grid['grid']['walls'] == [[2, 2], [0, 4]]
+
+    def test_ignores_shared_json_states_once_packed_states_arrive(self, host, grid):
+        host.dispatch('griduniverse', {
+            'type': 'state', 'grid': json.dumps(grid), 'remaining_time': 60
+        })
+        assert host.bots[0].grid['remaining_time'] == 60
+        host.dispatch('griduniverse_packed', encode_state(
+            {'type': 'state', 'remaining_time': 59}, grid, 'packed'
+        ))
+        host.dispatch('griduniverse', {
+            'type': 'state', 'grid': json.dumps(grid), 'remaining_time': 58
+        })
+        assert all(bot.grid['remaining_time'] == 59 for bot in host.bots)
+
+    def test_other_messages_go_to_each_bot(self, host, grid):
+        host.dispatch('griduniverse_packed', encode_state(
+            {'type': 'state', 'remaining_time': 60}, grid, 'packed'
+        ))
+        host.dispatch('griduniverse', {'type': 'stop'})
+        assert all(bot.grid['remaining_time'] == 0 for bot in host.bots)
+        assert host.views['griduniverse_packed']['remaining_time'] == 60
+
+    def test_skips_channels_without_bots(self, host):
+        host.receive('griduniverse_ctrl', 'not json')
+
+    def test_quorum(self, host):
+        for bot in host.bots:
+            bot.subscribe_to_quorum_channel()
+        host.receive('quorum', json.dumps({'q': 3, 'n': 3}))
+        assert all(bot._quorum_reached for bot in host.bots)
+
+    def test_listens_only_on_the_bots_channels(self, host):
+        class Done(Exception):
+            pass
+
+        pubsub = host.redis.pubsub.return_value
+        late = RandomBot('http://example.com')
+        replies = [
+            lambda: host.subscribe(late, ['griduniverse_7']),
+            lambda: {'type': 'message', 'channel': b'quorum', 'data': '{"q": 9, "n": 1}'},
+        ]
+
+        def get_message(timeout):
+            if not replies:
+                raise Done()
+            return replies.pop(0)()
+
+        pubsub.get_message.side_effect = get_message
+        with pytest.raises(Done):
+            host.listen()
+        subscribed = [list(c[0]) for c in pubsub.subscribe.call_args_list]
+        assert subscribed == [
+            ['griduniverse', 'griduniverse_packed', 'quorum'],
+            ['griduniverse_7'],
+        ]
+        assert not pubsub.psubscribe.called
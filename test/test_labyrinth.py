@@ -36,6 +36,36 @@ class TestLabyrinth(object):
         walls = labyrinth(columns=12, rows=12, density=0.5, contiguity=0.5)
         assert len(walls) == 18  # 144 * .5. * .5
 
+    def test_same_stream_builds_same_labyrinth(self, labyrinth):
+        import random
+        first = labyrinth(density=0.5, contiguity=0.8, rng=random.Random(5))
+        second = labyrinth(density=0.5, contiguity=0.8, rng=random.Random(5))
+        assert [w.position for w in first] == [w.position for w in second]
+
+    def test_wall_grid_is_a_perfect_maze(self):
+        from dlgr.griduniverse.maze import wall_grid
+        grid = wall_grid(11, 11)
+        assert grid.shape == (11, 11)
+        assert grid[0].all() and grid[-1].all()
+        assert grid[:, 0].all() and grid[:, -1].all()
+        # 25 cells joined by the 24 openings of a spanning tree
+        assert (~grid).sum() == 25 + 24
+        start = (1, 1)
+        seen = {start}
+        frontier = [start]
+        while frontier:
+            row, column = frontier.pop()
+            for step in ((row + 1, column), (row - 1, column),
+                         (row, column + 1), (row, column - 1)):
+                if step not in seen and not grid[step]:
+                    seen.add(step)
+                    frontier.append(step)
+        assert len(seen) == 25 + 24
+
+    def test_large_labyrinth(self, labyrinth):
+        walls = labyrinth(columns=500, rows=500, density=0.5, contiguity=0.9)
+        assert len(walls) == 56250  # 250000 * .5 * .5 * .9
+
 
 class TestMazePrune(object):
 
@@ -122,3 +152,14 @@ class TestMazePrune(object):
         ]
 
         assert len(pruned) < num_with_neighbors
+
+    def test_prune_peels_dead_ends_inward(self, Pos, prune):
+        walls = [Pos([0, column]) for column in range(5)]
+        pruned = [w.position for w in prune(walls, density=0.4, contiguity=1.0)]
+        assert pruned == [[0, 2], [0, 3]]
+
+    def test_prune_keeps_loops(self, Pos, prune):
+        loop = [[0, 0], [0, 1], [1, 0], [1, 1]]
+        walls = [Pos(pos) for pos in loop + [[3, 3]]]
+        pruned = [w.position for w in prune(walls, density=0.0, contiguity=1.0)]
+        assert pruned == loop
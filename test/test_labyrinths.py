@@ -0,0 +1,100 @@
+import pytest
+
+from dlgr.griduniverse.experiment import Gridworld
+from dlgr.griduniverse.labyrinths import LabyrinthCache
+from dlgr.griduniverse.labyrinths import build
+from dlgr.griduniverse.labyrinths import main
+
+CONDITION = dict(rows=20, columns=20, density=0.5, contiguity=0.9)
+
+
+def positions(walls):
+    return sorted(tuple(w.position) for w in walls)
+
+
+def grid_walls(**kwargs):
+    grid = Gridworld(
+        singleton=False,
+        rows=20,
+        columns=20,
+        walls_density=0.5,
+        walls_contiguity=0.9,
+        **kwargs
+    )
+    grid.build_labyrinth()
+    return positions(grid.wall_locations.values())
+
+
+class TestLabyrinthCache(object):
+
+    @pytest.fixture
+    def path(self, tmpdir):
+        return str(tmpdir.join('labyrinths.db'))
+
+    @pytest.fixture
+    def cache(self, path):
+        cache = LabyrinthCache(path, version='1')
+        yield cache
+        cache.close()
+
+    def test_stores_labyrinths(self, cache, path):
+        assert cache.get(seed=1, **CONDITION) is None
+        walls = build(seed=1, **CONDITION)
+        cache.set(seed=1, walls=walls, **CONDITION)
+        assert positions(cache.get(seed=1, **CONDITION)) == positions(walls)
+        assert cache.get(seed=2, **CONDITION) is None
+        assert len(LabyrinthCache(path, version='1')) == 1
+
+    def test_fetch_builds_only_on_a_miss(self, cache):
+        first = cache.fetch(seed=1, **CONDITION)
+        assert len(cache) == 1
+        assert positions(cache.fetch(seed=1, **CONDITION)) == positions(first)
+        assert len(cache) == 1
+
+    def test_evicts_least_recently_used_beyond_max_bytes(self, cache):
+        for seed in (1, 2, 3):
+            cache.fetch(seed=seed, **CONDITION)
+        cache.max_bytes = cache.size - 1
+        cache.clear()
+        cache.fetch(seed=1, **CONDITION)
+        cache.fetch(seed=2, **CONDITION)
+        cache.get(seed=1, **CONDITION)
+        cache.fetch(seed=3, **CONDITION)
+        assert cache.size <= cache.max_bytes
+        assert cache.get(seed=1, **CONDITION) is not None
+        assert cache.get(seed=2, **CONDITION) is None
+
+    def test_ignores_other_versions(self, cache, path):
+        cache.fetch(seed=1, **CONDITION)
+        other = LabyrinthCache(path, version='2')
+        assert other.get(seed=1, **CONDITION) is None
+        other.prune_stale()
+        assert len(other) == 0
+
+    def test_warms_from_configuration_files(self, tmpdir, path):
+        config = tmpdir.join('config.txt')
+        config.write(
+            '[Experiment Configuration]\n'
+            'rows = 20\ncolumns = 20\n'
+            'walls_density = 0.5\nwalls_contiguity = 0.9\n'
+            'labyrinth_seed = 7\n'
+        )
+        main([path, '--config', str(config), '--seed', '8'])
+        cache = LabyrinthCache(path)
+        assert len(cache) == 2
+        assert cache.get(seed=7, **CONDITION) is not None
+
+
+class TestCachedLabyrinths(object):
+
+    def test_grid_loads_the_labyrinth_it_would_build(self, tmpdir):
+        path = str(tmpdir.join('labyrinths.db'))
+        built = grid_walls(seed=3)
+        assert grid_walls(seed=3, labyrinth_cache=path) == built
+        assert len(LabyrinthCache(path)) == 1
+        assert grid_walls(seed=3, labyrinth_cache=path) == built
+
+    def test_labyrinth_seed_is_shared_across_games(self):
+        first = grid_walls(seed=1, labyrinth_seed=5)
+        assert grid_walls(seed=2, labyrinth_seed=5) == first
+        assert grid_walls(seed=2) != grid_walls(seed=1)
@@ -0,0 +1,167 @@
+import asyncio
+import json
+
+import mock
+import pytest
+
+from dlgr.griduniverse.loadtest import LoadTest
+from dlgr.griduniverse.loadtest import MoveTracker
+from dlgr.griduniverse.loadtest import format_summary
+from dlgr.griduniverse.wire import encode_state
+
+
+class TestMoveTracker(object):
+
+    @pytest.fixture
+    def tracker(self):
+        tracker = MoveTracker()
+        tracker.observe([5, 5], 0.0)
+        return tracker
+
+    def send(self, tracker, direction, time):
+        tracker.plan(direction)
+        tracker.published(time)
+
+    def test_measures_moves_until_they_are_seen(self, tracker):
+        self.send(tracker, 'right', 1.0)
+        self.send(tracker, 'down', 1.1)
+        tracker.observe([5, 6], 1.25)
+        assert tracker.latencies == [0.25]
+        tracker.observe([6, 6], 1.5)
+        assert tracker.latencies == [0.25, pytest.approx(0.4)]
+        assert (tracker.sent, tracker.accepted, tracker.rejected) == (2, 2, 0)
+
+    def test_plans_ahead_of_the_moves_seen(self, tracker):
+        self.send(tracker, 'right', 1.0)
+        self.send(tracker, 'right', 1.1)
+        assert tracker.planned == (5, 7)
+
+    def test_rejected_moves_after_accepted_ones(self, tracker):
+        self.send(tracker, 'right', 1.0)
+        self.send(tracker, 'down', 1.1)
+        tracker.reject()
+        tracker.observe([5, 6], 1.3)
+        assert tracker.latencies == [pytest.approx(0.3)]
+        assert not tracker.pending
+        assert tracker.planned == (5, 6)
+
+    def test_rejected_moves_before_accepted_ones(self, tracker):
+        self.send(tracker, 'right', 1.0)
+        self.send(tracker, 'down', 1.1)
+        tracker.reject()
+        tracker.observe([6, 5], 1.3)
+        assert tracker.latencies == [pytest.approx(0.2)]
+        assert tracker.accepted == 1
+        assert tracker.rejected == 1
+
+    def test_unpublished_moves_wait(self, tracker):
+        tracker.plan('right')
+        tracker.observe([5, 5], 1.0)
+        assert len(tracker.pending) == 1
+
+    def test_starts_afresh_after_unexpected_moves(self, tracker):
+        self.send(tracker, 'right', 1.0)
+        tracker.observe([0, 0], 1.2)
+        assert tracker.unmatched == 1
+        assert tracker.latencies == []
+        assert tracker.planned == (0, 0)
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+@pytest.mark.usefixtures('active_config')
+class TestLoadTest(object):
+
+    @pytest.fixture
+    def grid(self):
+        return {
+            'rows': 3,
+            'columns': 3,
+            'players': [{'id': 1, 'position': [0, 0]}, {'id': 2, 'position': [2, 2]}],
+            'walls': [[1, 0]],
+            'food': [],
+        }
+
+    @pytest.fixture
+    def test(self, grid):
+        test = LoadTest('http://example.com', players=2, redis=mock.Mock())
+        test.redis.publish = mock.AsyncMock()
+        for participant_id, bot in enumerate(test.bots, 1):
+            bot.participant_id = participant_id
+            bot.grid = {}
+            bot._make_socket()
+        test.outbox = []
+        self.state(test, grid)
+        return test
+
+    def state(self, test, grid):
+        test.dispatch('griduniverse_packed', encode_state(
+            {'type': 'state', 'remaining_time': 60}, grid, 'packed'
+        ))
+        for bot in test.bots:
+            bot.state = bot.observe_state()
+
+    def test_players_keep_off_walls_and_edges(self, test):
+        bot = test.bots[0]
+        for i in range(10):
+            assert bot.get_next_key() is not None
+            assert bot.moves.pending[0][0] == 'right'
+            bot.moves.pending.clear()
+            bot.moves.planned = bot.moves.position
+
+    def test_measures_moves_through_states(self, test, grid):
+        for bot in test.bots:
+            bot.send_next_key()
+        run(test.flush())
+        assert test.redis.publish.await_count == 2
+        moved = dict(grid)
+        moved['players'] = [
+            {'id': 1, 'position': list(test.bots[0].moves.planned)},
+            {'id': 2, 'position': [2, 2]},
+        ]
+        test.dispatch('griduniverse', {'type': 'move_rejection', 'player_id': 2})
+        self.state(test, moved)
+        summary = test.summary()
+        assert summary['sent'] == 2
+        assert summary['accepted'] == 1
+        assert summary['rejected'] == 1
+        assert summary['latency']['p50'] >= 0
+        assert 'p99' in format_summary(summary)
+
+    def test_moves_are_timed_from_before_they_are_published(self, test):
+        clock = iter([1.0, 2.0])
+        test.now = lambda: next(clock)
+        test.redis.publish.side_effect = lambda *args: test.now()
+        test.bots[0].send_next_key()
+        run(test.flush())
+        assert test.bots[0].moves.pending[0][1] == 1.0
+        assert test.first_move == test.last_move == 1.0
+
+    def test_moves_are_published_one_by_one(self, test):
+        clock = iter([1.0, 2.0])
+        test.now = lambda: next(clock)
+        for bot in test.bots:
+            bot.send_next_key()
+        run(test.flush())
+        messages = [json.loads(c[0][1]) for c in test.redis.publish.await_args_list]
+        assert [(m['type'], m['player_id']) for m in messages] == [('move', 1), ('move', 2)]
+        assert [bot.moves.pending[0][1] for bot in test.bots] == [1.0, 2.0]
+        assert not test.outbox
+
+    def test_moves_can_be_batched(self, test):
+        test.batch = True
+        test.now = lambda: 1.0
+        for bot in test.bots:
+            bot.send_next_key()
+        run(test.flush())
+        assert test.redis.publish.await_count == 1
+        channel, payload = test.redis.publish.await_args[0]
+        assert channel == 'griduniverse_ctrl'
+        assert len(json.loads(payload)['messages']) == 2
+        assert [bot.moves.pending[0][1] for bot in test.bots] == [1.0, 1.0]
+
+    def test_rejections_go_to_their_player(self, test):
+        test.dispatch('griduniverse', {'type': 'move_rejection', 'player_id': 1})
+        assert [bot.moves.rejected for bot in test.bots] == [1, 0]
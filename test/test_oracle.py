@@ -0,0 +1,45 @@
+import time
+
+import mock
+import pytest
+
+from dlgr.griduniverse.oracle import BatchOracle
+
+
+def slow_simulate(seed=None, **config):
+    time.sleep(5)
+
+
+class TestBatchOracle(object):
+
+    @pytest.fixture
+    def oracle(self):
+        return BatchOracle(
+            lambda x: {'num_food': int(20 * x[0])},
+            to_score=lambda score: score / 100.0,
+            concurrency=2,
+            max_participants=2,
+            time_per_round=1.0,
+            rows=8,
+            columns=8,
+        )
+
+    def test_scores_a_batch_in_order(self, oracle):
+        scores = oracle([(0.0,), (0.5,), (1.0,)])
+        assert len(scores) == 3
+        assert scores[0] == 0.0
+        oracle.concurrency = 1
+        assert oracle([(0.0,), (0.5,), (1.0,)]) == scores
+
+    def test_single_point(self, oracle):
+        assert oracle.single((0.5,)) == oracle([(0.5,)])[0]
+
+    def test_timeout(self, oracle):
+        oracle.timeout = 0.1
+        oracle.timeout_score = -1
+        with mock.patch('dlgr.griduniverse.oracle.simulate', slow_simulate):
+            start = time.time()
+            assert oracle.single((0.5,)) == -1
+            # Forked workers inherit the patch
+            assert oracle([(0.5,), (1.0,)]) == [-1, -1]
+        assert time.time() - start < 2
@@ -1,3 +1,4 @@
+import mock
 import pytest
 from dlgr.griduniverse.experiment import Player
 
@@ -127,6 +128,27 @@ class TestMovement(object):
 
         assert player.position == [0, 0]
 
+    def test_refused_move_turns_and_trembles_like_a_move(self, gridworld):
+        from dlgr.griduniverse.experiment import IllegalMove
+        player = gridworld.spawn_player('1')
+        player.motion_tremble_rate = 0.5
+        gridworld.rng.motion.seed(4)
+        with pytest.raises(IllegalMove):
+            player.move('right')
+        moved = (player.motion_direction, gridworld.rng.motion.random())
+
+        gridworld.rng.motion.seed(4)
+        assert player.refuse_move('right')
+        assert (player.motion_direction, gridworld.rng.motion.random()) == moved
+
+    def test_refused_move_does_nothing_while_movement_is_disabled(self, gridworld):
+        player = gridworld.spawn_player('1')
+        player.motion_direction = 'up'
+        disabled = mock.PropertyMock(return_value=False)
+        with mock.patch.object(type(gridworld), 'movement_enabled', disabled):
+            assert not player.refuse_move('right')
+        assert player.motion_direction == 'up'
+
     def test_tremble_sends_player_in_another_direction(self):
         player = Player()
         assert player.tremble('up') in ('down', 'left', 'right')
@@ -0,0 +1,63 @@
+import random
+
+from dlgr.griduniverse.experiment import Gridworld
+from dlgr.griduniverse.rng import GlobalStream
+from dlgr.griduniverse.rng import RandomStreams
+
+
+def seeded_grid(seed):
+    grid = Gridworld(
+        singleton=False,
+        seed=seed,
+        walls_density=0.5,
+        num_food=10,
+        food_probability_distribution='edge_bias',
+    )
+    grid.build_labyrinth()
+    for i in range(3):
+        grid.spawn_player(id=str(i))
+    for i in range(grid.num_food):
+        grid.spawn_food()
+    return grid
+
+
+class TestRandomStreams(object):
+
+    def test_seeded_streams_are_reproducible(self):
+        first = RandomStreams(seed=1)
+        second = RandomStreams(seed=1)
+        assert first.food.random() == second.food.random()
+        assert first.maze.numpy.normal() == second.maze.numpy.normal()
+
+    def test_streams_are_independent(self):
+        streams = RandomStreams(seed=1)
+        assert streams.food.random() != streams.motion.random()
+
+    def test_unseeded_streams_use_global_state(self):
+        streams = RandomStreams()
+        assert isinstance(streams.food, GlobalStream)
+        random.seed(3)
+        expected = random.random()
+        random.seed(3)
+        assert streams.food.random() == expected
+
+
+class TestSeededGridworld(object):
+
+    def test_same_seed_same_game(self):
+        first = seeded_grid(seed=8).serialize()
+        second = seeded_grid(seed=8).serialize()
+        assert first['walls'] == second['walls']
+        assert first['food'] == second['food']
+        assert [(p['position'], p['color'], p['name']) for p in first['players']] == \
+            [(p['position'], p['color'], p['name']) for p in second['players']]
+
+    def test_motion_does_not_change_food(self):
+        quiet = seeded_grid(seed=8)
+        busy = seeded_grid(seed=8)
+        for player in busy.players.values():
+            for i in range(10):
+                player.tremble('up')
+        quiet.spawn_food()
+        busy.spawn_food()
+        assert quiet.serialize()['food'] == busy.serialize()['food']
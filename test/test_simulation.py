@@ -0,0 +1,53 @@
+import pytest
+
+from dlgr.griduniverse.simulation import Simulator
+from dlgr.griduniverse.simulation import simulate
+
+
+class AlwaysRight(object):
+
+    def __init__(self, player_id):
+        self.player_id = player_id
+
+    def wait_time(self):
+        return 0.25
+
+    def next_move(self, state):
+        return 'right'
+
+
+class TestSimulator(object):
+
+    @pytest.fixture
+    def config(self):
+        return {
+            'max_participants': 2,
+            'time_per_round': 5.0,
+            'num_food': 10,
+            'columns': 10,
+            'rows': 10,
+        }
+
+    def test_runs_game_in_virtual_time(self, config):
+        results = Simulator(bot_policy='FoodSeekingBot', **config).run()
+        assert results['duration'] == pytest.approx(5.0, abs=0.02)
+        assert set(results['scores']) == {'1', '2'}
+        assert results['moves'] > 0
+
+    def test_seeded_runs_are_reproducible(self, config):
+        first = simulate(seed=3, bot_policy='AdvantageSeekingBot', **config)
+        second = simulate(seed=3, bot_policy='AdvantageSeekingBot', **config)
+        assert first == second
+
+    def test_custom_policies(self, config):
+        simulator = Simulator(policy_factory=AlwaysRight, **config)
+        results = simulator.run()
+        # About one move every quarter second, for five seconds
+        assert 2 * 18 <= results['moves'] <= 2 * 20
+
+    def test_grids_are_independent_of_the_experiment_grid(self, config):
+        from dlgr.griduniverse.experiment import Gridworld
+        simulator = Simulator(**config)
+        grid, policies = simulator.setup()
+        assert grid is not getattr(Gridworld, 'instance', None)
+        assert set(policies) == set(grid.players)
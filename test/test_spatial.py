@@ -0,0 +1,47 @@
+import random
+
+from dlgr.griduniverse.experiment import Player
+from dlgr.griduniverse.spatial import SpatialHash
+
+
+class TestSpatialHash(object):
+
+    def test_finds_players_within_distance(self):
+        player = Player(position=[5, 5])
+        near = Player(position=[5, 7])
+        far = Player(position=[8, 5])
+        index = SpatialHash([player, near, far], cell_size=2)
+        assert index.neighbors(player, d=2) == [near]
+
+    def test_matches_scanning_every_player(self):
+        rng = random.Random(1)
+        players = [
+            Player(position=[rng.randint(0, 19), rng.randint(0, 19)])
+            for i in range(40)
+        ]
+        for d in (1, 2, 3):
+            index = SpatialHash(players, cell_size=d)
+            for player in players:
+                expected = [
+                    p for p in players
+                    if p is not player and player.is_neighbor(p, d=d)
+                ]
+                assert index.neighbors(player, d=d) == expected
+
+    def test_distance_larger_than_cell(self):
+        player = Player(position=[0, 0])
+        other = Player(position=[0, 4])
+        index = SpatialHash([player, other], cell_size=1)
+        assert index.neighbors(player, d=4) == [other]
+
+    def test_finds_items_within_bounds(self):
+        rng = random.Random(2)
+        positions = [[rng.randint(0, 19), rng.randint(0, 19)] for i in range(60)]
+        index = SpatialHash(range(len(positions)), cell_size=3,
+                            position=lambda i: positions[i])
+        for top, left, bottom, right in ((0, 0, 19, 19), (4, 5, 9, 7), (18, 0, 19, 2)):
+            expected = [
+                i for i, (row, column) in enumerate(positions)
+                if top <= row <= bottom and left <= column <= right
+            ]
+            assert index.within(top, left, bottom, right) == expected
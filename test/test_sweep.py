@@ -0,0 +1,92 @@
+import mock
+import pytest
+
+from dlgr.griduniverse.sweep import Sweep
+from dlgr.griduniverse.sweep import grid_design
+from dlgr.griduniverse.sweep import random_design
+from dlgr.griduniverse.sweep import write_table
+
+
+class TestDesigns(object):
+
+    def test_grid_design_covers_every_combination(self):
+        design = grid_design(num_food=[1, 2], walls_density=[0.0, 0.5, 1.0])
+        assert len(design) == 6
+        assert {'num_food': 2, 'walls_density': 0.5} in design
+
+    def test_random_design(self):
+        design = random_design(20, seed=1, num_food=(1, 10), tax=(0.0, 1.0),
+                               bot_policy=['RandomBot', 'FoodSeekingBot'])
+        assert len(design) == 20
+        assert all(isinstance(config['num_food'], int) for config in design)
+        assert all(0.0 <= config['tax'] <= 1.0 for config in design)
+        assert design == random_design(20, seed=1, num_food=(1, 10), tax=(0.0, 1.0),
+                                       bot_policy=['RandomBot', 'FoodSeekingBot'])
+
+    def test_rejects_unknown_parameters(self):
+        with pytest.raises(ValueError):
+            grid_design(num_fod=[1, 2])
+
+
+class TestSweep(object):
+
+    @pytest.fixture
+    def sweep(self, tmpdir):
+        return Sweep(
+            grid_design(num_food=[2, 8]),
+            repeats=2,
+            processes=1,
+            checkpoint=str(tmpdir.join('sweep.jsonl')),
+            max_participants=2,
+            time_per_round=1.0,
+            rows=8,
+            columns=8,
+        )
+
+    def test_collects_a_row_per_game(self, sweep):
+        rows = sweep.run()
+        assert len(rows) == 4
+        assert [(row['num_food'], row['repeat']) for row in rows] == [
+            (2, 0), (2, 1), (8, 0), (8, 1)
+        ]
+        assert all('average_payoff' in row for row in rows)
+
+    def test_resumes_from_checkpoint(self, sweep):
+        first = sweep.run()
+        with open(sweep.checkpoint) as checkpoint:
+            lines = checkpoint.readlines()
+        # Lose the last game, as if the sweep crashed while writing it
+        with open(sweep.checkpoint, 'w') as checkpoint:
+            checkpoint.writelines(lines[:-1])
+            checkpoint.write(lines[-1][:10])
+
+        with mock.patch('dlgr.griduniverse.sweep.simulate') as simulate:
+            simulate.return_value = {'moves': 0}
+            second = sweep.run()
+        assert simulate.call_count == 1
+        assert [row['key'] for row in second] == [row['key'] for row in first]
+        assert len(sweep.completed()) == 4
+
+    def test_pool_gives_same_results(self, sweep):
+        inline = sweep.run()
+        sweep.processes = 2
+        sweep.checkpoint = None
+        assert sweep.run() == inline
+
+    def test_write_table(self, sweep, tmpdir):
+        path = str(tmpdir.join('sweep.csv'))
+        write_table(sweep.run(), path)
+        with open(path) as table:
+            lines = table.read().splitlines()
+        assert len(lines) == 5
+        assert 'average_score' in lines[0]
+
+    def test_skips_games_in_the_cache(self, sweep, tmpdir):
+        from dlgr.griduniverse.cache import ResultCache
+        sweep.checkpoint = None
+        sweep.cache = ResultCache(str(tmpdir.join('results.db')))
+        first = sweep.run()
+        with mock.patch('dlgr.griduniverse.sweep.simulate') as simulate:
+            second = sweep.run()
+        assert not simulate.called
+        assert second == first
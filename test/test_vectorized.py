@@ -0,0 +1,66 @@
+import mock
+import pytest
+import random
+import time
+
+
+@pytest.mark.usefixtures('env')
+class TestArrayGridworld(object):
+
+    @pytest.fixture
+    def populated(self, gridworld):
+        from dlgr.griduniverse.maze import Wall
+        gridworld.rows = gridworld.columns = 12
+        gridworld.motion_auto = True
+        gridworld.tax = 0.5
+        gridworld.public_good = 0.25
+        gridworld.relative_deprivation = 2
+        gridworld.frequency_dependence = 2
+        gridworld.frequency_dependent_payoff_rate = 1
+        gridworld.intragroup_competition = 2
+        gridworld.intergroup_competition = 1.5
+        gridworld.contagion = 1
+        gridworld.num_food = 20
+        gridworld.motion_speed_limit = 0
+        random.seed(7)
+        gridworld.set_walls([Wall(position=[r, 6]) for r in range(2, 10)])
+        for i in range(40):
+            player = gridworld.spawn_player(str(i))
+            player.score = random.randint(0, 5)
+            player.motion_direction = random.choice(['up', 'down', 'left', 'right'])
+        for i in range(gridworld.num_food):
+            gridworld.spawn_food()
+        return gridworld
+
+    def run(self, grid, step):
+        random.seed(11)
+        for tick in range(30):
+            step(timed_events=(tick % 5 == 0))
+        return grid.serialize()
+
+    def test_matches_object_model(self, populated):
+        from dlgr.griduniverse.vectorized import ArrayGridworld
+        initial = populated.serialize()
+        now = time.time()
+        with mock.patch('time.time', return_value=now):
+            populated.start_timestamp = now - 10
+            expected = self.run(populated, populated.step)
+
+            populated.deserialize(initial)
+            populated.food_consumed = []
+            populated.num_food = 20
+            array_grid = ArrayGridworld(populated)
+            self.run(populated, array_grid.step)
+            array_grid.sync()
+            result = populated.serialize()
+
+        assert result['players'] == expected['players']
+        assert result['food'] == expected['food']
+
+    def test_players_do_not_overlap(self, populated):
+        from dlgr.griduniverse.vectorized import ArrayGridworld
+        array_grid = ArrayGridworld(populated)
+        for tick in range(20):
+            array_grid.step()
+        positions = set(map(tuple, array_grid.positions.tolist()))
+        assert len(positions) == len(populated.players)
@@ -0,0 +1,61 @@
+import json
+import pytest
+
+from dlgr.griduniverse import wire
+
+
+@pytest.fixture
+def grid_state():
+    return {
+        'players': [
+            {'id': 1, 'position': [5, 5], 'score': 2.0, 'color': 'RED'},
+            {'id': 2, 'position': [2, 3], 'score': 0.0, 'color': 'BLUE'},
+        ],
+        'food': [
+            {'id': 0, 'position': [1, 1], 'maturity': 0.9, 'color': [0.5, 0.6, 0.1]},
+        ],
+        'walls': [[0, 0], {'position': [0, 1], 'color': [1.0, 0.0, 0.0]}],
+        'round': 0,
+        'donation_active': False,
+        'rows': 10,
+        'columns': 10,
+    }
+
+
+class TestStateFormats(object):
+
+    def test_json_nests_grid_as_string(self, grid_state):
+        message = wire.encode_state({'type': 'state', 'count': 1}, grid_state)
+        assert message['type'] == 'state'
+        assert json.loads(message['grid']) == grid_state
+
+    def test_packed_stores_columns_with_flat_positions(self, grid_state):
+        message = wire.encode_state({'type': 'state'}, grid_state, 'packed')
+        assert message['format'] == 'packed'
+        players = message['grid']['players']
+        assert players['count'] == 2
+        assert players['id'] == [1, 2]
+        assert players['position'] == [5, 5, 2, 3]
+        assert message['grid']['rows'] == 10
+
+    @pytest.mark.parametrize('state_format', wire.STATE_FORMATS)
+    def test_round_trips_through_json(self, grid_state, state_format):
+        message = wire.encode_state({'type': 'state'}, grid_state, state_format)
+        received = json.loads(json.dumps(message))
+        assert wire.decode_grid(received) == grid_state
+
+    def test_partial_grid_round_trips(self, grid_state):
+        del grid_state['walls']
+        del grid_state['food']
+        message = wire.encode_state({'type': 'state'}, grid_state, 'packed')
+        assert wire.decode_grid(message) == grid_state
+
+    def test_packed_is_smaller(self, grid_state):
+        grid_state['players'] *= 50
+        sizes = {
+            state_format: len(json.dumps(
+                wire.encode_state({'type': 'state'}, grid_state, state_format)
+            ))
+            for state_format in wire.STATE_FORMATS
+        }
+        assert sizes['packed'] < sizes['json']